@@ -0,0 +1,53 @@
+"""
+Benchmark der parallelen Suche lokaler Maxima für lange (Holter-)Aufnahmen.
+
+Eine vorhandene Aufnahme wird auf die gewünschte Dauer vervielfacht, als Binärdatei abgelegt
+und mit unterschiedlich vielen Prozessen durchsucht. Geprüft wird auch, dass das Ergebnis
+mit der Berechnung in einem Durchlauf übereinstimmt.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.bench_chunked_peaks [Stunden]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.ekg_signal import EKGSignal
+from src.peak_detection import find_local_maxima
+
+SOURCE = "data/ekg_data/01_Ruhe.txt"
+SAMPLING_RATE = 500
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 6.0
+    base = np.asarray(EKGSignal.from_file(SOURCE).mv)
+    length = int(hours * 3600 * SAMPLING_RATE)
+    repeats = -(-length // len(base))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "holter.mv.bin")
+        np.tile(base, repeats)[:length].tofile(path)
+        signal = np.memmap(path, dtype=base.dtype, mode="r", shape=(length,))
+        source_file = (path, base.dtype.str, length, 1)
+
+        print(f"{hours:g} h bei {SAMPLING_RATE} Hz = {length} Messwerte")
+        reference = None
+        worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        for workers in worker_counts:
+            find_local_maxima(signal, workers=workers, source_file=source_file)  # Pool aufwärmen
+            start = time.perf_counter()
+            peaks = find_local_maxima(signal, workers=workers, source_file=source_file)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = peaks
+            identical = np.array_equal(reference, peaks)
+            print(f"Prozesse: {workers:>2}  Laufzeit: {elapsed * 1000:8.1f} ms  Maxima: {len(peaks)}  identisch: {identical}")
+        del signal
+
+
+if __name__ == "__main__":
+    main()
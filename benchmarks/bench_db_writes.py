@@ -0,0 +1,106 @@
+"""
+Benchmark der Schreibzugriffe auf die Personendatenbank.
+
+Mehrere Threads simulieren gleichzeitige Streamlit-Sessions, die Profile ändern und EKG-Tests
+hinzufügen. Gemessen werden Durchsatz (Änderungen pro Sekunde) sowie Median- und p99-Latenz
+je Änderung, jeweils für SQLite und die TinyDB-JSON-Datei:
+
+- "einzeln": jede Änderung wird sofort für sich geschrieben (ein Thread, wie bisher)
+- "Writer": alle Sessions reichen Änderungen an den gemeinsamen Schreib-Thread weiter
+
+Zum Schluss wird geprüft, dass keine Änderung verloren gegangen ist.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.bench_db_writes [Sessions] [Änderungen pro Session] [Personen]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from src.database import TinyDBStorage
+from src.db_writer import DatabaseWriter
+from src.sqlite_storage import SQLiteStorage
+
+
+def make_person(index):
+    return {
+        "id": f"p{index:07d}", "firstname": f"Vorname{index}", "lastname": f"Nachname{index}",
+        "username": f"user{index}", "password": "x", "date_of_birth": "1990", "role": "user",
+        "picture_path": "data/profile_pictures/none.jpg", "ekg_tests": [],
+    }
+
+
+def session_mutations(session, count, persons):
+    # Abwechselnd Profiländerung einer zufälligen Person und neuer EKG-Test der eigenen Person
+    rng = np.random.default_rng(session)
+    own = f"p{session % persons:07d}"
+    for i in range(count):
+        if i % 2:
+            yield ("add_ekg_test", own, {"id": f"s{session}-t{i}", "date": "01.01.2025"})
+        else:
+            yield ("update", f"p{int(rng.integers(persons)):07d}", {"firstname": f"Geändert{session}-{i}"})
+
+
+def run(storage, sessions, count, persons, use_writer):
+    latencies = []
+    lock = threading.Lock()
+    writer = DatabaseWriter(storage) if use_writer else None
+
+    def session(index):
+        local = []
+        for mutation in session_mutations(index, count, persons):
+            start = time.perf_counter()
+            if writer is not None:
+                writer.execute(mutation)
+            else:
+                storage.apply_batch([mutation])
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    # Ohne Writer sequenziell (ungeschützte parallele Schreibzugriffe würden Änderungen verlieren)
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+        if writer is None:
+            thread.join()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    tests = sum(len(p.get("ekg_tests", [])) for p in storage.all())
+    expected = sessions * (count // 2)
+    stats = writer.stats() if writer is not None else {"batches": len(latencies), "coalesced": 0}
+    print(f"  {'Writer' if use_writer else 'einzeln':8} {len(latencies) / elapsed:9.0f} Änderungen/s"
+          f"  p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):7.2f} ms"
+          f"  Schreibvorgänge: {stats['batches']:6}  zusammengefasst: {stats['coalesced']:5}"
+          f"  EKG-Tests {tests}/{expected}")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    persons = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    print(f"{sessions} Sessions x {count} Änderungen, {persons} Personen")
+
+    backends = {
+        "SQLite": lambda tmp_dir: SQLiteStorage(os.path.join(tmp_dir, "bench.sqlite3")),
+        "TinyDB": lambda tmp_dir: TinyDBStorage(os.path.join(tmp_dir, "bench.json")),
+    }
+    for name, create in backends.items():
+        print(name)
+        for use_writer in (False, True):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                storage = create(tmp_dir)
+                storage.apply_batch([("insert", make_person(i)) for i in range(persons)])
+                run(storage, sessions, count, persons, use_writer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark des kompakten Speicherformats (.ekgz) gegenüber den Textdateien.
+
+Jede Aufnahme in data/ekg_data wird mit zlib und lzma umgewandelt. Verglichen werden
+Dateigröße sowie die Zeit für das Einlesen der Textdatei (CSV-Parsing) und das Entpacken
+der .ekgz-Datei; außerdem wird geprüft, dass beide dieselben Werte liefern (im kompakten Datentyp).
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.bench_ekg_format
+"""
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.ekg_cache import iter_text_chunks, correct_time_resets
+from src.ekg_format import CODECS, EKGZReader, convert_text_file
+
+
+def parse_text(path):
+    chunks = list(iter_text_chunks(path))
+    mv = np.concatenate([mv for mv, _ in chunks])
+    ms, _ = correct_time_resets(np.concatenate([ms for _, ms in chunks]))
+    return mv, ms
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in sorted(glob.glob("data/ekg_data/*.txt")):
+            try:
+                start = time.perf_counter()
+                mv, ms = parse_text(path)
+                parse_time = time.perf_counter() - start
+            except (ValueError, KeyError):
+                continue  # keine EKG-Aufnahme (z. B. ReadMe.txt)
+            name = os.path.basename(path)
+            print(f"{name}: {len(mv)} Messwerte, {os.path.getsize(path) / 1024:.0f} KB, CSV {parse_time * 1000:.1f} ms")
+            for compression in CODECS:
+                target = os.path.join(tmp_dir, f"{name}.{compression}.ekgz")
+                convert_text_file(path, target, compression)
+                start = time.perf_counter()
+                decoded_mv, decoded_ms = EKGZReader(target).read_all()
+                decode_time = time.perf_counter() - start
+                identical = np.array_equal(decoded_mv, mv.astype(decoded_mv.dtype)) and np.array_equal(decoded_ms, ms)
+                size = os.path.getsize(target)
+                print(f"  {compression:5} {size / 1024:7.1f} KB  (x{os.path.getsize(path) / size:5.1f} kleiner)"
+                      f"  Entpacken {decode_time * 1000:6.1f} ms  (x{parse_time / decode_time:4.1f} schneller)"
+                      f"  identisch: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark der Peak-Erkennung: fester Schwellwert (find_peaks) gegen den adaptiven Pan-Tompkins-Detektor.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.bench_peak_detection
+"""
+import glob
+import os
+import time
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from src.ekg_signal import EKGSignal, DECIMATION_FACTOR
+from src.peak_detection import pan_tompkins, estimate_sampling_rate
+
+REPEATS = 5
+
+
+def median_ms(func):
+    # Führt func mehrfach aus und gibt den Median der Laufzeit in ms zurück.
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    print(f"{'Aufnahme':<40} {'Messwerte':>10} {'find_peaks':>11} {'Pan-Tompkins':>13} {'Peaks (350/PT)':>15}")
+    for path in sorted(glob.glob("data/ekg_data/*.txt")):
+        if os.path.basename(path) == "ReadMe.txt":
+            continue
+        signal = EKGSignal.from_file(path)
+        mv, ms = signal.decimated(DECIMATION_FACTOR)
+        mv, ms = np.asarray(mv), np.asarray(ms)
+        fs = estimate_sampling_rate(ms)
+
+        threshold_time = median_ms(lambda: find_peaks(mv, height=350))
+        adaptive_time = median_ms(lambda: pan_tompkins(mv, fs))
+        threshold_count = len(find_peaks(mv, height=350)[0])
+        adaptive_count = len(pan_tompkins(mv, fs))
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"{name:<40} {len(mv):>10} {threshold_time:>9.2f}ms {adaptive_time:>11.2f}ms {threshold_count:>7}/{adaptive_count:<7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,24 @@ Visualisierung von EKGs, Analyse und Export als CSV oder PDF.
 """
 
 # --- Globale Pfad-Konstanten ---
-DB_PATH = "data/tinydb_person_db.json"
 PROFILE_PIC_DIR = "data/profile_pictures"
 EKG_DATA_DIR = "data/ekg_data"
 
+# --- Darstellungsmodi der Plots (Anzeige -> Modus in EKGdata) ---
+RENDER_MODE_OPTIONS = {"Automatisch": "auto", "SVG": "svg", "WebGL": "webgl"}
+
+# --- Peak-Detektoren (Anzeige -> Verfahren in EKGdata) ---
+PEAK_METHOD_OPTIONS = {"Pan-Tompkins (adaptiv)": "pan_tompkins", "Schwellwert": "threshold"}
+
+# --- Hinweis je Peak-Detektor, wenn zu wenige Peaks erkannt wurden (die Peak-Schwelle gilt nur für "Schwellwert") ---
+PEAK_METHOD_HINTS = {
+    "pan_tompkins": "Der adaptive Detektor passt seine Schwelle selbst an; bitte den Detektor 'Schwellwert' mit passender Peak-Schwelle versuchen.",
+    "threshold": "Bitte einen niedrigeren Wert für die Peak-Schwelle eingeben.",
+}
+
+# --- Höchstzahl angezeigter Treffer der Personensuche ---
+SEARCH_RESULT_LIMIT = 50
+
 
 # Standardbibliotheken
 import os
@@ -23,11 +37,16 @@ import streamlit as st
 import pandas as pd
 from PIL import Image
 from plotly import express as px
-from tinydb import TinyDB, Query
 
 # Eigene Module
-from src.read_person_data import load_user_objects
+from src.person_repository import get_person_repository
 from src.ekgdata import EKGdata
+from src.peak_detection import DEFAULT_PEAK_METHOD
+from src.signal_cache import get_signal_cache
+from src.preprocessing import get_preprocessor, delete_recording, validate_upload
+from src.ekg_format import FORMAT_EXTENSION
+from src.ekg_export import lazy_csv, lazy_npz
+from src.reports import ReportRequest, collect_report_requests, get_report_queue, read_export
 
 # Session-Variablen initialisieren, falls noch nicht vorhanden
 if "is_logged_in" not in st.session_state:
@@ -55,6 +74,129 @@ def reset_session():
     st.session_state["login_failed"] = False
     st.session_state["role"] = ""
 
+def show_preprocessing_status(ekg_id):
+    """
+    Zeigt den Stand der Hintergrund-Vorverarbeitung eines hochgeladenen EKG-Tests an.
+    Gibt nichts aus, wenn die Aufnahme bereits bereit ist oder nicht in dieser Sitzung hochgeladen wurde.
+    """
+    job = get_preprocessor().status(ekg_id)
+    if job is None or job.state == "done":
+        return
+    if job.state == "failed":
+        st.error(f"Vorverarbeitung des EKG-Tests: {job.label}")
+    else:
+        st.info(f"EKG-Test {job.label} – die erste Anzeige kann etwas länger dauern.")
+
+def load_ekg(ekg_id):
+    """
+    Zeigt den Stand der Vorverarbeitung an und lädt den EKG-Test.
+    Gibt None zurück und zeigt eine Fehlermeldung an, wenn die Vorverarbeitung fehlgeschlagen ist
+    oder die Datei nicht gelesen werden kann (Admins können den Test unter "Bearbeiten / Löschen" entfernen).
+    """
+    show_preprocessing_status(ekg_id)
+    job = get_preprocessor().status(ekg_id)
+    if job is not None and job.state == "failed":
+        return None
+    try:
+        return EKGdata.load_by_id(ekg_id)
+    except (OSError, ValueError) as error:
+        st.error(f"❌ Der EKG-Test kann nicht geladen werden: {error}")
+        return None
+
+@st.fragment(run_every=1)
+def show_report_progress(job_id):
+    """
+    Zeigt den Fortschritt eines Report-Auftrags oder Sammel-Exports an und aktualisiert sich selbst, ohne die Seite zu blockieren.
+    Sobald der Auftrag abgeschlossen ist, wird die Seite neu geladen, um den Download anzuzeigen.
+    """
+    job = get_report_queue().status(job_id)
+    if job is None or job.state in ("done", "failed"):
+        st.rerun()
+    st.progress(job.progress, text=job.label)
+
+def show_report_export(person, selected_test, ekg, key):
+    """
+    Zeigt den PDF-Export einer Analyse an: Der Report wird im Hintergrund erstellt (Warteschlange),
+    ein bereits erstellter Report mit denselben Einstellungen (Test, Zeitbereich, Schwellwerte) direkt angeboten.
+    """
+    queue = get_report_queue()
+    request = ReportRequest.from_ekg(person, selected_test, ekg)
+    if st.button("📝 Analyse-Zusammenfassung als PDF erstellen", key=f"pdf_{key}_button"):
+        job = queue.submit(request)
+    else:
+        job = queue.find(request)
+    if job is None:
+        return
+    if job.state == "done":
+        st.download_button("📄 PDF herunterladen", data=job.result, file_name=request.file_name,
+                           mime="application/pdf", key=f"pdf_{key}_download")
+    elif job.state == "failed":
+        st.error(f"PDF-Report {job.label}")
+    else:
+        show_report_progress(job.id)
+
+def show_analysis_exports(person, selected_test, ekg, key):
+    """
+    Zeigt die Exporte der aktuellen Analyse an (CSV, NPZ, PDF-Report).
+    Verwendet Zeitbereich, Peak-Detektor, Peak-Schwelle und RR-Schwelle der Analyse aus der rechten Spalte.
+    """
+    if len(ekg.ms):
+        # Exporte werden erst beim Klick erstellt (kein Aufwand bei normalen Reruns) und lösen selbst keinen Rerun aus
+        window = ekg.get_window()
+        export_name = f"{person.username}_{selected_test['date'].replace('.', '-')}_auswahl"
+        st.download_button(
+            label="📥 CSV des gewählten Zeitbereichs herunterladen",
+            data=lazy_csv(window),
+            file_name=f"{export_name}.csv",
+            mime="text/csv",
+            key=f"csv_{key}_download",
+            on_click="ignore"
+        )
+        st.download_button(
+            label="📦 Kompakt (NPZ, mit Peaks und Anomalien) herunterladen",
+            data=lazy_npz(ekg, window),
+            file_name=f"{export_name}.npz",
+            mime="application/octet-stream",
+            key=f"npz_{key}_download",
+            on_click="ignore"
+        )
+    show_report_export(person, selected_test, ekg, key)
+
+def show_bulk_export():
+    """
+    Zeigt den Sammel-Export an: PDF-Reports ausgewählter oder aller Personen werden im Hintergrund
+    parallel erstellt und als ein ZIP-Archiv zum Download angeboten.
+    """
+    persons = [p for p in get_person_repository().all() if p.ekg_tests]
+    if not st.checkbox("Alle Personen", value=True, key="bulk_export_all"):
+        person_options = {f"{p.firstname} {p.lastname} ({p.username})": p for p in persons}
+        selected_persons = st.multiselect("Personen auswählen", list(person_options), key="bulk_export_persons")
+        persons = [person_options[label] for label in selected_persons]
+    test_options = {f"{p.firstname} {p.lastname} – Test am {t['date']}": t["id"] for p in persons for t in p.ekg_tests}
+    selected_tests = st.multiselect("Nur diese Tests (leer = alle Tests der Auswahl)", list(test_options), key="bulk_export_tests")
+    requests = collect_report_requests(persons, {test_options[label] for label in selected_tests} or None)
+    st.caption(f"{len(requests)} Reports mit den Standardeinstellungen (Pan-Tompkins-Detektor, RR-Anomalien unter 300 ms, erste 10 Sekunden).")
+
+    queue = get_report_queue()
+    if st.button("📦 Reports als ZIP erstellen", key="bulk_export_button", disabled=not requests):
+        st.session_state["bulk_export_job"] = queue.submit_export(requests).id
+    job_id = st.session_state.get("bulk_export_job")
+    job = queue.status(job_id) if job_id else None
+    if job is None:
+        return
+    if job.state == "done" and not os.path.exists(job.output_path):
+        st.info("Das Archiv dieses Sammel-Exports wurde inzwischen gelöscht. Bitte den Export erneut starten.")
+    elif job.state == "done":
+        st.success(f"Sammel-Export {job.label}")
+        # Archiv erst beim Klick lesen statt bei jedem Rerun
+        st.download_button("📥 ZIP herunterladen", data=lambda: read_export(job.output_path),
+                           file_name=os.path.basename(job.output_path), mime="application/zip",
+                           key="bulk_export_download", on_click="ignore")
+    elif job.state == "failed":
+        st.error(f"Sammel-Export {job.label}")
+    else:
+        show_report_progress(job.id)
+
 if not st.session_state["is_logged_in"]:
     # Login-Formular mit Eingabe von Benutzername und Passwort.
     # Bei erfolgreicher Anmeldung werden Session-Variablen gesetzt.
@@ -65,28 +207,21 @@ if not st.session_state["is_logged_in"]:
         submitted = st.form_submit_button("Login")
 
         if submitted:
-            db = TinyDB(DB_PATH)
-            users = db.table("_default").all()
-
-            matched_user = None
-            for user in users:
-                stored_pw = user.get("password", "")
-                if (user.get("username", "").strip().lower() == username.strip().lower() and
-                    (bcrypt.checkpw(password.encode(), stored_pw.encode()) if stored_pw.startswith("$2b$") else stored_pw == password)):
-                    matched_user = user
-                    break
-
-            if matched_user:
+            # Benutzer über den Index des Personenverzeichnisses suchen statt alle Einträge zu durchlaufen
+            current_user = get_person_repository().get_by_username(username)
+            stored_pw = current_user.password if current_user is not None else ""
+            password_ok = current_user is not None and (
+                bcrypt.checkpw(password.encode(), stored_pw.encode()) if stored_pw.startswith("$2b$") else stored_pw == password)
+
+            if password_ok:
                 st.session_state["login_failed"] = False
                 st.session_state["is_logged_in"] = True
-                st.session_state["current_user_name"] = matched_user["username"]
-                all_users = load_user_objects()
-                current_user = next((p for p in all_users if p.username == matched_user["username"]), None)
+                st.session_state["current_user_name"] = current_user.username
                 st.session_state["current_user"] = current_user
-                st.session_state["role"] = matched_user.get("role", "user")
+                st.session_state["role"] = current_user.role
 
                 # Bei Admins direkt eigenes Profil anzeigen
-                if matched_user.get("role") == "admin":
+                if current_user.role == "admin":
                     st.session_state["admin_mode"] = "Benutzer suchen"
                     st.session_state["admin_selected_user"] = f"{current_user.firstname} {current_user.lastname}"
 
@@ -110,6 +245,12 @@ if st.session_state["is_logged_in"]:
             st.rerun()
 
         st.write("### Admin-Modus")
+
+        # Kennzahlen des prozessweiten Signal-Caches (gemeinsam für alle Sessions)
+        with st.sidebar.expander("📊 Cache-Statistik"):
+            cache_stats = get_signal_cache().stats()
+            st.write(f"Treffer: {cache_stats['hits']} | Fehlzugriffe: {cache_stats['misses']} | Verdrängungen: {cache_stats['evictions']}")
+            st.write(f"Aufnahmen im Cache: {cache_stats['entries']} ({cache_stats['bytes'] / 1e6:.1f} von {cache_stats['max_bytes'] / 1e6:.0f} MB)")
         admin_option = st.radio(
             "Aktion auswählen",
             ["Benutzer suchen", "Neue Person anlegen"],
@@ -119,11 +260,19 @@ if st.session_state["is_logged_in"]:
         # Admin-Bereich: Benutzer suchen und verwalten
         if admin_option == "Benutzer suchen":
             # Admin-Bereich: Benutzer suchen und verwalten
-            all_users = load_user_objects()
-            suchname = st.text_input("Benutzer suchen (Vor- oder Nachname)")
-            matching_users = [
-                p for p in all_users if suchname.lower() in p.firstname.lower() or suchname.lower() in p.lastname.lower()
-            ]
+            with st.expander("📦 Sammel-Export: PDF-Reports mehrerer Personen als ZIP"):
+                show_bulk_export()
+            suchname = st.text_input("Benutzer suchen (Vor-, Nachname oder Benutzername)")
+            # Suche über den Index des Personenverzeichnisses (nach Relevanz sortiert, begrenzte Trefferzahl)
+            matching_users = get_person_repository().search(suchname, limit=SEARCH_RESULT_LIMIT)
+            current_user = st.session_state.get("current_user")
+            if not suchname.strip() and current_user is not None and all(p.id != current_user.id for p in matching_users):
+                # Eigenes Profil bei leerer Suche immer anbieten (Vorauswahl nach dem Login)
+                own_profile = get_person_repository().get_by_id(current_user.id)
+                if own_profile is not None:
+                    matching_users = [own_profile] + matching_users[:SEARCH_RESULT_LIMIT - 1]
+            if len(matching_users) >= SEARCH_RESULT_LIMIT:
+                st.caption(f"Es werden die {SEARCH_RESULT_LIMIT} besten Treffer angezeigt. Für weitere Personen die Suche verfeinern.")
             if matching_users:
                 select_options = [f"{p.firstname} {p.lastname}" for p in matching_users]
                 selected = st.selectbox("Nutzer auswählen", select_options, key="admin_selected_user")
@@ -157,148 +306,9 @@ if st.session_state["is_logged_in"]:
                                 st.info("Das Paket 'fpdf' ist nicht installiert. Installiere es mit `pip install fpdf`, um die Analyse als PDF zu exportieren.")
                             else:
                                 pass
-                        ekg_options = {f"Test {i+1} am {t['date']}": t["id"] for i, t in enumerate(ekg_tests)}
-                        # Fallback: selectbox muss existieren, sonst Standardwert nehmen
-                        selected_label = st.session_state.get("ekg_select_admin")
-                        if ekg_options:
-                            if not selected_label or selected_label not in ekg_options:
-                                selected_label = list(ekg_options.keys())[0]
-                        else:
-                            selected_label = None
-                        if selected_label:
-                            selected_id = ekg_options[selected_label]
-                            selected_test = next(test for test in ekg_tests if test["id"] == selected_id)
-                            user_data = [person]
-                            ekg = EKGdata.load_by_id(selected_id, user_data)
-                            # Wichtig: detect_peaks_globally() muss vor detect_rr_anomalies() aufgerufen werden!
-                            ekg.detect_peaks_globally()
-                            if ekg.peaks:
-                                try:
-                                    ekg.detect_rr_anomalies()
-                                except ValueError:
-                                    st.info("⚠️ Für diese Einstellungen konnten keine verwertbaren EKG-Daten erkannt werden. Bitte den Wert für die Peak-Erkennung anpassen.")
-                            else:
-                                st.info("ℹ️ Keine Peaks erkannt – Anomalie-Erkennung wird übersprungen.")
-                            min_ms = int(ekg.df["Zeit in ms"].min())
-                            max_ms = int(ekg.df["Zeit in ms"].max())
-                            slider_key = "slider_admin"
-                            # CSV-Export des gewählten EKG-Zeitbereichs (direkt nach Auswahl des Zeitbereichs)
-                            if ekg.df is not None and not ekg.df.empty:
-                                # set_time_range falls Slider gesetzt, sonst unverändert
-                                if slider_key in st.session_state:
-                                    time_range = st.session_state[slider_key]
-                                    ekg.set_time_range(time_range)
-                                csv = ekg.df.to_csv(index=False).encode("utf-8")
-                                st.download_button(
-                                    label="📥 CSV des gewählten Zeitbereichs herunterladen",
-                                    data=csv,
-                                    file_name=f"{person.username}_{selected_test['date'].replace('.', '-')}_auswahl.csv",
-                                    mime="text/csv",
-                                    key="csv_admin_download_left"
-                                )
-                            if st.button("📝 Analyse-Zusammenfassung als PDF erstellen", key="pdf_admin_button"):
-                                from fpdf import FPDF
-                                import os
-
-                                # Plotly-Figur des EKGs als PNG erzeugen (mit Fehlerbehandlung)
-                                import plotly.io as pio
-                                fig = ekg.plot_time_series()
-                                export_dir = "exports"
-                                os.makedirs(export_dir, exist_ok=True)
-                                png_path = os.path.join(export_dir, f"{person.username}_ekg_snapshot.png")
-                                image_inserted = False
-                                try:
-                                    fig.write_image(png_path, format="png", engine="kaleido")
-                                    image_inserted = True
-                                except Exception:
-                                    image_inserted = False
-
-                                class PDF(FPDF):
-                                    def header(self):
-                                        self.set_font("Arial", "B", 12)
-                                        self.cell(0, 10, "EKG-Analyse-Zusammenfassung", ln=True, align="C")
-                                        self.ln(10)
-
-                                pdf = PDF()
-                                pdf.add_page()
-
-                                # Profilbild links oben
-                                try:
-                                    pdf.image(person.picture_path, x=10, y=15, w=30)
-                                except Exception:
-                                    pass
-
-                                # Zeilenumbruch nach Bild, damit kein Text auf dem Bild steht
-                                pdf.ln(35)
-
-                                # Alle Personendaten unter dem Bild, kompakt ohne große Abstände
-                                pdf.set_font("Arial", "B", 14)
-                                pdf.cell(0, 10, f"Name: {person.get_full_name()}", ln=True)
-                                pdf.set_font("Arial", "", 12)
-                                pdf.cell(0, 10, f"ID: {person.id}", ln=True)
-                                pdf.cell(0, 10, f"Geburtsjahr: {person.date_of_birth}", ln=True)
-                                pdf.cell(0, 8, f"Testdatum: {selected_test['date']}", ln=1)
-                                pdf.cell(0, 8, f"Maximale Herzfrequenz (geschätzt): {person.calc_max_heart_rate()} bpm", ln=1)
-                                estimated_hr_val = round(ekg.estimate_hr()) if hasattr(ekg, "estimate_hr") else "-"
-                                pdf.cell(0, 8, f"Geschätzte Herzfrequenz: {estimated_hr_val} bpm", ln=1)
-                                pdf.cell(0, 8, f"Gesamtdauer der Messung: {ekg.get_duration_str()}", ln=1)
-
-                                try:
-                                    start_ms = ekg.df["Zeit in ms"].min()
-                                    end_ms = ekg.df["Zeit in ms"].max()
-                                    range_duration_sec = (end_ms - start_ms) / 1000
-                                    r_min = int(range_duration_sec // 60)
-                                    r_sec = int(range_duration_sec % 60)
-                                    range_str = f"{r_min} Minuten und {r_sec} Sekunden"
-                                    pdf.cell(0, 8, f"Dauer des gewählten Zeitbereichs: {range_str}", ln=1)
-                                except Exception:
-                                    pdf.cell(0, 8, f"Dauer des gewählten Zeitbereichs: nicht verfügbar", ln=1)
-
-                                pdf.cell(0, 8, "EKG-Zeitreihe auf der nächsten Seite", ln=1)
-
-                                num_peaks = len(ekg.peaks) if hasattr(ekg, "peaks") else "-"
-                                pdf.cell(0, 8, f"Anzahl erkannter globaler Peaks (Herzschläge): {num_peaks}", ln=1)
-
-                                pdf.ln(5)
-
-                                visible_anomalies = ekg.get_visible_rr_anomalies()
-                                pdf.set_font("Arial", "B", 12)
-                                pdf.cell(0, 8, f"Anomalien: {len(visible_anomalies)} erkannt (im ausgewählten Bereich)", ln=1)
-                                pdf.set_font("Arial", "", 10)
-
-                                if visible_anomalies:
-                                    col_width = 60
-                                    items_per_row = 3
-                                    for i, a in enumerate(visible_anomalies):
-                                        art = "Ausreißer hoch" if a > 2000 else "Ausreißer tief" if a < 400 else "Ausreißer"
-                                        text = f"{i+1}. {a} ms ({art})"
-                                        pdf.cell(col_width, 8, text, ln=False)
-                                        if (i + 1) % items_per_row == 0:
-                                            pdf.ln(8)
-                                    if len(visible_anomalies) % items_per_row != 0:
-                                        pdf.ln(8)
-                                else:
-                                    pdf.cell(0, 8, "Keine Anomalien im gewählten Bereich", ln=1)
-
-                                pdf.add_page()
-
-                                page_width = pdf.w - 2 * pdf.l_margin
-                                if image_inserted:
-                                    try:
-                                        pdf.image(png_path, x=pdf.l_margin, y=pdf.get_y(), w=page_width)
-                                        pdf.ln(90)
-                                    except Exception:
-                                        pdf.cell(0, 10, "Das EKG-Bild konnte nicht angezeigt werden.", ln=1)
-                                else:
-                                    pdf.cell(0, 10, "Das EKG-Bild konnte nicht eingefügt werden.", ln=1)
-
-                                pdf_path = os.path.join(export_dir, f"{person.username}_analyse.pdf")
-                                pdf.output(pdf_path)
-
-                                with open(pdf_path, "rb") as f:
-                                    st.download_button("📄 PDF herunterladen", data=f, file_name=f"{person.username}_analyse.pdf", mime="application/pdf")
-                        else:
+                        if not ekg_tests:
                             st.info("❕ Keine EKG-Daten für diese Person vorhanden.")
+                        # Exporte folgen nach der Analyse in der rechten Spalte (gleiche Einstellungen wie die Anzeige)
 
                     with col2:
                         st.markdown("### ⚙️ Analyseoptionen")
@@ -312,30 +322,30 @@ if st.session_state["is_logged_in"]:
                             if selected_label:
                                 selected_id = ekg_options[selected_label]
                                 selected_test = next(test for test in ekg_tests if test["id"] == selected_id)
-                                user_data = [person]
-                                ekg = EKGdata.load_by_id(selected_id, user_data)
-                                # Peak- und Anomalie-Erkennung wird nun im Visualisierungs-Abschnitt durchgeführt
+                                ekg = load_ekg(selected_id)
+                                if ekg is not None:
+                                    # Peak- und Anomalie-Erkennung wird nun im Visualisierungs-Abschnitt durchgeführt
 
-                                min_ms = int(ekg.df["Zeit in ms"].min())
-                                max_ms = int(ekg.df["Zeit in ms"].max())
-                                default_end = min(min_ms + 10000, max_ms)
+                                    min_ms = ekg.min_time
+                                    max_ms = ekg.max_valid_time
+                                    default_end = min(min_ms + 10000, max_ms)
 
-                                # CSV-Export des gewählten EKG-Zeitbereichs (direkt nach Auswahl des Zeitbereichs)
-                                # (Export-Button nur in linker Spalte unter Personendaten)
+                                    # CSV-Export des gewählten EKG-Zeitbereichs (direkt nach Auswahl des Zeitbereichs)
+                                    # (Export-Button nur in linker Spalte unter Personendaten)
 
 
 
-                                st.write("#### Analyse gesamter Messdaten")
-                                st.write("Länge der Zeitreihe:", ekg.get_duration_str())
-                                if ekg.time_was_corrected:
-                                    st.warning("Hinweis: In der ausgewählten EKG-Datei wurden fehlerhafte Zeitstempel erkannt. Diese wurden automatisch korrigiert. Die Ergebnisse können dennoch Ungenauigkeiten enthalten.")
-                                # Peak-Schwelle wird im Visualisierungs-Abschnitt angepasst
+                                    st.write("#### Analyse gesamter Messdaten")
+                                    st.write("Länge der Zeitreihe:", ekg.get_duration_str())
+                                    if ekg.time_was_corrected:
+                                        st.warning("Hinweis: In der ausgewählten EKG-Datei wurden fehlerhafte Zeitstempel erkannt. Diese wurden automatisch korrigiert. Die Ergebnisse können dennoch Ungenauigkeiten enthalten.")
+                                    # Peak-Schwelle wird im Visualisierungs-Abschnitt angepasst
                             else:
                                 st.info("❕ Keine EKG-Daten für diese Person vorhanden.")
                         else:
                             st.info("Keine EKG-Daten für diese Person verfügbar.")
 
-                        if ekg_tests and selected_label:
+                        if ekg is not None:
                             st.markdown("### 📉 Visualisierung")
                             st.write("#### Zeitbereich für Analyse auswählen")
                             time_range = st.slider("Analyse-Zeitraum (ms)",
@@ -350,6 +360,14 @@ if st.session_state["is_logged_in"]:
                             with st.container():
                                 col1_peak, col2_peak = st.columns([1, 4])
                                 with col1_peak:
+                                    peak_method_label = st.selectbox(
+                                        "Peak-Detektor",
+                                        list(PEAK_METHOD_OPTIONS.keys()),
+                                        index=list(PEAK_METHOD_OPTIONS.values()).index(DEFAULT_PEAK_METHOD),
+                                        key=f"peak_method_{st.session_state['role']}",
+                                        help="Pan-Tompkins passt die Schwelle automatisch an das Signal an. 'Schwellwert' verwendet die feste Peak-Schwelle."
+                                    )
+                                    peak_method = PEAK_METHOD_OPTIONS[peak_method_label]
                                     height_input = st.number_input(
                                         "Peak-Schwelle",
                                         min_value=0.0,
@@ -358,17 +376,26 @@ if st.session_state["is_logged_in"]:
                                         step=1.0,
                                         format="%.1f",
                                         key=f"height_input_{st.session_state['role']}_{selected_id}",
+                                        disabled=peak_method != "threshold",
                                         help="Schwellwert für Ausschläge in der Peak-Erkennung (Standard: 350). Dieser Wert kann an 'raw' oder skalierte EKG-Dateien angepasst werden."
                                     )
+                            with col2_peak:
+                                render_label = st.selectbox(
+                                    "Darstellungsmodus",
+                                    list(RENDER_MODE_OPTIONS.keys()),
+                                    key=f"render_mode_{st.session_state['role']}",
+                                    help="WebGL bleibt auch bei langen Zeitbereichen flüssig. 'Automatisch' wechselt ab 20.000 Messwerten im Zeitbereich zu WebGL."
+                                )
+                                ekg.render_mode = RENDER_MODE_OPTIONS[render_label]
                             # Wichtig: detect_peaks_globally() muss vor detect_rr_anomalies() aufgerufen werden!
-                            ekg.detect_peaks_globally(height=height_input)
-                            if not ekg.peaks:
-                                st.warning("⚠️ Es wurden keine Peaks erkannt. Bitte einen niedrigeren Wert für die Höhe eingeben.")
-                            if ekg.peaks:
+                            ekg.detect_peaks_globally(height=height_input, method=peak_method)
+                            if not len(ekg.peaks):
+                                st.warning(f"⚠️ Es wurden keine Peaks erkannt. {PEAK_METHOD_HINTS[peak_method]}")
+                            if len(ekg.peaks):
                                 try:
                                     ekg.detect_rr_anomalies()
                                 except ValueError:
-                                    st.info("⚠️ Für diese Einstellungen konnten keine verwertbaren EKG-Daten erkannt werden. Bitte den Wert für die Peak-Erkennung anpassen.")
+                                    st.info(f"⚠️ Für diese Einstellungen konnten keine verwertbaren EKG-Daten erkannt werden. {PEAK_METHOD_HINTS[peak_method]}")
                             else:
                                 st.info("Keine Peaks erkannt – Anomalie-Erkennung wird übersprungen.")
                             # Herzfrequenz erst nach Peak-Erkennung schätzen!
@@ -376,6 +403,9 @@ if st.session_state["is_logged_in"]:
                             ekg.plot_time_series()
                             hr_fig = ekg.plot_hr_over_time()
                         # Graphen werden jetzt unterhalb der Columns angezeigt, daher hier nur vorbereiten
+                    if ekg is not None:
+                        with col1:
+                            show_analysis_exports(person, selected_test, ekg, "admin")
                     # --- Graphen unterhalb der Columns in voller Breite darstellen (analog User) ---
                     if ekg is not None:
                         st.plotly_chart(ekg.fig, use_container_width=True, height=400, key="plot_admin_fig")
@@ -406,10 +436,8 @@ if st.session_state["is_logged_in"]:
                                 if not all([edit_firstname.strip(), edit_lastname.strip(), edit_username.strip()]):  # Passwort ist jetzt optional
                                     st.error("❌ Bitte füllen Sie alle Felder aus.")
                                 else:
-                                    db = TinyDB(DB_PATH)
-                                    query = Query()
-                                    all_users = db.all()
-                                    if any(u.get("username", "").lower() == edit_username.strip().lower() and u.get("username") != person.username for u in all_users):
+                                    existing_user = get_person_repository().get_by_username(edit_username)
+                                    if existing_user is not None and existing_user.id != person.id:
                                         st.error("❌ Dieser Benutzername ist bereits vergeben.")
                                     else:
                                         picture_path = person.picture_path
@@ -439,20 +467,18 @@ if st.session_state["is_logged_in"]:
                                             updated_data["password"] = bcrypt.hashpw(edit_password.encode(), bcrypt.gensalt()).decode()
                                         else:
                                             updated_data["password"] = person.password
-                                        db.update(updated_data, query.username == person.username)
+                                        get_person_repository().update(person.id, updated_data)
                                         st.success("✅ Personendaten aktualisiert.")
                                         st.rerun()
 
                         with st.expander("🗑️ Person löschen"):
                             if st.button("Diese Person löschen"):
-                                db = TinyDB(DB_PATH)
-                                query = Query()
-                                db.remove(query.username == person.username)
+                                get_person_repository().delete(person.id)
                                 st.success("✅ Person wurde gelöscht.")
                                 st.rerun()
 
                         with st.expander("📤 EKG-Daten hochladen"):
-                            ekg_file = st.file_uploader("EKG-Datei im .txt-Format", type=["txt"], key="ekg_upload")
+                            ekg_file = st.file_uploader("EKG-Datei im .txt-Format", type=["txt", FORMAT_EXTENSION.lstrip(".")], key="ekg_upload")
                             ekg_date = st.date_input("Datum des EKG-Tests", value=datetime.date.today())
 
                             if st.button("EKG hochladen"):
@@ -460,26 +486,42 @@ if st.session_state["is_logged_in"]:
                                     import uuid, os
                                     os.makedirs(EKG_DATA_DIR, exist_ok=True)
                                     ekg_id = str(uuid.uuid4())
-                                    filename = f"{ekg_id}.txt"
+                                    extension = FORMAT_EXTENSION if ekg_file.name.endswith(FORMAT_EXTENSION) else ".txt"
+                                    filename = f"{ekg_id}{extension}"
                                     file_path = os.path.join(EKG_DATA_DIR, filename)
 
                                     with open(file_path, "wb") as f:
                                         f.write(ekg_file.read())
 
-                                    db = TinyDB(DB_PATH)
-                                    query = Query()
-                                    db_user = db.get(query.username == person.username)
-                                    existing_tests = db_user.get("ekg_tests", [])
-                                    existing_tests.append({
-                                        "id": ekg_id,
-                                        "date": ekg_date.strftime("%d.%m.%Y")
-                                    })
-                                    db.update({"ekg_tests": existing_tests}, query.username == person.username)
-
-                                    st.success("✅ EKG-Datei erfolgreich hochgeladen.")
+                                    # Datei prüfen, bevor der Test angelegt wird (ungültige Dateien erscheinen nicht in der Auswahl)
+                                    try:
+                                        validate_upload(file_path)
+                                    except (OSError, ValueError) as error:
+                                        os.remove(file_path)
+                                        st.error(f"❌ Die Datei kann nicht verwendet werden: {error}")
+                                    else:
+                                        get_person_repository().add_ekg_test(person.id, {
+                                            "id": ekg_id,
+                                            "date": ekg_date.strftime("%d.%m.%Y")
+                                        })
+
+                                        # Umwandlung ins kompakte Format, Pyramide und Standardanalyse im Hintergrund vorbereiten
+                                        get_preprocessor().submit(ekg_id, file_path)
+                                        st.success("✅ EKG-Datei erfolgreich hochgeladen. Die Analyse wird im Hintergrund vorbereitet.")
                                 else:
                                     st.error("❌ Bitte wählen Sie eine gültige Datei aus.")
 
+                            # Stand der Vorverarbeitung der in dieser Sitzung hochgeladenen Tests
+                            current_tests = (get_person_repository().get_by_id(person.id) or person).ekg_tests
+                            pending_jobs = [(t, get_preprocessor().status(t["id"])) for t in current_tests]
+                            pending_jobs = [(t, job) for t, job in pending_jobs if job is not None]
+                            if pending_jobs:
+                                st.markdown("**Vorverarbeitung**")
+                                for test, job in pending_jobs:
+                                    st.write(f"Test am {test['date']}: {job.label}")
+                                if any(job.state in ("queued", "running") for _, job in pending_jobs):
+                                    st.button("🔄 Status aktualisieren", key="refresh_preprocessing")
+
                         with st.expander("🗑️ EKG-Test löschen"):
                             if person.ekg_tests:
                                 ekg_options_delete = {f"Test {i+1} am {t['date']}": t["id"] for i, t in enumerate(person.ekg_tests)}
@@ -487,16 +529,10 @@ if st.session_state["is_logged_in"]:
                                 selected_id_delete = ekg_options_delete[selected_label_delete]
 
                                 if st.button("EKG-Test löschen"):
-                                    import os
-                                    ekg_file_path = os.path.join(EKG_DATA_DIR, f"{selected_id_delete}.txt")
-                                    if os.path.exists(ekg_file_path):
-                                        os.remove(ekg_file_path)
+                                    # Rohdaten, Cache-Dateien und gespeicherte Analyseergebnisse entfernen
+                                    delete_recording(selected_id_delete, EKG_DATA_DIR)
 
-                                    db = TinyDB(DB_PATH)
-                                    query = Query()
-                                    user_entry = db.get(query.username == person.username)
-                                    updated_ekgs = [t for t in user_entry.get("ekg_tests", []) if t["id"] != selected_id_delete]
-                                    db.update({"ekg_tests": updated_ekgs}, query.username == person.username)
+                                    get_person_repository().remove_ekg_test(person.id, selected_id_delete)
 
                                     st.success("✅ EKG-Test erfolgreich gelöscht.")
                                     st.rerun()
@@ -528,22 +564,19 @@ if st.session_state["is_logged_in"]:
                 submitted = st.form_submit_button("Anlegen")
 
                 if submitted:
-                    from tinydb import TinyDB
                     import uuid
                     import os
-                    db = TinyDB(DB_PATH)
+                    repository = get_person_repository()
 
                     if not all([firstname.strip(), lastname.strip(), username.strip(), password.strip()]) or birth_year is None:
                         st.error("❌ Bitte füllen Sie alle Felder aus.")
                     else:
-                        existing_usernames = [user.get("username", "").lower() for user in db.all()]
-                        if username.strip().lower() in existing_usernames:
+                        if repository.get_by_username(username) is not None:
                             st.error("❌ Dieser Benutzername ist bereits vergeben. Bitte wähle einen anderen.")
                         else:
-                            existing_ids = {user["id"] for user in db.all() if "id" in user}
                             while True:
                                 user_id = uuid.uuid4().hex[:8]
-                                if user_id not in existing_ids:
+                                if repository.get_by_id(user_id) is None:
                                     break
                             picture_path = f"{PROFILE_PIC_DIR}/{user_id}.jpg"
 
@@ -561,7 +594,7 @@ if st.session_state["is_logged_in"]:
                             else:
                                 picture_path = f"{PROFILE_PIC_DIR}/none.jpg"
 
-                            db.insert({
+                            repository.insert({
                                 "id": user_id,
                                 "firstname": firstname,
                                 "lastname": lastname,
@@ -575,7 +608,10 @@ if st.session_state["is_logged_in"]:
                             st.success("✅ Neue Person erfolgreich hinzugefügt.")
     elif st.session_state["role"] == "user":
         # User-Bereich: Eigenes Profil und EKG-Analyse
+        # Aktuellen Stand aus dem Personenverzeichnis holen (z. B. nach einem EKG-Upload durch einen Admin)
         person = st.session_state["current_user"]
+        if person is not None:
+            person = get_person_repository().get_by_id(person.id) or person
         if st.button("Logout", key="user_logout"):
             reset_session()
             st.rerun()
@@ -592,153 +628,9 @@ if st.session_state["is_logged_in"]:
                 st.markdown(f"**Geburtsjahr:** {person.date_of_birth}")
                 st.markdown(f"**Maximale Herzfrequenz (geschätzt):** {person.calc_max_heart_rate()} bpm")
 
-                # PDF Export Option für User (direkt nach Personendaten)
-                ekg_tests = person.ekg_tests
-                ekg_options = {}
-                if ekg_tests and len(ekg_tests) > 0:
-                    ekg_options = {f"Test {i+1} am {t['date']}": t["id"] for i, t in enumerate(ekg_tests)}
-
-                selected_label = st.session_state.get("ekg_select_user")
-
-                if ekg_options:
-                    if not selected_label or selected_label not in ekg_options:
-                        selected_label = list(ekg_options.keys())[0]
-                else:
-                    selected_label = None
-
-                if selected_label:
-                    selected_id = ekg_options[selected_label]
-                    selected_test = next(test for test in ekg_tests if test["id"] == selected_id)
-                    user_data = [person]
-                    ekg = EKGdata.load_by_id(selected_id, user_data)
-                    ekg.detect_peaks_globally()
-                    ekg.detect_rr_anomalies()
-                    min_ms = int(ekg.df["Zeit in ms"].min())
-                    max_ms = int(ekg.df["Zeit in ms"].max())
-                    slider_key = "slider_user"
-                    # CSV-Export des gewählten EKG-Zeitbereichs (direkt nach Auswahl des Zeitbereichs)
-                    if ekg.df is not None and not ekg.df.empty:
-                        # set_time_range falls Slider gesetzt, sonst unverändert
-                        if slider_key in st.session_state:
-                            time_range = st.session_state[slider_key]
-                            ekg.set_time_range(time_range)
-                        csv = ekg.df.to_csv(index=False).encode("utf-8")
-                        st.download_button(
-                            label="📥 CSV des gewählten Zeitbereichs herunterladen",
-                            data=csv,
-                            file_name=f"{person.username}_{selected_test['date'].replace('.', '-')}_auswahl.csv",
-                            mime="text/csv",
-                            key="csv_user_download"
-                        )
-                    if st.button("📝 Analyse-Zusammenfassung als PDF erstellen", key="pdf_user_button"):
-                        from fpdf import FPDF
-                        import os
-
-                        # Plotly-Figur des EKGs als PNG erzeugen (mit Fehlerbehandlung)
-                        import plotly.io as pio
-                        fig = ekg.plot_time_series()
-                        export_dir = "exports"
-                        os.makedirs(export_dir, exist_ok=True)
-                        png_path = os.path.join(export_dir, f"{person.username}_ekg_snapshot.png")
-                        image_inserted = False
-                        try:
-                            fig.write_image(png_path, format="png", engine="kaleido")
-                            image_inserted = True
-                        except Exception:
-                            image_inserted = False
-
-                        class PDF(FPDF):
-                            def header(self):
-                                self.set_font("Arial", "B", 12)
-                                self.cell(0, 10, "EKG-Analyse-Zusammenfassung", ln=True, align="C")
-                                self.ln(10)
-
-                        pdf = PDF()
-                        pdf.add_page()
-
-                        # Profilbild links oben
-                        try:
-                            pdf.image(person.picture_path, x=10, y=15, w=30)
-                        except Exception:
-                            pass
-
-                        # Zeilenumbruch nach Bild, damit kein Text auf dem Bild steht
-                        pdf.ln(35)
-
-                        # Alle Personendaten unter dem Bild
-                        pdf.set_font("Arial", "B", 14)
-                        pdf.cell(0, 10, f"Name: {person.get_full_name()}", ln=True)
-                        pdf.set_font("Arial", "", 12)
-                        pdf.cell(0, 10, f"ID: {person.id}", ln=True)
-                        pdf.cell(0, 10, f"Geburtsjahr: {person.date_of_birth}", ln=True)
-
-                        # Testdatum und Herzfrequenz
-                        pdf.set_font("Arial", "", 12)
-                        pdf.cell(0, 8, f"Testdatum: {selected_test['date']}", ln=1)
-                        pdf.cell(0, 8, f"Maximale Herzfrequenz (geschätzt): {person.calc_max_heart_rate()} bpm", ln=1)
-                        estimated_hr_val = round(ekg.estimate_hr()) if hasattr(ekg, "estimate_hr") else "-"
-                        pdf.cell(0, 8, f"Geschätzte Herzfrequenz: {estimated_hr_val} bpm", ln=1)
-                        pdf.cell(0, 8, f"Gesamtdauer der Messung: {ekg.get_duration_str()}", ln=1)
-
-                        try:
-                            start_ms = ekg.df["Zeit in ms"].min()
-                            end_ms = ekg.df["Zeit in ms"].max()
-                            range_duration_sec = (end_ms - start_ms) / 1000
-                            r_min = int(range_duration_sec // 60)
-                            r_sec = int(range_duration_sec % 60)
-                            range_str = f"{r_min} Minuten und {r_sec} Sekunden"
-                            pdf.cell(0, 8, f"Dauer des gewählten Zeitbereichs: {range_str}", ln=1)
-                        except Exception:
-                            pdf.cell(0, 8, f"Dauer des gewählten Zeitbereichs: nicht verfügbar", ln=1)
-
-                        pdf.cell(0, 8, "EKG-Zeitreihe auf der nächsten Seite", ln=1)
-
-                        # Anzahl erkannter Peaks
-                        num_peaks = len(ekg.peaks) if hasattr(ekg, "peaks") else "-"
-                        pdf.cell(0, 8, f"Anzahl erkannter globaler Peaks (Herzschläge): {num_peaks}", ln=1)
-
-                        pdf.ln(5)
-
-                        # Anomalien (sichtbar im gewählten Bereich)
-                        visible_anomalies = ekg.get_visible_rr_anomalies()
-                        pdf.set_font("Arial", "B", 12)
-                        pdf.cell(0, 8, f"Anomalien: {len(visible_anomalies)} erkannt (im ausgewählten Bereich)", ln=1)
-                        pdf.set_font("Arial", "", 10)
-
-                        if visible_anomalies:
-                            col_width = 60
-                            items_per_row = 3
-                            for i, a in enumerate(visible_anomalies):
-                                art = "Ausreißer hoch" if a > 2000 else "Ausreißer tief" if a < 400 else "Ausreißer"
-                                text = f"{i+1}. {a} ms ({art})"
-                                pdf.cell(col_width, 8, text, ln=False)
-                                if (i + 1) % items_per_row == 0:
-                                    pdf.ln(8)
-                            if len(visible_anomalies) % items_per_row != 0:
-                                pdf.ln(8)
-                        else:
-                            pdf.cell(0, 8, "Keine Anomalien im gewählten Bereich", ln=1)
-
-                        # Neue Seite für EKG-Bild
-                        pdf.add_page()
-
-                        page_width = pdf.w - 2 * pdf.l_margin
-                        if image_inserted:
-                            try:
-                                pdf.image(png_path, x=pdf.l_margin, y=pdf.get_y(), w=page_width)
-                                pdf.ln(90)
-                            except Exception:
-                                pdf.cell(0, 10, "Das EKG-Bild konnte nicht angezeigt werden.", ln=1)
-                        else:
-                            pdf.cell(0, 10, "Das EKG-Bild konnte nicht eingefügt werden.", ln=1)
-
-                        pdf_path = os.path.join(export_dir, f"{person.username}_analyse.pdf")
-                        pdf.output(pdf_path)
-
-                        with open(pdf_path, "rb") as f:
-                            st.download_button("📄 PDF herunterladen", data=f, file_name=f"{person.username}_analyse.pdf", mime="application/pdf")
-                else:
+                if not person.ekg_tests:
                     st.info("Keine EKG-Daten für diese Person vorhanden.")
+                # Exporte folgen nach der Analyse in der rechten Spalte (gleiche Einstellungen wie die Anzeige)
 
             # --- Rechte Spalte: Analyseoptionen (Visualisierungsteil bleibt hier!) ---
             with col2:
@@ -755,61 +647,82 @@ if st.session_state["is_logged_in"]:
                     if selected_label:
                         selected_id = ekg_options[selected_label]
                         selected_test = next(test for test in ekg_tests if test["id"] == selected_id)
-                        user_data = [person]
-                        ekg = EKGdata.load_by_id(selected_id, user_data)
-                        min_ms = int(ekg.df["Zeit in ms"].min())
-                        max_ms = int(ekg.df["Zeit in ms"].max())
-                        default_end = min(min_ms + 10000, max_ms)
-
-                        st.write("#### Analyse gesamter Messdaten")
-                        st.write("Länge der Zeitreihe:", ekg.get_duration_str())
-                        if ekg.time_was_corrected:
-                            st.warning("Hinweis: In der ausgewählten EKG-Datei wurden fehlerhafte Zeitstempel erkannt. Diese wurden automatisch korrigiert. Die Ergebnisse können dennoch Ungenauigkeiten enthalten.")
-
-                        st.markdown("### 📉 Visualisierung")
-                        st.write("#### Zeitbereich für Analyse auswählen")
-                        time_range = st.slider("Analyse-Zeitraum (ms)",
-                            min_value=min_ms,
-                            max_value=max_ms,
-                            value=(min_ms, default_end),
-                            step=1000,
-                            key="slider_user")
-                        ekg.set_time_range(time_range)
-                        st.write("#### Peak-Erkennung anpassen")
-                        with st.container():
-                            peak_col1, peak_col2 = st.columns([1, 4])
-                            with peak_col1:
-                                height_input = st.number_input(
-                                    "Peak-Schwelle",
-                                    min_value=0.0,
-                                    max_value=2000.0,
-                                    value=350.0,
-                                    step=1.0,
-                                    format="%.1f",
-                                    key=f"height_input_{st.session_state['role']}_{selected_id}",
-                                    help="Schwellwert für Ausschläge in der Peak-Erkennung (Standard: 350). Dieser Wert kann an 'raw' oder skalierte EKG-Dateien angepasst werden."
+                        ekg = load_ekg(selected_id)
+                        if ekg is not None:
+                            min_ms = ekg.min_time
+                            max_ms = ekg.max_valid_time
+                            default_end = min(min_ms + 10000, max_ms)
+
+                            st.write("#### Analyse gesamter Messdaten")
+                            st.write("Länge der Zeitreihe:", ekg.get_duration_str())
+                            if ekg.time_was_corrected:
+                                st.warning("Hinweis: In der ausgewählten EKG-Datei wurden fehlerhafte Zeitstempel erkannt. Diese wurden automatisch korrigiert. Die Ergebnisse können dennoch Ungenauigkeiten enthalten.")
+
+                            st.markdown("### 📉 Visualisierung")
+                            st.write("#### Zeitbereich für Analyse auswählen")
+                            time_range = st.slider("Analyse-Zeitraum (ms)",
+                                min_value=min_ms,
+                                max_value=max_ms,
+                                value=(min_ms, default_end),
+                                step=1000,
+                                key="slider_user")
+                            ekg.set_time_range(time_range)
+                            st.write("#### Peak-Erkennung anpassen")
+                            with st.container():
+                                peak_col1, peak_col2 = st.columns([1, 4])
+                                with peak_col1:
+                                    peak_method_label = st.selectbox(
+                                        "Peak-Detektor",
+                                        list(PEAK_METHOD_OPTIONS.keys()),
+                                        index=list(PEAK_METHOD_OPTIONS.values()).index(DEFAULT_PEAK_METHOD),
+                                        key=f"peak_method_{st.session_state['role']}",
+                                        help="Pan-Tompkins passt die Schwelle automatisch an das Signal an. 'Schwellwert' verwendet die feste Peak-Schwelle."
+                                    )
+                                    peak_method = PEAK_METHOD_OPTIONS[peak_method_label]
+                                    height_input = st.number_input(
+                                        "Peak-Schwelle",
+                                        min_value=0.0,
+                                        max_value=2000.0,
+                                        value=350.0,
+                                        step=1.0,
+                                        format="%.1f",
+                                        key=f"height_input_{st.session_state['role']}_{selected_id}",
+                                        disabled=peak_method != "threshold",
+                                        help="Schwellwert für Ausschläge in der Peak-Erkennung (Standard: 350). Dieser Wert kann an 'raw' oder skalierte EKG-Dateien angepasst werden."
+                                    )
+                            with peak_col2:
+                                render_label = st.selectbox(
+                                    "Darstellungsmodus",
+                                    list(RENDER_MODE_OPTIONS.keys()),
+                                    key=f"render_mode_{st.session_state['role']}",
+                                    help="WebGL bleibt auch bei langen Zeitbereichen flüssig. 'Automatisch' wechselt ab 20.000 Messwerten im Zeitbereich zu WebGL."
                                 )
-                        # Wichtig: detect_peaks_globally() muss vor detect_rr_anomalies() aufgerufen werden!
-                        ekg.detect_peaks_globally(height=height_input)
-                        if not ekg.peaks:
-                            st.warning("⚠️ Es wurden keine Peaks erkannt. Bitte einen niedrigeren Wert für die Höhe eingeben.")
-                        if ekg.peaks:
-                            try:
-                                ekg.detect_rr_anomalies()
-                            except ValueError:
-                                st.info("⚠️ Für diese Einstellungen konnten keine verwertbaren EKG-Daten erkannt werden. Bitte den Wert für die Peak-Erkennung anpassen.")
-                        else:
-                            st.info("Keine Peaks erkannt – Anomalie-Erkennung wird übersprungen.")
-                        # Herzfrequenz erst nach Peak-Erkennung schätzen!
-                        estimated_hr = ekg.estimate_hr()
-                        ekg.plot_time_series()
-                        # Graphen werden jetzt unterhalb der Columns angezeigt, daher hier nur vorbereiten
-                        hr_fig = ekg.plot_hr_over_time()
+                                ekg.render_mode = RENDER_MODE_OPTIONS[render_label]
+                            # Wichtig: detect_peaks_globally() muss vor detect_rr_anomalies() aufgerufen werden!
+                            ekg.detect_peaks_globally(height=height_input, method=peak_method)
+                            if not len(ekg.peaks):
+                                st.warning(f"⚠️ Es wurden keine Peaks erkannt. {PEAK_METHOD_HINTS[peak_method]}")
+                            if len(ekg.peaks):
+                                try:
+                                    ekg.detect_rr_anomalies()
+                                except ValueError:
+                                    st.info(f"⚠️ Für diese Einstellungen konnten keine verwertbaren EKG-Daten erkannt werden. {PEAK_METHOD_HINTS[peak_method]}")
+                            else:
+                                st.info("Keine Peaks erkannt – Anomalie-Erkennung wird übersprungen.")
+                            # Herzfrequenz erst nach Peak-Erkennung schätzen!
+                            estimated_hr = ekg.estimate_hr()
+                            ekg.plot_time_series()
+                            # Graphen werden jetzt unterhalb der Columns angezeigt, daher hier nur vorbereiten
+                            hr_fig = ekg.plot_hr_over_time()
                     else:
                         st.info("❕ Keine EKG-Daten für diese Person vorhanden.")
                 else:
                     st.info("Keine EKG-Daten für diese Person verfügbar.")
 
+            if ekg is not None:
+                with col1:
+                    show_analysis_exports(person, selected_test, ekg, "user")
+
             # --- Graphen unterhalb der Columns in voller Breite darstellen ---
             if ekg is not None:
                 st.plotly_chart(ekg.fig, use_container_width=True, height=400, key="plot_user_fig")
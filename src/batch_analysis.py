@@ -0,0 +1,162 @@
+# Modul für die Stapelanalyse aller EKG-Tests der Personendatenbank (Kommandozeile, Prozess-Pool)
+#
+# Aufruf aus dem Projektverzeichnis:
+#     python -m src.batch_analysis [--method pan_tompkins] [--height 350] [--threshold-ms 300]
+#                                  [--workers N] [--output exports/batch_analysis.csv|.json]
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from . import peak_detection
+from .ekgdata import EKGdata
+from .ekg_format import ekg_source_path
+from .peak_detection import PEAK_METHODS, DEFAULT_PEAK_METHOD
+from .person_repository import get_person_repository
+
+# Standardausgabe der Zusammenfassung (Format nach Dateiendung: .csv oder .json)
+DEFAULT_OUTPUT = "exports/batch_analysis.csv"
+
+# Spalten der Zusammenfassung in Ausgabereihenfolge
+SUMMARY_COLUMNS = [
+    "person_id", "name", "test_id", "date", "status", "error", "samples", "duration_s", "peaks", "anomalies",
+    "hr_bpm", "load_s", "peaks_s", "anomalies_s", "hr_s", "total_s", "cpu_s", "worker",
+]
+
+
+def collect_tests(persons=None):
+    # Gibt alle EKG-Tests der Datenbank als Liste von Aufträgen zurück (Person, Test-ID, Datum).
+    if persons is None:
+        persons = get_person_repository().all()
+    return [
+        {"person_id": person.id, "name": person.get_full_name(), "test_id": test["id"], "date": test.get("date", "")}
+        for person in persons
+        for test in person.ekg_tests
+    ]
+
+
+def _file_size(task):
+    # Gibt die Größe der Rohdatei eines Auftrags zurück (0, falls sie fehlt).
+    try:
+        return os.path.getsize(ekg_source_path(task["test_id"]))
+    except OSError:
+        return 0
+
+
+def _init_worker():
+    # Initialisiert einen Worker: keine zusätzlichen Prozesse für die Maximumsuche (die Kerne sind bereits belegt).
+    peak_detection.PEAK_WORKERS = 1
+
+
+def analyse_test(task, method=DEFAULT_PEAK_METHOD, height=None, threshold_ms=300):
+    # Führt die Analyse eines EKG-Tests aus (Laden, Peaks, RR-Anomalien, Herzfrequenz) und misst jeden Schritt.
+    # Gibt eine Zeile der Zusammenfassung zurück; Fehler werden vermerkt statt ausgelöst.
+    # total_s ist die Laufzeit (Wanduhr), cpu_s die CPU-Zeit des Worker-Prozesses für diesen Test.
+    row = dict(task, status="ok", error="", worker=os.getpid())
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        step = time.perf_counter()
+        ekg = EKGdata({"id": task["test_id"], "date": task["date"]})
+        row["load_s"] = time.perf_counter() - step
+        row["samples"] = len(ekg.signal)
+        row["duration_s"] = ekg.duration_seconds
+
+        step = time.perf_counter()
+        ekg.detect_peaks_globally(height=height, method=method)
+        row["peaks_s"] = time.perf_counter() - step
+        row["peaks"] = len(ekg.peaks)
+
+        if len(ekg.peaks) >= 2:
+            step = time.perf_counter()
+            ekg.detect_rr_anomalies(threshold_ms)
+            row["anomalies_s"] = time.perf_counter() - step
+            row["anomalies"] = len(ekg.rr_anomaly_indices)
+
+            step = time.perf_counter()
+            row["hr_bpm"] = ekg.estimate_hr()
+            row["hr_s"] = time.perf_counter() - step
+        else:
+            row["status"] = "error"
+            row["error"] = "Nicht genügend Peaks zur Berechnung der Herzfrequenz."
+    except Exception as error:
+        row["status"] = "error"
+        row["error"] = f"{type(error).__name__}: {error}"
+    row["total_s"] = time.perf_counter() - started
+    row["cpu_s"] = time.process_time() - cpu_started
+    return row
+
+
+def run_batch(tasks, method=DEFAULT_PEAK_METHOD, height=None, threshold_ms=300, workers=None, progress=None):
+    # Analysiert alle Aufträge parallel in einem Prozess-Pool und gibt die Zeilen in Auftragsreihenfolge zurück.
+    # progress(erledigt, gesamt, zeile) wird nach jedem abgeschlossenen Test aufgerufen.
+    # Große Aufnahmen werden zuerst vergeben, damit am Ende keine einzelne lange Analyse allein läuft.
+    workers = workers or os.cpu_count() or 1
+    rows = [None] * len(tasks)
+    order = sorted(range(len(tasks)), key=lambda position: _file_size(tasks[position]), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(analyse_test, tasks[position], method, height, threshold_ms): position
+            for position in order
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            rows[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(tasks), rows[futures[future]])
+    return rows
+
+
+def write_summary(rows, output_path, parameters, wall_time):
+    # Schreibt die Zusammenfassung als CSV (eine Zeile je Test) oder JSON (mit Parametern und Gesamtzeiten).
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    table = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    if output_path.endswith(".json"):
+        summary = {
+            "parameters": parameters,
+            "tests": len(rows),
+            "failed": int((table["status"] != "ok").sum()),
+            "wall_time_s": wall_time,
+            "cpu_time_s": float(table["cpu_s"].sum()),
+            "tests_per_s": len(rows) / wall_time if wall_time > 0 else None,
+        }
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": json.loads(table.to_json(orient="records", double_precision=15))}, f, indent=2)
+    else:
+        table.to_csv(output_path, index=False)
+
+
+def main(argv=None):
+    # Kommandozeilen-Einstieg: alle Tests analysieren und die Zusammenfassung schreiben.
+    parser = argparse.ArgumentParser(description="Analysiert alle EKG-Tests der Personendatenbank.")
+    parser.add_argument("--method", choices=PEAK_METHODS, default=DEFAULT_PEAK_METHOD, help="Peak-Detektor")
+    parser.add_argument("--height", type=float, default=None, help="Schwellwert für method=threshold (Standard 350)")
+    parser.add_argument("--threshold-ms", type=float, default=300, help="RR-Intervall, unter dem eine Anomalie vorliegt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Anzahl paralleler Prozesse")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Ausgabedatei (.csv oder .json)")
+    args = parser.parse_args(argv)
+
+    tasks = collect_tests()
+    print(f"{len(tasks)} EKG-Tests, {args.workers} Prozesse", file=sys.stderr)
+
+    def progress(done, total, row):
+        print(f"[{done}/{total}] {row['test_id']} {row['status']} {row['total_s']:.2f} s", file=sys.stderr)
+
+    started = time.perf_counter()
+    rows = run_batch(tasks, args.method, args.height, args.threshold_ms, args.workers, progress)
+    wall_time = time.perf_counter() - started
+
+    parameters = {"method": args.method, "height": args.height, "threshold_ms": args.threshold_ms, "workers": args.workers}
+    write_summary(rows, args.output, parameters, wall_time)
+    failed = sum(row["status"] != "ok" for row in rows)
+    rate = len(rows) / wall_time if wall_time > 0 else 0
+    print(f"{len(rows)} Tests in {wall_time:.1f} s ({rate:.1f} Tests/s), {failed} fehlgeschlagen -> {args.output}",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
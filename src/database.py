@@ -1,48 +1,213 @@
-# Modul zur Verwaltung von Personendaten in einer TinyDB-Datenbank
-from tinydb import TinyDB, Query
-from tinydb.storages import JSONStorage
-from tinydb.middlewares import CachingMiddleware
+# Modul zur Verwaltung von Personendaten mit austauschbarem Speicher-Backend (SQLite oder TinyDB)
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from .sqlite_storage import SQLiteStorage
+from .db_writer import DatabaseWriter
 
-# Initialisierung der TinyDB-Datenbank und Zugriff auf die Standard-Tabelle (_default)
-db = TinyDB("data/tinydb_person_db.json", storage=CachingMiddleware(JSONStorage))
-personen_table = db  # Verwende Standard-Tabelle (_default)
+try:
+    import fcntl
+except ImportError:  # Windows: Schreibzugriffe werden nur innerhalb des Prozesses serialisiert
+    fcntl = None
 
-# Zugriff auf die Datenbankabfrage-API
-PersonQuery = Query()
+# Pfad der bisherigen TinyDB-Datei (Quelle der einmaligen Migration)
+DB_PATH = "data/tinydb_person_db.json"
+
+# Pfad der SQLite-Datenbank
+SQLITE_PATH = "data/person_db.sqlite3"
+
+# Speicher-Backend, über Umgebungsvariable wählbar: "sqlite" (Standard) oder "tinydb"
+DB_BACKEND = os.environ.get("EKG_DB_BACKEND", "sqlite")
+
+
+class TinyDBStorage:
+    # Speicher-Backend für die TinyDB-JSON-Datei (Format {"_default": {Dokument-ID: Eintrag}}).
+    # Änderungen werden gesammelt angewendet: Datei unter Dateisperre lesen, alle Änderungen im Speicher
+    # ausführen, in eine temporäre Datei schreiben und atomar umbenennen.
+
+    def __init__(self, path):
+        # Initialisiert das Backend; die Datei wird bei Bedarf angelegt.
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._cache = (None, {})  # (Änderungszeit, Tabelle) der zuletzt gelesenen Datei
+        self.last_write = (None, None)  # Revision vor und nach dem letzten eigenen Schreibvorgang
+
+    def _read_table(self):
+        # Liest die Tabelle _default (zwischengespeichert, solange sich die Datei nicht ändert).
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return {}
+        if self._cache[0] != mtime_ns:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read()
+            self._cache = (mtime_ns, json.loads(content).get("_default", {}) if content.strip() else {})
+        return self._cache[1]
+
+    @contextmanager
+    def _file_lock(self):
+        # Exklusive Dateisperre, damit mehrere Server-Prozesse nicht gleichzeitig schreiben.
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _find(self, table, person_id):
+        # Gibt die Dokument-ID der Person zurück oder None.
+        return next((doc_id for doc_id, person in table.items() if person.get("id") == person_id), None)
+
+    def all(self):
+        # Gibt alle Personen in Einfüge-Reihenfolge zurück.
+        table = self._read_table()
+        return [dict(table[doc_id]) for doc_id in sorted(table, key=int)]
+
+    def get_by_id(self, person_id):
+        # Gibt die Person mit dieser ID zurück oder None.
+        table = self._read_table()
+        doc_id = self._find(table, person_id)
+        return dict(table[doc_id]) if doc_id is not None else None
+
+    def get_by_username(self, username):
+        # Gibt die Person mit diesem Benutzernamen zurück oder None.
+        table = self._read_table()
+        return next((dict(table[doc_id]) for doc_id in sorted(table, key=int) if table[doc_id].get("username") == username), None)
+
+    def apply_batch(self, mutations):
+        # Führt eine Liste von Änderungen aus und schreibt die Datei einmal; gibt die Ergebnisse zurück.
+        # Die Revision vor und nach dem Schreiben wird unter der Dateisperre gelesen (last_write).
+        with self._file_lock():
+            before = self.revision()
+            self._cache = (None, {})  # unter der Sperre immer den aktuellen Dateistand lesen
+            table = {doc_id: dict(person) for doc_id, person in self._read_table().items()}
+            results = [getattr(self, f"_apply_{mutation[0]}")(table, *mutation[1:]) for mutation in mutations]
+            tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"_default": table}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.last_write = (before, self.revision())
+        return results
+
+    def _apply_insert(self, table, person_data):
+        # Fügt eine Person ein und gibt die Dokument-ID zurück.
+        doc_id = max((int(k) for k in table), default=0) + 1
+        table[str(doc_id)] = dict(person_data)
+        return doc_id
+
+    def _apply_update(self, table, person_id, updated_data):
+        # Aktualisiert die angegebenen Felder einer Person.
+        doc_id = self._find(table, person_id)
+        if doc_id is not None:
+            table[doc_id].update(updated_data)
+
+    def _apply_delete(self, table, person_id):
+        # Löscht eine Person.
+        doc_id = self._find(table, person_id)
+        if doc_id is not None:
+            del table[doc_id]
+
+    def _apply_add_ekg_test(self, table, person_id, ekg_test):
+        # Hängt einen EKG-Test an die Tests einer Person an.
+        doc_id = self._find(table, person_id)
+        if doc_id is not None:
+            table[doc_id]["ekg_tests"] = table[doc_id].get("ekg_tests", []) + [ekg_test]
+
+    def _apply_remove_ekg_test(self, table, person_id, ekg_id):
+        # Entfernt einen EKG-Test aus den Tests einer Person.
+        doc_id = self._find(table, person_id)
+        if doc_id is not None:
+            table[doc_id]["ekg_tests"] = [t for t in table[doc_id].get("ekg_tests", []) if t["id"] != ekg_id]
+
+    def revision(self):
+        # Gibt die Änderungszeit der Datei als Kennung des Datenstands zurück.
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+def create_storage(backend=DB_BACKEND):
+    # Erstellt das gewählte Backend; SQLite übernimmt beim ersten Start einmalig die Daten der JSON-Datei.
+    if backend == "tinydb":
+        return TinyDBStorage(DB_PATH)
+    if backend == "sqlite":
+        storage = SQLiteStorage(SQLITE_PATH)
+        storage.migrate_from_json(DB_PATH)
+        return storage
+    raise ValueError(f"Unbekanntes Datenbank-Backend: {backend}")
+
+
+_storage = None
+_writer = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    # Gibt das prozessweite Speicher-Backend zurück (wird beim ersten Zugriff geöffnet).
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+        return _storage
+
+
+def get_writer():
+    # Gibt den prozessweiten Schreib-Thread zurück, über den alle Änderungen laufen.
+    global _writer
+    storage = get_storage()
+    with _storage_lock:
+        if _writer is None:
+            _writer = DatabaseWriter(storage)
+        return _writer
 
 def get_all_persons():
     # Gibt alle Personen aus der Datenbank zurück.
-    return personen_table.all()
+    return get_storage().all()
 
 def find_person_by_id(person_id):
     # Sucht eine Person anhand der ID.
-    return personen_table.search(PersonQuery.id == person_id)
+    person = get_storage().get_by_id(person_id)
+    return [person] if person is not None else []
 
 def insert_person(person_data):
     # Fügt eine neue Person in die Datenbank ein.
-    personen_table.insert(person_data)
+    get_writer().execute(("insert", dict(person_data)))
 
 def update_person(person_id, updated_data):
-    # Aktualisiert die Daten einer Person anhand der ID.
-    existing = personen_table.get(PersonQuery.id == person_id)
-    if not existing:
-        return
-
-    # Fehlende Felder aus bestehendem Datensatz ergänzen (z. B. Passwort)
-    for key, value in existing.items():
-        if key not in updated_data:
-            updated_data[key] = value
-
-    personen_table.update(updated_data, PersonQuery.id == person_id)
+    # Aktualisiert die Daten einer Person anhand der ID (fehlende Felder, z. B. das Passwort, bleiben erhalten).
+    get_writer().execute(("update", person_id, dict(updated_data)))
 
 def delete_person(person_id):
     # Löscht eine Person anhand der ID aus der Datenbank.
-    personen_table.remove(PersonQuery.id == person_id)
+    get_writer().execute(("delete", person_id))
 
 def find_person_by_username(username):
     # Sucht eine Person anhand des Benutzernamens.
-    return personen_table.get(PersonQuery.username == username)
+    return get_storage().get_by_username(username)
 
 def insert_new_user(user_data):
     # Fügt einen neuen Benutzer in die Datenbank ein.
-    return personen_table.insert(user_data)
\ No newline at end of file
+    return get_writer().execute(("insert", dict(user_data)))
+
+def add_ekg_test(person_id, ekg_test):
+    # Fügt einer Person einen EKG-Test hinzu.
+    get_writer().execute(("add_ekg_test", person_id, dict(ekg_test)))
+
+def remove_ekg_test(person_id, ekg_id):
+    # Entfernt einen EKG-Test einer Person.
+    get_writer().execute(("remove_ekg_test", person_id, ekg_id))
+
+def get_revision():
+    # Gibt eine Kennung des Datenstands zurück; sie ändert sich bei jeder Änderung der Datenbank.
+    return get_storage().revision()
+
+def get_last_write():
+    # Gibt (Revision davor, Revision danach) des letzten Schreibvorgangs dieses Prozesses zurück.
+    return get_storage().last_write
@@ -0,0 +1,112 @@
+# Modul mit einem einzelnen Schreib-Thread für die Personendatenbank (serialisiert und bündelt Änderungen)
+import queue
+import threading
+from concurrent.futures import Future
+
+# Höchstzahl an Änderungen, die gemeinsam in einem Schreibvorgang übernommen werden
+MAX_BATCH_SIZE = 256
+
+
+def _person_of(mutation):
+    # Gibt die ID der Person zurück, die eine Änderung betrifft.
+    return mutation[1]["id"] if mutation[0] == "insert" else mutation[1]
+
+
+def coalesce(mutations):
+    # Fasst aufeinanderfolgende Feld-Updates derselben Person zu einem Update zusammen.
+    # Erwartet eine Liste von (Änderung, Future) und gibt eine Liste von (Änderung, [Futures]) zurück.
+    # Änderungen an verschiedenen Personen sind voneinander unabhängig; jede andere Änderung an derselben
+    # Person beendet die Zusammenfassung, damit die Reihenfolge je Person erhalten bleibt.
+    merged = []
+    open_update = {}  # Personen-ID -> Position des zusammenfassbaren Updates in merged
+    for mutation, future in mutations:
+        person_id = _person_of(mutation)
+        position = open_update.get(person_id)
+        if mutation[0] == "update" and position is not None:
+            previous, futures = merged[position]
+            merged[position] = (("update", person_id, {**previous[2], **mutation[2]}), futures + [future])
+            continue
+        open_update.pop(person_id, None)
+        merged.append((mutation, [future]))
+        if mutation[0] == "update":
+            open_update[person_id] = len(merged) - 1
+    return merged
+
+
+class DatabaseWriter:
+    # Nimmt Änderungen aller Sessions entgegen und führt sie in einem einzigen Thread aus.
+    # Was sich während eines Schreibvorgangs ansammelt, wird zusammengefasst und im nächsten Durchgang
+    # gemeinsam übernommen (eine Transaktion bzw. ein atomares Ersetzen der Datei).
+
+    def __init__(self, storage, max_batch_size=MAX_BATCH_SIZE):
+        # Initialisiert die Warteschlange; der Thread startet mit der ersten Änderung.
+        self.storage = storage
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.mutations = 0
+        self.coalesced = 0
+
+    def submit(self, mutation):
+        # Reiht eine Änderung ein und gibt ein Future mit ihrem Ergebnis zurück.
+        future = Future()
+        self._queue.put((mutation, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+        return future
+
+    def execute(self, mutation):
+        # Führt eine Änderung aus und wartet, bis sie gespeichert ist.
+        return self.submit(mutation).result()
+
+    def _run(self):
+        # Arbeitet die Warteschlange ab: erste Änderung abwarten, alle weiteren bis zur Höchstzahl mitnehmen.
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as error:
+                # Unerwarteter Fehler außerhalb der Speicherung (z. B. ungültige Änderung beim Zusammenfassen):
+                # offene Futures scheitern lassen, statt den Thread zu beenden und spätere Aufrufe warten zu lassen
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _flush(self, batch):
+        # Schreibt einen Stapel von Änderungen und setzt die Ergebnisse der zugehörigen Futures.
+        merged = coalesce(batch)
+        try:
+            results = self.storage.apply_batch([mutation for mutation, _ in merged])
+        except Exception:
+            # Schlägt der Stapel fehl, jede Änderung einzeln ausführen, damit nur die fehlerhafte scheitert
+            results = []
+            for mutation, futures in merged:
+                try:
+                    results.append(self.storage.apply_batch([mutation])[0])
+                except Exception as error:
+                    results.append(error)
+        for (_, futures), result in zip(merged, results):
+            for future in futures:
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        with self._lock:
+            self.batches += 1
+            self.mutations += len(batch)
+            self.coalesced += len(batch) - len(merged)
+
+    def stats(self):
+        # Gibt Kennzahlen des Schreib-Threads zurück.
+        with self._lock:
+            return {"batches": self.batches, "mutations": self.mutations, "coalesced": self.coalesced,
+                    "queued": self._queue.qsize()}
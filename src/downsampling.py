@@ -0,0 +1,110 @@
+# Modul für die Level-of-Detail-Reduktion von EKG-Signalen (Min/Max-Pyramide) zum Plotten
+import numpy as np
+
+# Zielanzahl an Punkten pro Plot (unabhängig vom gewählten Zeitbereich)
+TARGET_POINTS = 4000
+
+
+def _merge_pairs(values, min_idx, max_idx):
+    # Fasst je zwei benachbarte Bins zu einem zusammen (Minimum und Maximum bleiben erhalten).
+    n = len(min_idx)
+    even = n - n % 2
+    left_min, right_min = min_idx[0:even:2], min_idx[1:even:2]
+    left_max, right_max = max_idx[0:even:2], max_idx[1:even:2]
+    new_min = np.where(values[right_min] < values[left_min], right_min, left_min)
+    new_max = np.where(values[right_max] > values[left_max], right_max, left_max)
+    if n % 2:
+        # Ungerade Anzahl: letzter Bin bleibt allein
+        new_min = np.append(new_min, min_idx[-1])
+        new_max = np.append(new_max, max_idx[-1])
+    return new_min, new_max
+
+
+def _offset_dtype(level):
+    # Gibt den kleinsten Datentyp für Positionen innerhalb eines Bins der Stufe level zurück.
+    if level <= 8:
+        return np.uint8
+    if level <= 16:
+        return np.uint16
+    return np.uint32
+
+
+class MinMaxPyramid:
+    # Mehrstufige Min/Max-Hüllkurve eines Signals; Stufe k fasst jeweils 2**k Messwerte zusammen.
+    # Gespeichert werden nur die Positionen von Minimum und Maximum innerhalb jedes Bins (uint8 bis Stufe 8),
+    # damit Ausschläge (QRS) sichtbar bleiben. Stufe 1 wird nicht gespeichert: Sie liefert genauso viele
+    # Punkte wie das Originalsignal und wird daher nie gewählt.
+
+    def __init__(self, mv, ms, target_points=TARGET_POINTS):
+        # Baut alle Stufen auf, bis eine Stufe die gesamte Aufnahme mit höchstens target_points Punkten darstellt.
+        self.mv = np.asarray(mv)
+        self.ms = np.asarray(ms)
+        self.target_points = target_points
+        self.levels = [None]  # Stufe 0 = Originalsignal; je weitere Stufe (Minimum-, Maximum-Positionen im Bin)
+        min_idx = max_idx = np.arange(len(self.mv), dtype=np.int32)
+        while len(min_idx) > max(1, target_points // 2):
+            min_idx, max_idx = _merge_pairs(self.mv, min_idx, max_idx)
+            level = len(self.levels)
+            if level == 1:
+                self.levels.append(None)
+                continue
+            bin_starts = np.arange(len(min_idx), dtype=np.int64) << level
+            dtype = _offset_dtype(level)
+            self.levels.append(((min_idx - bin_starts).astype(dtype), (max_idx - bin_starts).astype(dtype)))
+
+    @property
+    def nbytes(self):
+        # Gibt den Speicherbedarf der Index-Arrays aller Stufen zurück.
+        return sum(mins.nbytes + maxs.nbytes for mins, maxs in filter(None, self.levels))
+
+    def choose_level(self, sample_count, target_points=None):
+        # Wählt die feinste Stufe, die sample_count Messwerte mit höchstens target_points Punkten darstellt.
+        if target_points is None:
+            target_points = self.target_points
+        level = 0
+        points = sample_count
+        while points > target_points and level + 1 < len(self.levels):
+            level += 1
+            points = 2 * -(-sample_count // (1 << level))
+        # Stufe 1 (nicht gespeichert) hat ebenso viele Punkte wie das Originalsignal
+        return level if self.levels[level] is not None else 0
+
+    def _bounds(self, min_time, max_time):
+        # Bestimmt per binärer Suche die Indexgrenzen [start, end) des Zeitfensters.
+        start = int(np.searchsorted(self.ms, min_time, side="left"))
+        end = int(np.searchsorted(self.ms, max_time, side="right"))
+        return start, end
+
+    def sample_count(self, min_time, max_time):
+        # Gibt die Anzahl der Originalmesswerte im Zeitfenster zurück.
+        start, end = self._bounds(min_time, max_time)
+        return max(0, end - start)
+
+    def window(self, min_time, max_time, target_points=None):
+        # Gibt Zeit- und Messwerte für das Zeitfenster in passender Auflösung zurück.
+        start, end = self._bounds(min_time, max_time)
+        if end <= start:
+            return self.ms[0:0], self.mv[0:0]
+
+        level = self.choose_level(end - start, target_points)
+        if level == 0:
+            return self.ms[start:end], self.mv[start:end]
+
+        min_offsets, max_offsets = self.levels[level]
+        first_bin = start >> level
+        last_bin = ((end - 1) >> level) + 1
+        bin_starts = np.arange(first_bin, last_bin, dtype=np.int64) << level
+        mins = bin_starts + min_offsets[first_bin:last_bin]
+        maxs = bin_starts + max_offsets[first_bin:last_bin]
+        # Die Randbins ragen über das Fenster hinaus: dort Minimum und Maximum nur innerhalb [start, end) bestimmen
+        for i in {0, len(bin_starts) - 1}:
+            lo = max(int(bin_starts[i]), start)
+            hi = min(int(bin_starts[i]) + (1 << level), end)
+            segment = self.mv[lo:hi]
+            mins[i] = lo + int(np.argmin(segment))
+            maxs[i] = lo + int(np.argmax(segment))
+        # Je Bin beide Extremwerte in zeitlicher Reihenfolge ausgeben
+        first = np.minimum(mins, maxs)
+        second = np.maximum(mins, maxs)
+        indices = np.column_stack([first, second]).ravel()
+        return self.ms[indices], self.mv[indices]
@@ -0,0 +1,307 @@
+# Modul für den binären Sidecar-Cache der EKG-Rohdaten (statt wiederholtem CSV-Parsing)
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+# Verzeichnis der Cache-Dateien (neben den Rohdaten, nicht versioniert)
+CACHE_DIR = "data/ekg_data/.cache"
+
+# Formatversion; bei Änderungen am Cache-Inhalt erhöhen, damit alte Einträge neu erstellt werden
+CACHE_VERSION = 4
+
+COLUMNS = ['Messwerte in mV', 'Zeit in ms']
+
+# Standard-Auflösungsreduktion: jeder 4. Messwert wird für Anzeige und Analyse verwendet
+DECIMATION_FACTOR = 4
+
+# Zeilen pro Abschnitt beim Einlesen; begrenzt den Speicherbedarf unabhängig von der Dateigröße
+INGEST_CHUNK_ROWS = 200_000
+
+
+def file_version(source_path):
+    # Gibt (Größe, Änderungszeit) der Quelldatei als Versionsmerkmal zurück.
+    stat = os.stat(source_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _sidecar_paths(source_path):
+    # Gibt die Pfade von Metadaten-, Signal- und Zeit-Datei im Cache zurück.
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    base = os.path.join(CACHE_DIR, name)
+    return base + ".json", base + ".mv.bin", base + ".ms.bin"
+
+
+def _decimated_paths(source_path, factor):
+    # Gibt die Pfade von Signal- und Zeit-Datei der reduzierten Auflösung im Cache zurück.
+    _, mv_path, ms_path = _sidecar_paths(source_path)
+    return mv_path.replace(".mv.bin", f".d{factor}.mv.bin"), ms_path.replace(".ms.bin", f".d{factor}.ms.bin")
+
+
+def remove_cache(source_path):
+    # Entfernt alle Cache-Dateien einer Quelldatei (volle und reduzierte Auflösung, Metadaten).
+    meta_path, mv_path, ms_path = _sidecar_paths(source_path)
+    paths = [meta_path, mv_path, ms_path]
+    factors = {str(DECIMATION_FACTOR), *(_read_meta(meta_path) or {}).get("decimated", {})}
+    for factor in factors:
+        paths.extend(_decimated_paths(source_path, factor))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_meta(meta_path):
+    # Liest die Metadaten eines Cache-Eintrags, None falls nicht vorhanden oder defekt.
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_valid(meta, source_path):
+    # Prüft, ob ein Cache-Eintrag zur aktuellen Quelldatei passt.
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    size, mtime_ns = file_version(source_path)
+    return meta.get("size") == size and meta.get("mtime_ns") == mtime_ns
+
+
+def _write_atomic(path, write_func):
+    # Schreibt eine Datei über eine temporäre Datei und benennt sie atomar um.
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _content_hash(source_path):
+    # Berechnet den SHA-256-Hash des Dateiinhalts.
+    sha = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class TimeResetCorrector:
+    # Korrigiert Rücksprünge der Zeitstempel (Reset) abschnittsweise und lässt die Zeitreihe bei 0 beginnen.
+    # Bei jedem Rücksprung wird die letzte Zeit vor dem Reset (+1 ms) zum weiteren Verlauf addiert;
+    # der Zustand wird über Abschnittsgrenzen hinweg fortgeführt.
+
+    def __init__(self):
+        # Initialisiert den Zustand vor dem ersten Abschnitt.
+        self.offset = 0  # bisher aufsummierter Versatz
+        self.last_raw = None  # letzter unkorrigierter Zeitstempel des vorherigen Abschnitts
+        self.start_time = None  # erste korrigierte Zeit (wird auf 0 normalisiert)
+        self.was_corrected = False
+        self.reset_positions = []  # Positionen (Messwert-Index) aller erkannten Rücksprünge
+        self._position = 0  # Anzahl bereits verarbeiteter Messwerte
+
+    def apply(self, ms):
+        # Gibt die korrigierten Zeitstempel eines Abschnitts zurück.
+        ms = np.asarray(ms, dtype=np.int64)
+        if len(ms) == 0:
+            return ms.copy()
+        previous = np.empty_like(ms)
+        previous[1:] = ms[:-1]
+        previous[0] = ms[0] if self.last_raw is None else self.last_raw
+        resets = ms < previous
+        offsets = np.where(resets, previous + 1, 0)
+        corrected = ms + self.offset + np.cumsum(offsets)
+        self.offset += int(offsets.sum())
+        self.last_raw = int(ms[-1])
+        self.was_corrected = self.was_corrected or bool(resets.any())
+        self.reset_positions.extend((np.flatnonzero(resets) + self._position).tolist())
+        self._position += len(ms)
+        if self.start_time is None:
+            self.start_time = int(corrected[0])
+        return corrected - self.start_time
+
+
+def correct_time_resets(ms):
+    # Korrigiert Rücksprünge der Zeitstempel einer vollständigen Zeitreihe; gibt (Zeit, korrigiert?) zurück.
+    corrector = TimeResetCorrector()
+    return corrector.apply(ms), corrector.was_corrected
+
+
+def iter_text_chunks(source_path, chunk_rows=INGEST_CHUNK_ROWS):
+    # Liest die zweispaltige Textdatei abschnittsweise und liefert (mV, ms)-Arrays ohne ungültige Zeilen.
+    reader = pd.read_csv(source_path, sep='\t', header=None, names=COLUMNS, chunksize=chunk_rows)
+    for chunk in reader:
+        chunk = chunk.dropna()
+        if not chunk.empty:
+            yield chunk['Messwerte in mV'].values, chunk['Zeit in ms'].values
+
+
+def smallest_int_dtype(values):
+    # Gibt den kleinsten vorzeichenbehafteten Ganzzahltyp (ab int16) zurück, der alle Werte verlustfrei aufnimmt.
+    if len(values) == 0:
+        return np.dtype(np.int16)
+    low, high = values.min(), values.max()
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_dtype(values, current=None):
+    # Gibt den kompakten Speichertyp für einen Abschnitt zurück: Ganzzahlen im kleinsten passenden Typ
+    # (meist int16), Kommazahlen als float32; current ist der Typ der bisherigen Abschnitte.
+    if np.issubdtype(values.dtype, np.floating) or (current is not None and current.kind == "f"):
+        return np.dtype(np.float32)
+    dtype = smallest_int_dtype(values)
+    return dtype if current is None else np.promote_types(current, dtype)
+
+
+def _promote(path, count, old_dtype, new_dtype):
+    # Wandelt eine bereits geschriebene Datei blockweise in einen größeren Datentyp um.
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    source = np.memmap(path, dtype=old_dtype, mode="r", shape=(count,)) if count else np.empty(0, old_dtype)
+    with open(tmp_path, "wb") as f:
+        for start in range(0, count, INGEST_CHUNK_ROWS):
+            source[start:start + INGEST_CHUNK_ROWS].astype(new_dtype).tofile(f)
+    del source
+    os.replace(tmp_path, path)
+
+
+class _SidecarWriter:
+    # Schreibt Signal und Zeit abschnittsweise in temporäre Dateien und übernimmt sie am Ende atomar.
+    # Beide Dateien beginnen im kleinsten Datentyp und werden bei Bedarf nachträglich vergrößert.
+
+    def __init__(self, mv_path, ms_path):
+        # Öffnet die temporären Zieldateien.
+        self.paths = {mv_path: f"{mv_path}.{uuid.uuid4().hex}.tmp", ms_path: f"{ms_path}.{uuid.uuid4().hex}.tmp"}
+        self.mv_tmp, self.ms_tmp = self.paths[mv_path], self.paths[ms_path]
+        self.mv_file = open(self.mv_tmp, "wb")
+        self.ms_file = open(self.ms_tmp, "wb")
+        self.mv_dtype = None
+        self.ms_dtype = None
+        self.length = 0
+
+    def write(self, mv, ms):
+        # Hängt einen Abschnitt an; vergrößert vorher den Datentyp, falls die Werte nicht hineinpassen.
+        mv_dtype = compact_dtype(mv, self.mv_dtype)
+        ms_dtype = np.promote_types(np.dtype(np.int32), smallest_int_dtype(ms))
+        if self.ms_dtype is not None:
+            ms_dtype = np.promote_types(self.ms_dtype, ms_dtype)
+        if self.mv_dtype is not None and mv_dtype != self.mv_dtype:
+            self.mv_file = self._promote(self.mv_file, self.mv_tmp, self.mv_dtype, mv_dtype)
+        if self.ms_dtype is not None and ms_dtype != self.ms_dtype:
+            self.ms_file = self._promote(self.ms_file, self.ms_tmp, self.ms_dtype, ms_dtype)
+        self.mv_dtype, self.ms_dtype = mv_dtype, ms_dtype
+        mv.astype(mv_dtype).tofile(self.mv_file)
+        ms.astype(ms_dtype).tofile(self.ms_file)
+        self.length += len(mv)
+
+    def _promote(self, file, tmp_path, old_dtype, new_dtype):
+        # Wandelt eine bisher geschriebene Datei in den größeren Datentyp um und öffnet sie wieder zum Anhängen.
+        file.close()
+        _promote(tmp_path, self.length, old_dtype, new_dtype)
+        return open(tmp_path, "ab")
+
+    def commit(self):
+        # Schließt die Dateien und benennt sie in ihre endgültigen Namen um.
+        self.mv_file.close()
+        self.ms_file.close()
+        for final_path, tmp_path in self.paths.items():
+            os.replace(tmp_path, final_path)
+
+    def close(self):
+        # Schließt die Dateien und entfernt nicht übernommene temporäre Dateien.
+        self.mv_file.close()
+        self.ms_file.close()
+        for tmp_path in self.paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def build_cache(source_path, chunk_rows=INGEST_CHUNK_ROWS):
+    # Liest die Textdatei abschnittsweise ein (konstanter Speicherbedarf) und schreibt Signal und korrigierte
+    # Zeit fortlaufend in den Binär-Cache, zusätzlich die reduzierte Auflösung (jeder 4. Messwert).
+    # Gespeichert wird kompakt: Signal meist als int16 (Kommazahlen als float32), Zeit als int32.
+    size, mtime_ns = file_version(source_path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path, mv_path, ms_path = _sidecar_paths(source_path)
+    full = _SidecarWriter(mv_path, ms_path)
+    decimated = _SidecarWriter(*_decimated_paths(source_path, DECIMATION_FACTOR))
+    corrector = TimeResetCorrector()
+    try:
+        for mv, ms in iter_text_chunks(source_path, chunk_rows):
+            ms = corrector.apply(ms)
+            # Phase der Reduktion über Abschnittsgrenzen fortführen
+            phase = (-full.length) % DECIMATION_FACTOR
+            decimated.write(mv[phase::DECIMATION_FACTOR], ms[phase::DECIMATION_FACTOR])
+            full.write(mv, ms)
+
+        full.commit()
+        decimated.commit()
+    finally:
+        full.close()
+        decimated.close()
+
+    meta = {
+        "version": CACHE_VERSION,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256": _content_hash(source_path),
+        "length": full.length,
+        "decimated": {str(DECIMATION_FACTOR): decimated.length},
+        "time_was_corrected": corrector.was_corrected,
+        "mv_dtype": (full.mv_dtype or np.dtype(np.float32)).str,
+        "ms_dtype": (full.ms_dtype or np.dtype(np.int32)).str,
+        "decimated_dtypes": [(decimated.mv_dtype or np.dtype(np.float32)).str, (decimated.ms_dtype or np.dtype(np.int32)).str],
+    }
+
+    def write_meta(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    # Metadaten zuletzt schreiben: erst dann gilt der Eintrag als vollständig
+    _write_atomic(meta_path, write_meta)
+    return meta
+
+
+def get_cache_meta(source_path):
+    # Gibt die Metadaten des (ggf. neu erstellten) Cache-Eintrags zurück.
+    meta_path, _, _ = _sidecar_paths(source_path)
+    meta = _read_meta(meta_path)
+    if not _is_valid(meta, source_path):
+        meta = build_cache(source_path)
+    return meta
+
+
+def _open_array(path, dtype, length):
+    # Öffnet eine Cache-Datei als schreibgeschütztes Memory-Mapping.
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+
+def load_ekg_arrays(source_path):
+    # Lädt Signal (mV), korrigierte Zeit (ms) und Metadaten einer EKG-Datei aus dem Binär-Cache.
+    # Der Cache wird beim ersten Zugriff erstellt und bei geänderter Quelldatei erneuert.
+    meta = get_cache_meta(source_path)
+    _, mv_path, ms_path = _sidecar_paths(source_path)
+    length = meta["length"]
+    mv = _open_array(mv_path, np.dtype(meta["mv_dtype"]), length)
+    ms = _open_array(ms_path, np.dtype(meta["ms_dtype"]), length)
+    return mv, ms, meta
+
+
+def load_decimated_arrays(source_path, meta, factor=DECIMATION_FACTOR):
+    # Lädt die beim Einlesen geschriebene reduzierte Auflösung; None, falls für diesen Faktor nicht vorhanden.
+    length = meta.get("decimated", {}).get(str(factor))
+    if length is None:
+        return None
+    mv_path, ms_path = _decimated_paths(source_path, factor)
+    mv_dtype, ms_dtype = meta["decimated_dtypes"]
+    return _open_array(mv_path, np.dtype(mv_dtype), length), _open_array(ms_path, np.dtype(ms_dtype), length)
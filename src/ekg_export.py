@@ -0,0 +1,61 @@
+# Modul für den Export eines EKG-Zeitfensters (CSV, kompaktes NPZ mit Peaks und RR-Anomalien)
+# Die Exporte werden erst beim Klick auf den Download erstellt; Streamlit hält die fertige Datei als Bytes im Speicher.
+import io
+import json
+import numpy as np
+
+# Zeilen je CSV-Abschnitt (begrenzt die Größe der Zwischen-Strings von pandas)
+EXPORT_CHUNK_ROWS = 20000
+
+
+def iter_csv(window, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Gibt das Signal des Fensters abschnittsweise als CSV (Bytes) zurück, inhaltlich gleich window.df.to_csv(index=False).
+    for start in range(0, max(len(window.ms), 1), chunk_rows):
+        chunk = window.frame(start, start + chunk_rows)
+        yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def write_npz(ekg, window, file):
+    # Schreibt Signal, Peaks und RR-Anomalien des Fensters komprimiert als NPZ (Arrays im kompakten Datentyp).
+    # Die Analyseparameter stehen als JSON im Eintrag "meta" (lesbar ohne allow_pickle).
+    meta = {
+        "id": ekg.id,
+        "date": ekg.date,
+        "min_time": int(window.min_time),
+        "max_time": int(window.max_time),
+        "decimation": ekg.decimation,
+        "peak_method": ekg.peak_method,
+        "height": ekg.height,
+        "threshold_ms": ekg.threshold_ms,
+    }
+    np.savez_compressed(
+        file,
+        mv=window.mv, ms=window.ms,
+        peak_mv=window.peak_mv, peak_ms=window.peak_ms,
+        anomaly_mv=window.anomaly_mv, anomaly_ms=window.anomaly_ms,
+        meta=np.array(json.dumps(meta)),
+    )
+
+
+def csv_bytes(window):
+    # Gibt den CSV-Export des Fensters als Bytes zurück.
+    return b"".join(iter_csv(window))
+
+
+def npz_bytes(ekg, window):
+    # Gibt den NPZ-Export des Fensters als Bytes zurück.
+    buffer = io.BytesIO()
+    write_npz(ekg, window, buffer)
+    return buffer.getvalue()
+
+
+def lazy_csv(window):
+    # Gibt eine Funktion zurück, die den CSV-Export erst beim Aufruf (Klick auf den Download) als Bytes erstellt.
+    return lambda: csv_bytes(window)
+
+
+def lazy_npz(ekg, window=None):
+    # Gibt eine Funktion zurück, die den NPZ-Export (sichtbarer Bereich) erst beim Aufruf als Bytes erstellt.
+    if window is None:
+        window = ekg.get_window()
+    return lambda: npz_bytes(ekg, window)
@@ -0,0 +1,272 @@
+# Modul für das kompakte, komprimierte Speicherformat der EKG-Rohdaten (.ekgz)
+#
+# Aufbau einer Datei:
+#   Kopf (Kennung, Formatversion) | Block 1 | Block 2 | ... | Index (JSON) | Fuß (Position und Länge des Index, Kennung)
+# Ein Block enthält bis zu BLOCK_SAMPLES Messwerte: Signal im kleinsten verlustfreien Datentyp (meist int16)
+# und die Zeitdifferenzen der korrigierten Zeit, byteweise umsortiert und komprimiert (zlib oder lzma).
+# Der Index enthält je Block Position, Zeitbereich und Datentypen (Zugriff nach Zeit ohne alles zu entpacken)
+# sowie die Positionen der Zeit-Rücksprünge und den SHA-256-Hash der ursprünglichen Textdatei.
+import json
+import lzma
+import os
+import struct
+import zlib
+import numpy as np
+from .ekg_cache import (TimeResetCorrector, iter_text_chunks, smallest_int_dtype, compact_dtype, INGEST_CHUNK_ROWS,
+                        _content_hash, _write_atomic)
+
+# Dateiendung des Formats
+FORMAT_EXTENSION = ".ekgz"
+
+# Verzeichnis der EKG-Rohdaten
+EKG_DATA_DIR = "data/ekg_data"
+
+# Formatversion; bei Änderungen am Aufbau erhöhen
+FORMAT_VERSION = 1
+
+MAGIC = b"EKGZ"
+_HEADER = struct.Struct("<4sH")  # Kennung, Formatversion
+_FOOTER = struct.Struct("<QI4s")  # Position des Index, Länge des Index, Kennung
+
+# Messwerte je Block (Einheit für Kompression und Zugriff nach Zeit)
+BLOCK_SAMPLES = 65536
+
+# Kompressionsverfahren: zlib (schnell, Standard) oder lzma (kleiner, langsamer)
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+DEFAULT_COMPRESSION = os.environ.get("EKG_FORMAT_COMPRESSION", "zlib")
+
+
+def is_ekgz(path):
+    # Gibt True zurück, wenn der Pfad eine Datei im kompakten Format bezeichnet.
+    return str(path).endswith(FORMAT_EXTENSION)
+
+
+def ekg_source_path(ekg_id, directory=EKG_DATA_DIR):
+    # Gibt den Pfad der Rohdaten einer Aufnahme zurück: bevorzugt .ekgz, sonst die Textdatei.
+    path = os.path.join(directory, f"{ekg_id}{FORMAT_EXTENSION}")
+    if os.path.exists(path):
+        return path
+    return os.path.join(directory, f"{ekg_id}.txt")
+
+
+def source_hash(path):
+    # Gibt den SHA-256-Hash der ursprünglichen Textdatei zurück (bei .ekgz aus dem Index, ohne zu entpacken).
+    if is_ekgz(path):
+        return EKGZReader(path).meta.get("sha256")
+    return _content_hash(path)
+
+
+def _storage_dtype(mv):
+    # Gibt den Speichertyp des Signals eines Blocks zurück (Kommazahlen ohne Nachkommastellen als Ganzzahl).
+    if np.issubdtype(mv.dtype, np.integer):
+        return smallest_int_dtype(mv)
+    if np.all(np.isfinite(mv)) and np.array_equal(mv, np.round(mv)) and np.all(np.abs(mv) < 2 ** 62):
+        return smallest_int_dtype(mv.astype(np.int64))
+    return np.dtype(np.float64)
+
+
+def _shuffle(array):
+    # Sortiert die Bytes eines Arrays nach Stelle um (alle niederwertigen, dann alle höherwertigen Bytes);
+    # bei kleinen Werten entstehen so lange gleichartige Folgen, die deutlich besser komprimieren.
+    raw = np.frombuffer(np.ascontiguousarray(array).tobytes(), dtype=np.uint8)
+    return raw.reshape(-1, array.itemsize).T.tobytes()
+
+
+def _unshuffle(data, dtype, count):
+    # Kehrt _shuffle um.
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, count)
+    return np.ascontiguousarray(raw.T).view(dtype).reshape(count)
+
+
+class EKGZWriter:
+    # Schreibt Signal und korrigierte Zeit abschnittsweise blockweise komprimiert in eine .ekgz-Datei.
+
+    def __init__(self, path, compression=DEFAULT_COMPRESSION, block_samples=BLOCK_SAMPLES):
+        # Öffnet die Zieldatei und schreibt den Kopf.
+        if compression not in CODECS:
+            raise ValueError(f"Unbekanntes Kompressionsverfahren: {compression}")
+        self.path = path
+        self.compression = compression
+        self.block_samples = block_samples
+        self._compress = CODECS[compression][0]
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self._pending_mv = []  # noch nicht zu Blöcken zusammengefasste Abschnitte
+        self._pending_ms = []
+        self._pending_count = 0
+        self.blocks = []
+        self.length = 0
+        self.mv_dtype = None  # Datentyp des Signals nach dem Entpacken (kompakt: int16/int32 bzw. float32)
+
+    def append(self, mv, ms):
+        # Hängt einen Abschnitt (Messwerte, korrigierte Zeit in ms) an.
+        if len(mv) == 0:
+            return
+        self.mv_dtype = compact_dtype(np.asarray(mv), self.mv_dtype)
+        self._pending_mv.append(np.asarray(mv))
+        self._pending_ms.append(np.asarray(ms, dtype=np.int64))
+        self._pending_count += len(mv)
+        if self._pending_count >= self.block_samples:
+            self._flush(final=False)
+
+    def _flush(self, final):
+        # Schreibt alle vollständigen Blöcke (am Ende auch den letzten, unvollständigen Block).
+        if not self._pending_count:
+            return
+        mv = np.concatenate(self._pending_mv)
+        ms = np.concatenate(self._pending_ms)
+        start = 0
+        while len(mv) - start >= self.block_samples or (final and start < len(mv)):
+            end = start + self.block_samples
+            self._write_block(mv[start:end], ms[start:end])
+            start = end
+        self._pending_mv, self._pending_ms = [mv[start:]], [ms[start:]]
+        self._pending_count = len(mv) - start
+
+    def _write_block(self, mv, ms):
+        # Komprimiert einen Block und vermerkt ihn im Index.
+        mv_dtype = _storage_dtype(mv)
+        deltas = np.diff(ms, prepend=ms[0])
+        delta_dtype = smallest_int_dtype(deltas)
+        payload = self._compress(_shuffle(mv.astype(mv_dtype)) + _shuffle(deltas.astype(delta_dtype)))
+        offset = self._file.tell()
+        self._file.write(payload)
+        self.blocks.append({
+            "offset": offset,
+            "nbytes": len(payload),
+            "first_sample": self.length,
+            "count": len(mv),
+            "first_time": int(ms[0]),
+            "last_time": int(ms[-1]),
+            "mv_dtype": mv_dtype.str,
+            "delta_dtype": delta_dtype.str,
+        })
+        self.length += len(mv)
+
+    def close(self, **extra_meta):
+        # Schreibt die restlichen Messwerte, den Index und den Fuß; gibt die Metadaten zurück.
+        self._flush(final=True)
+        last_times = [block["last_time"] for block in self.blocks]
+        meta = {
+            "version": FORMAT_VERSION,
+            "compression": self.compression,
+            "length": self.length,
+            "mv_dtype": (self.mv_dtype or np.dtype(np.float32)).str,
+            "ms_dtype": np.promote_types(np.int32, smallest_int_dtype(np.array(last_times))).str,
+            "blocks": self.blocks,
+            **extra_meta,
+        }
+        index = json.dumps(meta).encode("utf-8")
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(index_offset, len(index), MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return meta
+
+    def abort(self):
+        # Schließt die Datei ohne Index (z. B. nach einem Fehler beim Einlesen).
+        self._file.close()
+
+
+def convert_text_file(source_path, target_path=None, compression=DEFAULT_COMPRESSION, chunk_rows=INGEST_CHUNK_ROWS):
+    # Wandelt eine zweispaltige Textdatei abschnittsweise in das kompakte Format um (atomar geschrieben).
+    # Zeit-Rücksprünge werden korrigiert und ihre Positionen im Index vermerkt; gibt die Metadaten zurück.
+    if target_path is None:
+        target_path = os.path.splitext(source_path)[0] + FORMAT_EXTENSION
+    result = {}
+
+    def write(tmp_path):
+        writer = EKGZWriter(tmp_path, compression)
+        corrector = TimeResetCorrector()
+        try:
+            for mv, ms in iter_text_chunks(source_path, chunk_rows):
+                writer.append(mv, corrector.apply(ms))
+        except BaseException:
+            writer.abort()
+            raise
+        result.update(writer.close(
+            time_was_corrected=corrector.was_corrected,
+            time_resets=corrector.reset_positions,
+            start_time=corrector.start_time,
+            sha256=_content_hash(source_path),
+        ))
+
+    _write_atomic(target_path, write)
+    return result
+
+
+class EKGZReader:
+    # Liest eine .ekgz-Datei vollständig oder blockweise nach Zeitbereich.
+
+    def __init__(self, path):
+        # Liest Kopf, Fuß und Index der Datei.
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version = _HEADER.unpack(f.read(_HEADER.size))
+            f.seek(-_FOOTER.size, os.SEEK_END)
+            index_offset, index_length, footer_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if magic != MAGIC or footer_magic != MAGIC:
+                raise ValueError(f"Keine gültige EKG-Datei: {path}")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Nicht unterstützte Formatversion {version}: {path}")
+            f.seek(index_offset)
+            self.meta = json.loads(f.read(index_length).decode("utf-8"))
+        self._decompress = CODECS[self.meta["compression"]][1]
+        self.blocks = self.meta["blocks"]
+        self.mv_dtype = np.dtype(self.meta["mv_dtype"])
+        self.ms_dtype = np.dtype(self.meta["ms_dtype"])
+        self._first_times = np.array([block["first_time"] for block in self.blocks], dtype=np.int64)
+        self._last_times = np.array([block["last_time"] for block in self.blocks], dtype=np.int64)
+
+    def __len__(self):
+        # Gibt die Anzahl der Messwerte zurück.
+        return self.meta["length"]
+
+    def _decode(self, block, payload, mv_out, ms_out):
+        # Entpackt einen Block in die übergebenen Zielbereiche.
+        count = block["count"]
+        mv_dtype, delta_dtype = np.dtype(block["mv_dtype"]), np.dtype(block["delta_dtype"])
+        data = self._decompress(payload)
+        split = count * mv_dtype.itemsize
+        mv_out[:] = _unshuffle(data[:split], mv_dtype, count)
+        np.cumsum(_unshuffle(data[split:], delta_dtype, count), out=ms_out, dtype=np.int64)
+        ms_out += block["first_time"]
+
+    def _read_blocks(self, first, last):
+        # Entpackt die Blöcke first bis last (einschließlich) in zusammenhängende Arrays.
+        blocks = self.blocks[first:last + 1]
+        count = sum(block["count"] for block in blocks)
+        mv = np.empty(count, dtype=self.mv_dtype)
+        ms = np.empty(count, dtype=self.ms_dtype)
+        if not blocks:
+            return mv, ms
+        with open(self.path, "rb") as f:
+            f.seek(blocks[0]["offset"])
+            data = f.read(blocks[-1]["offset"] + blocks[-1]["nbytes"] - blocks[0]["offset"])
+        base, position = blocks[0]["offset"], 0
+        for block in blocks:
+            start = block["offset"] - base
+            end = position + block["count"]
+            self._decode(block, data[start:start + block["nbytes"]], mv[position:end], ms[position:end])
+            position = end
+        return mv, ms
+
+    def read_all(self):
+        # Gibt Signal (mV) und korrigierte Zeit (ms) der gesamten Aufnahme zurück.
+        return self._read_blocks(0, len(self.blocks) - 1)
+
+    def read_range(self, min_time, max_time):
+        # Gibt Signal und Zeit im Bereich [min_time, max_time] zurück; entpackt nur die betroffenen Blöcke.
+        first = int(np.searchsorted(self._last_times, min_time, side="left"))
+        last = int(np.searchsorted(self._first_times, max_time, side="right")) - 1
+        if first > last:
+            return np.empty(0, dtype=self.mv_dtype), np.empty(0, dtype=self.ms_dtype)
+        mv, ms = self._read_blocks(first, last)
+        start = np.searchsorted(ms, min_time, side="left")
+        end = np.searchsorted(ms, max_time, side="right")
+        return mv[start:end], ms[start:end]
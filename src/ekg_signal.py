@@ -0,0 +1,112 @@
+# Modul mit der gemeinsamen Ladestufe für EKG-Signale (einmal einlesen, überall verwenden)
+import numpy as np
+from .ekg_cache import load_ekg_arrays, load_decimated_arrays, DECIMATION_FACTOR
+from .ekg_format import EKGZReader, is_ekgz
+from .downsampling import MinMaxPyramid
+from .peak_detection import pan_tompkins, estimate_sampling_rate, find_local_maxima
+
+
+class EKGSignal:
+    # Vollständig aufgelöstes, zeitkorrigiertes EKG-Signal einer Aufnahme.
+    # Arrays sind kompakt: Signal meist int16 (Kommazahlen float32), Zeit int32, Peak-Positionen int32.
+
+    def __init__(self, mv, ms, time_was_corrected=False, content_hash=None, decimated_arrays=None):
+        # Initialisiert das Signal mit Messwerten (mV) und korrigierter, bei 0 beginnender Zeit (ms).
+        # decimated_arrays enthält optional bereits beim Einlesen reduzierte Arrays (Faktor -> (mV, ms)).
+        self.mv = mv
+        self.ms = ms
+        self._decimated = dict(decimated_arrays or {})
+        self.time_was_corrected = time_was_corrected
+        self.content_hash = content_hash
+        self._peak_candidates = {}  # Auflösungsfaktor -> (Positionen, Höhen), aufsteigend nach Höhe
+        self._pyramid = None  # Min/Max-Pyramide für die Darstellung, wird bei Bedarf erstellt
+        self._adaptive_peaks = {}  # Auflösungsfaktor -> Peak-Positionen des Pan-Tompkins-Detektors
+
+    @classmethod
+    def from_file(cls, source_path):
+        # Lädt das Signal einer EKG-Datei: .ekgz-Dateien direkt, Textdateien über den Binär-Cache.
+        if is_ekgz(source_path):
+            reader = EKGZReader(source_path)
+            mv, ms = reader.read_all()
+            return cls(mv, ms, reader.meta.get("time_was_corrected", False), reader.meta.get("sha256"))
+        mv, ms, meta = load_ekg_arrays(source_path)
+        decimated = load_decimated_arrays(source_path, meta)
+        decimated_arrays = {DECIMATION_FACTOR: decimated} if decimated is not None else None
+        return cls(mv, ms, meta.get("time_was_corrected", False), meta.get("sha256"), decimated_arrays)
+
+    def __len__(self):
+        # Gibt die Anzahl der Messwerte in voller Auflösung zurück.
+        return len(self.mv)
+
+    @property
+    def nbytes(self):
+        # Gibt den Speicherbedarf der Signal-Arrays in Bytes zurück (inklusive reduzierter Arrays und abgeleiteter Daten,
+        # auch übernommener Peak-Kandidaten).
+        decimated_bytes = sum(mv.nbytes + ms.nbytes for mv, ms in self._decimated.values())
+        candidate_bytes = sum(pos.nbytes + h.nbytes for pos, h in self._peak_candidates.values())
+        pyramid_bytes = self._pyramid.nbytes if self._pyramid is not None else 0
+        adaptive_bytes = sum(peaks.nbytes for peaks in self._adaptive_peaks.values())
+        return (self.mv.nbytes + self.ms.nbytes + decimated_bytes + candidate_bytes + pyramid_bytes
+                + adaptive_bytes)
+
+    def decimated(self, factor=DECIMATION_FACTOR):
+        # Gibt Messwerte und Zeit mit reduzierter Auflösung zurück: die zusammenhängende Cache-Datei,
+        # falls vorhanden, sonst Views auf das vollaufgelöste Signal (keine Kopien).
+        arrays = self._decimated.get(factor)
+        if arrays is not None:
+            return arrays
+        return self.mv[::factor], self.ms[::factor]
+
+    @property
+    def pyramid(self):
+        # Gibt die Min/Max-Pyramide des vollaufgelösten Signals zurück (einmalig berechnet).
+        if self._pyramid is None:
+            self._pyramid = MinMaxPyramid(self.mv, self.ms)
+        return self._pyramid
+
+    def plot_window(self, min_time, max_time, target_points=None):
+        # Gibt Zeit und Messwerte eines Zeitfensters mit konstanter Punktanzahl für Plots zurück.
+        return self.pyramid.window(min_time, max_time, target_points)
+
+    def peak_candidates(self, factor=DECIMATION_FACTOR):
+        # Gibt alle lokalen Maxima der reduzierten Zeitreihe zurück, aufsteigend nach Höhe sortiert.
+        # Wird pro Auflösungsfaktor nur einmal berechnet.
+        candidates = self._peak_candidates.get(factor)
+        if candidates is None:
+            signal = self.decimated(factor)[0]
+            # Liegt das Signal in einer Cache-Datei, blenden parallele Worker es direkt von dort ein
+            source_file = None
+            if factor in self._decimated and isinstance(signal, np.memmap) and signal.filename is not None:
+                source_file = (signal.filename, signal.dtype.str, len(signal), 1)
+            elif isinstance(self.mv, np.memmap) and self.mv.filename is not None:
+                source_file = (self.mv.filename, self.mv.dtype.str, len(self.mv), factor)
+            positions = find_local_maxima(signal, source_file=source_file).astype(np.int32)
+            heights = np.asarray(signal[positions])
+            order = np.argsort(heights, kind="stable")
+            candidates = (positions[order], heights[order])
+            self._peak_candidates[factor] = candidates
+        return candidates
+
+    def has_peak_candidates(self, factor=DECIMATION_FACTOR):
+        # Gibt True zurück, wenn die Peak-Kandidaten für diesen Auflösungsfaktor bereits vorliegen.
+        return factor in self._peak_candidates
+
+    def set_peak_candidates(self, factor, positions, heights):
+        # Übernimmt gespeicherte Peak-Kandidaten (z. B. aus der Ergebnisablage) statt sie neu zu berechnen.
+        self._peak_candidates[factor] = (np.asarray(positions, dtype=np.int32), np.asarray(heights))
+
+    def peaks_above(self, height, factor=DECIMATION_FACTOR):
+        # Gibt die Peak-Positionen mit Höhe >= height zurück (entspricht find_peaks(signal, height=height)).
+        positions, heights = self.peak_candidates(factor)
+        start = np.searchsorted(heights, height, side="left")
+        return np.sort(positions[start:])
+
+    def adaptive_peaks(self, factor=DECIMATION_FACTOR):
+        # Gibt die Peak-Positionen des adaptiven Pan-Tompkins-Detektors zurück (ohne festen Schwellwert).
+        peaks = self._adaptive_peaks.get(factor)
+        if peaks is None:
+            mv, ms = self.decimated(factor)
+            peaks = pan_tompkins(mv, estimate_sampling_rate(ms)) if len(mv) > 1 else np.empty(0)
+            peaks = peaks.astype(np.int32)
+            self._adaptive_peaks[factor] = peaks
+        return peaks
@@ -2,15 +2,95 @@
 import json
 import pandas as pd
 import plotly.express as px
-from scipy.signal import find_peaks
+import plotly.graph_objects as go
 import numpy as np
+from .ekg_signal import DECIMATION_FACTOR
+from .signal_cache import get_signal_cache
+from .result_store import get_result_store
+from .downsampling import MinMaxPyramid
+from .peak_detection import PEAK_METHODS, DEFAULT_PEAK_METHOD
+from .rr_series import RRSeries
+from .person_repository import get_person_repository
+from .ekg_format import ekg_source_path
+
+# Maximale Anzahl beschrifteter Anomalien im EKG-Plot
+MAX_ANOMALY_ANNOTATIONS = 20
+
+# Darstellungsmodi: "auto" wechselt ab WEBGL_THRESHOLD Messwerten im Fenster von SVG zu WebGL
+RENDER_MODES = ("auto", "svg", "webgl")
+WEBGL_THRESHOLD = 20000
+# Punktanzahl des serverseitig reduzierten Puffers im WebGL-Modus (Details bleiben beim Zoomen erhalten)
+WEBGL_TARGET_POINTS = 50000
+
+
+def _use_webgl(render_mode, point_count):
+    # Entscheidet anhand des Modus und der Punktanzahl, ob WebGL (Scattergl) verwendet wird.
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unbekannter Darstellungsmodus: {render_mode}")
+    if render_mode == "auto":
+        return point_count > WEBGL_THRESHOLD
+    return render_mode == "webgl"
+
+
+def _frame(mv, ms, index=None):
+    # Erstellt einen DataFrame mit den Spalten "Messwerte in mV" und "Zeit in ms" (nur für Export und Anzeige).
+    return pd.DataFrame({'Messwerte in mV': mv, 'Zeit in ms': ms}, index=index)
+
+
+def _time_slice(times, min_time, max_time):
+    # Gibt per binärer Suche den Indexbereich [start, end) einer sortierten Zeitreihe im Zeitfenster zurück.
+    start = int(np.searchsorted(times, min_time, side="left"))
+    end = int(np.searchsorted(times, max_time, side="right"))
+    return slice(start, max(start, end))
+
+
+class EKGWindow:
+    # Zeitfenster einer Aufnahme: Views auf Signal, Peaks und RR-Anomalien (Arrays, keine DataFrames).
+    # Die DataFrames df, peaks_df und anomalies_df werden erst bei Zugriff erstellt (z. B. für den CSV-Export).
+
+    def __init__(self, min_time, max_time, mv, ms, peaks, anomalies):
+        # Initialisiert das Fenster; peaks und anomalies sind Positionen in der reduzierten Zeitreihe.
+        self.min_time = min_time
+        self.max_time = max_time
+        window = _time_slice(ms, min_time, max_time)
+        self.mv = mv[window]
+        self.ms = ms[window]
+        self.peaks = peaks
+        self.peak_mv, self.peak_ms = mv[peaks], ms[peaks]
+        self.anomalies = anomalies
+        self.anomaly_mv, self.anomaly_ms = mv[anomalies], ms[anomalies]
+
+    @property
+    def df(self):
+        # Signal im Fenster als DataFrame.
+        return _frame(self.mv, self.ms)
+
+    def frame(self, start, end):
+        # Abschnitt [start, end) des Signals im Fenster als DataFrame (für den Export in Abschnitten).
+        return _frame(self.mv[start:end], self.ms[start:end])
+
+    @property
+    def peaks_df(self):
+        # Peaks im Fenster als DataFrame (Index = Position in der reduzierten Zeitreihe).
+        return _frame(self.peak_mv, self.peak_ms, self.peaks)
+
+    @property
+    def anomalies_df(self):
+        # RR-Anomalien im Fenster als DataFrame (Index = Position in der reduzierten Zeitreihe).
+        return _frame(self.anomaly_mv, self.anomaly_ms, self.anomalies)
+
 
 class EKGdata:
     # Klasse zur Verarbeitung, Analyse und Visualisierung von EKG-Messdaten.
 
     @staticmethod
-    def load_by_id(id, db):
-        # Lädt EKG-Test anhand der ID aus der Datenbank.
+    def load_by_id(id, db=None):
+        # Lädt EKG-Test anhand der ID aus der Datenbank (ohne Personenliste über den EKG-Index).
+        if db is None:
+            _, ekg_dict = get_person_repository().get_ekg_test(id)
+            if ekg_dict is None:
+                raise ValueError(f"EKG-Test mit ID {id} nicht gefunden.")
+            return EKGdata(ekg_dict)
         for person in db:
             for ekg_dict in person.ekg_tests:
                 if ekg_dict["id"] == id:
@@ -19,51 +99,59 @@ class EKGdata:
 
     def __init__(self, ekg_dict):
         # Initialisiert mit EKG-Daten aus Dictionary und bereitet sie vor.
-        self.time_was_corrected = False
-
         self.id = ekg_dict["id"]
         self.date = ekg_dict["date"]
         ekg_id = ekg_dict["id"]
-        self.data = f"data/ekg_data/{ekg_id}.txt"
-        self.df = pd.read_csv(self.data, sep='\t', header=None, names=['Messwerte in mV', 'Zeit in ms'])[::4]
-        self.df = self.df.dropna()
-
-        if self.df.empty:
-            raise ValueError(f"Keine gültigen EKG-Daten in Datei {self.data}")
-
-        # Zeitreihe korrigieren, wenn Zeitstempel zurückspringen (Reset)
-        zeit_diff = self.df["Zeit in ms"].diff()
-        reset_index = zeit_diff[zeit_diff < 0].index
+        self.data = ekg_source_path(ekg_id)
+        # Signal aus dem prozessweiten Cache holen (volle Auflösung, Zeitstempel korrigiert, Start bei 0)
+        self.signal = get_signal_cache().get(self.id, self.data)
+        self.time_was_corrected = self.signal.time_was_corrected
+        self.decimation = DECIMATION_FACTOR
 
-        if not reset_index.empty:
-            # Zeitstempel korrigieren, indem Offset zum weiteren Verlauf addiert wird
-            start_idx = reset_index[0]
-            offset = self.df["Zeit in ms"].iloc[self.df.index.get_loc(start_idx) - 1] + 1
-            self.df.loc[start_idx:, "Zeit in ms"] += offset
-            self.time_was_corrected = True
+        # Reduzierte Auflösung für Anzeige und Analyse (jeder 4. Messwert); kompakte Arrays statt DataFrame
+        self.mv, self.ms = self.signal.decimated(self.decimation)
 
-        # Zeitreihe visuell bei 0 beginnen lassen (normalisieren)
-        if self.df.empty or self.df["Zeit in ms"].empty:
+        if len(self.ms) == 0:
             raise ValueError(f"Keine gültigen EKG-Daten in Datei {self.data}")
-        else:
-            start_time = self.df["Zeit in ms"].iloc[0]
-            self.df["Zeit in ms"] -= start_time
 
         # Abtastrate (optional, falls bekannt)
         self.sampling_rate = None
 
-        # Gesamtdauer in Sekunden berechnen
-        self.duration_seconds = (self.df["Zeit in ms"].iloc[-1] - self.df["Zeit in ms"].iloc[0]) / 1000
+        # Zeitbereich und Gesamtdauer in Sekunden (Zeit ist aufsteigend sortiert)
+        self.min_time = int(self.ms[0])
+        self.max_valid_time = int(self.ms[-1])
+        self.duration_seconds = (self.max_valid_time - self.min_time) / 1000
 
         self.visible_range = None  # sichtbarer Zeitbereich für Visualisierung
+        self.render_mode = "auto"  # Darstellungsmodus der Plots ("auto", "svg" oder "webgl")
 
-        self.max_valid_time = self.df["Zeit in ms"].max()
+        self.peaks = np.empty(0, dtype=np.int32)  # Peak-Positionen in der reduzierten Zeitreihe
+        self.peak_times = np.empty(0, dtype=self.ms.dtype)  # Zeitpunkte der Peaks in ms
+        self.rr_series = RRSeries(self.peak_times)  # RR-Intervalle der aktuellen Peaks
+        self.rr_anomaly_indices = np.empty(0, dtype=np.int32)  # Positionen der RR-Anomalien in self.peaks
+        self.peaks_detected = False  # Flag, ob Peaks gefunden wurden
 
-        self.rr_anomalies = pd.DataFrame()  # DataFrame für erkannte RR-Anomalien
+        # Parameter der letzten Analyse (Schlüssel für gespeicherte Ergebnisse)
+        self.peak_method = DEFAULT_PEAK_METHOD
+        self.height = None
+        self.threshold_ms = None
 
-        self.peaks = []  # Liste der Peak-Indizes
-        self.peaks_detected = False  # Flag, ob Peaks gefunden wurden
 
+    @property
+    def df(self):
+        # Signal in reduzierter Auflösung als DataFrame (wird bei jedem Zugriff neu erstellt, nur für den Export).
+        return _frame(self.mv, self.ms)
+
+    @property
+    def all_peaks_df(self):
+        # Alle erkannten Peaks als DataFrame (Index = Position in der reduzierten Zeitreihe).
+        return _frame(self.mv[self.peaks], self.peak_times, self.peaks)
+
+    @property
+    def rr_anomalies(self):
+        # Alle RR-Anomalien als DataFrame (Index = Position in der reduzierten Zeitreihe).
+        anomalies = self.peaks[self.rr_anomaly_indices]
+        return _frame(self.mv[anomalies], self.ms[anomalies], anomalies)
 
     def get_duration_str(self):
         # Gibt die Messdauer als String (Minuten und Sekunden) zurück.
@@ -71,64 +159,101 @@ class EKGdata:
         seconds = int(self.duration_seconds % 60)
         return f"{minutes} Minuten und {seconds} Sekunden"
 
-    def detect_peaks_globally(self, height=None):
-        # Erkennt Peaks (Herzschläge) im gesamten EKG-Signal.
-        # Vollständige EKG-Daten laden
-        data_path = f"data/ekg_data/{self.id}.txt"
-        full_df = pd.read_csv(data_path, sep='\t', header=None, names=['Messwerte in mV', 'Zeit in ms'])
-        full_df = full_df.dropna()
-
-        # Zeitkorrektur wie im Konstruktor (bei Sprüngen)
-        zeit_diff = full_df["Zeit in ms"].diff()
-        reset_index = zeit_diff[zeit_diff < 0].index
-        if not reset_index.empty:
-            start_idx = reset_index[0]
-            previous_index = full_df.index.get_loc(start_idx) - 1
-            if previous_index >= 0:
-                offset = full_df["Zeit in ms"].iloc[previous_index] + 1
-            else:
-                offset = 0
-            full_df.loc[start_idx:, "Zeit in ms"] += offset
-        full_df["Zeit in ms"] -= full_df["Zeit in ms"].iloc[0]
-
-        # Subsampling: Jeder 4. Messwert verwenden
-        full_df = full_df.iloc[::4].reset_index(drop=True)
-
-        signal = full_df["Messwerte in mV"].values
+    def _result_hash(self):
+        # Gibt den Inhalts-Hash für gespeicherte Peaks und Analysen zurück, oder None, wenn nicht gespeichert wird.
+        # Schwellwert-Peaks entstehen per binärer Suche aus den gespeicherten Kandidaten, RR-Anomalien und
+        # Herzfrequenz vektorisiert (RRSeries); sie werden nicht je Schwellwert gespeichert.
+        if self.peak_method == "threshold":
+            return None
+        return self.signal.content_hash
+
+    def _load_peak_candidates(self):
+        # Stellt die schwellwertunabhängigen Peak-Kandidaten bereit: aus der Ergebnisablage, sonst einmal
+        # berechnet (vollständige Maximumsuche) und dort gespeichert.
+        content_hash = self.signal.content_hash
+        if not content_hash or self.signal.has_peak_candidates(self.decimation):
+            return
+        store = get_result_store()
+        stored = store.get_candidates(content_hash, self.decimation)
+        if stored is not None:
+            self.signal.set_peak_candidates(self.decimation, *stored)
+        else:
+            store.put_candidates(content_hash, self.decimation, *self.signal.peak_candidates(self.decimation))
 
+    def detect_peaks_globally(self, height=None, method=DEFAULT_PEAK_METHOD):
+        # Erkennt Peaks (Herzschläge) im gesamten EKG-Signal.
+        # method="threshold": fester Schwellwert (height); method="pan_tompkins": adaptiv, height wird ignoriert.
+        if method not in PEAK_METHODS:
+            raise ValueError(f"Unbekannter Peak-Detektor: {method}")
         # Schwellenwert (height) für Peaks; Standardwert 350
-        if height is None:
+        if method != "threshold":
+            height = None
+        elif height is None:
             height = 350
-        peaks, _ = find_peaks(signal, height=height)
-
-        # Gefundene Peaks speichern
-        self.all_peaks_df = full_df.iloc[peaks].copy()
-        self.peaks = peaks.tolist()
+        self.peak_method = method
+        self.height = height
+
+        # Schwellwert-Peaks per binärer Suche aus den gespeicherten, schwellwertunabhängigen Kandidaten;
+        # die Peaks des adaptiven Detektors werden selbst gespeichert
+        store = get_result_store()
+        content_hash = self._result_hash()
+        stored_peaks = store.get_peaks(content_hash, self.decimation, method) if content_hash else None
+        if stored_peaks is not None:
+            peaks = np.asarray(stored_peaks, dtype=np.int32)
+        elif method == "pan_tompkins":
+            peaks = self.signal.adaptive_peaks(self.decimation)
+            if content_hash:
+                store.put_peaks(content_hash, self.decimation, peaks, method)
+        else:
+            self._load_peak_candidates()
+            peaks = self.signal.peaks_above(height, self.decimation)
+
+        # Gefundene Peaks speichern (Position in der reduzierten Zeitreihe); frühere Anomalien verwerfen
+        self.peaks = np.asarray(peaks, dtype=np.int32)
+        self.peak_times = np.asarray(self.ms[self.peaks])
+        self.rr_series = RRSeries(self.peak_times)
+        self.rr_anomaly_indices = np.empty(0, dtype=np.int32)
         self.peaks_detected = True
 
     def detect_rr_anomalies(self, threshold_ms=300):
         # Erkennt RR-Anomalien (Intervalle kürzer als threshold_ms).
-        if not self.peaks_detected or not hasattr(self, "all_peaks_df") or self.all_peaks_df.empty:
+        if not self.peaks_detected or len(self.peaks) == 0:
             raise ValueError("Bitte zuerst detect_peaks_globally() aufrufen.")
-        peak_times = self.all_peaks_df["Zeit in ms"].values
-        rr_intervals = peak_times[1:] - peak_times[:-1]
-        anomaly_indices = [i+1 for i, rr in enumerate(rr_intervals) if rr < threshold_ms]
-        max_time = self.df["Zeit in ms"].max()
-        rr_df = self.all_peaks_df.iloc[anomaly_indices]
-        # Nur Anomalien innerhalb des aktuellen Zeitbereichs behalten
-        self.rr_anomalies = rr_df[rr_df["Zeit in ms"] <= max_time].copy()
+        self.threshold_ms = threshold_ms
+
+        store = get_result_store()
+        content_hash = self._result_hash()
+        stored = store.get_analysis(content_hash, threshold_ms, self.decimation, self.peak_method) if content_hash else None
+        if stored is not None and "anomalies" in stored:
+            anomaly_indices = stored["anomalies"]
+        else:
+            anomaly_indices = self.rr_series.anomalies(threshold_ms)
+            if content_hash:
+                store.put_analysis(content_hash, threshold_ms, self.decimation, self.peak_method, anomalies=anomaly_indices.tolist())
+        # Alle Anomalien behalten; die Einschränkung auf den Zeitbereich erfolgt über get_window()
+        self.rr_anomaly_indices = np.asarray(anomaly_indices, dtype=np.int32)
 
     def estimate_hr(self):
         # Schätzt die mittlere Herzfrequenz anhand der Peaks.
-        if not hasattr(self, "all_peaks_df"):
+        if not self.peaks_detected:
             raise ValueError("Peaks wurden noch nicht erkannt. Bitte zuerst detect_peaks_globally() aufrufen.")
-        peak_times = self.all_peaks_df["Zeit in ms"].values / 1000  # Sekundenskala
-        rr_intervals = peak_times[1:] - peak_times[:-1]
-        avg_rr = rr_intervals.mean()
-        self.estimated_hr = 60 / avg_rr if avg_rr > 0 else 0
+
+        # Gespeicherten Wert verwenden, falls die Analyse mit diesen Parametern schon gelaufen ist
+        store = get_result_store()
+        content_hash = self._result_hash()
+        use_store = content_hash is not None and self.threshold_ms is not None
+        if use_store:
+            stored = store.get_analysis(content_hash, self.threshold_ms, self.decimation, self.peak_method)
+            if stored is not None and "hr" in stored:
+                self.estimated_hr = stored["hr"]
+                return self.estimated_hr
+
+        self.estimated_hr = self.rr_series.mean_hr()
+        if use_store:
+            store.put_analysis(content_hash, self.threshold_ms, self.decimation, self.peak_method, hr=self.estimated_hr)
         return self.estimated_hr
 
-    def plot_time_series(self):
+    def plot_time_series(self, render_mode=None):
         # Erstellt ein Plot der EKG-Zeitreihe mit Peaks und RR-Anomalien.
         # Sichtbarer Bereich, standardmäßig 10 Sekunden (0 bis 10.000 ms)
         if self.visible_range is None:
@@ -137,74 +262,71 @@ class EKGdata:
         else:
             min_time, max_time = self.visible_range
 
-        visible_df = self.df[(self.df["Zeit in ms"] >= min_time) & (self.df["Zeit in ms"] <= max_time)].copy()
+        window = self.get_window((min_time, max_time))
 
-        fig = px.line(visible_df, x="Zeit in ms", y="Messwerte in mV", title="EKG-Zeitreihe")
+        # Bei vielen Messwerten WebGL mit größerem, serverseitig reduziertem Puffer verwenden
+        use_webgl = _use_webgl(render_mode or self.render_mode, self.signal.pyramid.sample_count(min_time, max_time))
+        scatter = go.Scattergl if use_webgl else go.Scatter
 
-        if hasattr(self, "all_peaks_df"):
+        # Signal in passender Detailstufe (SVG ca. 2–5k Punkte, Min/Max je Bin) statt aller Messwerte
+        plot_ms, plot_mv = self.signal.plot_window(min_time, max_time, WEBGL_TARGET_POINTS if use_webgl else None)
+        plot_df = pd.DataFrame({"Zeit in ms": plot_ms, "Messwerte in mV": plot_mv})
+        fig = px.line(plot_df, x="Zeit in ms", y="Messwerte in mV", title="EKG-Zeitreihe",
+                      render_mode="webgl" if use_webgl else "svg")
+
+        if self.peaks_detected:
             # Peaks im sichtbaren Bereich plotten
-            peak_df = self.all_peaks_df
-            peak_df = peak_df[(peak_df["Zeit in ms"] >= min_time) & 
-                              (peak_df["Zeit in ms"] <= max_time)]
-            fig.add_scatter(x=peak_df["Zeit in ms"], y=peak_df["Messwerte in mV"],
-                            mode='markers', marker=dict(color='blue', size=6), name="Peaks")
-        # RR-Anomalien als rote Markierungen mit Text annotieren
-        if hasattr(self, "rr_anomalies"):
-            self.visible_rr_anomalies = []
-            for _, row in self.rr_anomalies.iterrows():
-                anomaly_time = row["Zeit in ms"]
-                if min_time <= anomaly_time <= max_time:
-                    self.visible_rr_anomalies.append(row)
-                    fig.add_vrect(
-                        x0=anomaly_time - 50, x1=anomaly_time + 50,
-                        fillcolor="red", opacity=0.4, line_width=1, line_color="darkred",
-                        annotation_text="Anomalie", annotation_position="top left",
-                        annotation_font_size=10, annotation_font_color="red"
-                    )
-            # Dummy-Trace für Legende "RR-Anomalie"
-            fig.add_scatter(x=[None], y=[None], mode='markers',
-                            marker=dict(color='red', size=6),
-                            name='RR-Anomalie')
+            fig.add_trace(scatter(x=window.peak_ms, y=window.peak_mv,
+                                  mode='markers', marker=dict(color='blue', size=6), name="Peaks"))
+        # RR-Anomalien als rote Markierungen: ein gemeinsamer Trace statt einer Layout-Form pro Anomalie
+        anomaly_times = window.anomaly_ms.astype(float)
+        y_low = float(plot_mv.min()) if len(plot_mv) else 0.0
+        y_high = float(plot_mv.max()) if len(plot_mv) else 1.0
+        x_left, x_right = anomaly_times - 50, anomaly_times + 50
+        # Je Anomalie ein geschlossenes Rechteck, getrennt durch Lücken (NaN)
+        rect_x = np.column_stack([x_left, x_right, x_right, x_left, x_left, np.full(len(anomaly_times), np.nan)]).ravel()
+        rect_y = np.tile([y_low, y_low, y_high, y_high, y_low, np.nan], len(anomaly_times))
+        fig.add_trace(scatter(
+            x=rect_x if len(rect_x) else [None], y=rect_y if len(rect_y) else [None],
+            mode="lines", fill="toself", fillcolor="rgba(255, 0, 0, 0.4)",
+            line=dict(color="darkred", width=1), name="RR-Anomalie", hoverinfo="x"
+        ))
+        # Beschriftung nur für die ersten Anomalien, damit das Layout klein bleibt
+        fig.update_layout(annotations=[
+            dict(x=t, y=1, xref="x", yref="paper", text="Anomalie", showarrow=False,
+                 xanchor="left", yanchor="bottom", font=dict(size=10, color="red"))
+            for t in x_left[:MAX_ANOMALY_ANNOTATIONS]
+        ])
         self.fig = fig
         return fig
     
-    def plot_hr_over_time(self, min_time=None, max_time=None):
+    def plot_hr_over_time(self, min_time=None, max_time=None, render_mode=None):
         # Visualisiert die Herzfrequenz über die Zeit (RR-Intervalle).
-        if not hasattr(self, "all_peaks_df") or self.all_peaks_df.empty:
-            import plotly.graph_objects as go
+        if not self.peaks_detected or len(self.peaks) == 0:
             return go.Figure().update_layout(title="Keine gültigen Peaks erkannt – bitte Schwellwert anpassen.")
 
-        peak_df = self.all_peaks_df
-        peak_times = peak_df["Zeit in ms"].values / 1000  # Sekundenskala
-        if len(peak_times) < 2:
+        if len(self.rr_series) < 1:
             raise ValueError("Nicht genügend Peaks zur Berechnung der Herzfrequenz.")
 
-        # RR-Intervalle und Zeitpunkte berechnen
-        rr_intervals = peak_times[1:] - peak_times[:-1]
-        hr_values = 60 / rr_intervals
-        time_points = (peak_times[1:] + peak_times[:-1]) / 2
-
-        # DataFrame erstellen
-        hr_df = pd.DataFrame({
-            "Zeit (s)": time_points,
-            "Herzfrequenz (bpm)": hr_values
-        })
-
-        # Adaptive Fenstergröße: 5% der Anzahl der HR-Werte, mindestens 3
-        window_size = max(3, int(len(hr_df) * 0.05))
-        hr_df["Herzfrequenz (bpm)"] = hr_df["Herzfrequenz (bpm)"].rolling(window=window_size, center=True, min_periods=1).mean()
-
-        # Falls ein Zeitbereich angegeben ist, beschneiden
-        if min_time is not None and max_time is not None:
-            min_s, max_s = min_time / 1000, max_time / 1000
-            hr_df = hr_df[(hr_df["Zeit (s)"] >= min_s) & (hr_df["Zeit (s)"] <= max_s)]
+        # Geglättete Herzfrequenz der RR-Reihe im Zeitbereich (vorberechnet, nur beschneiden)
+        if min_time is None or max_time is None:
+            min_time = max_time = None
+        times, values = self.rr_series.hr_window(min_time, max_time)
+        times = times / 1000  # Sekundenskala
 
         # Dynamische Y-Achse mit Puffer
-        y_min = hr_df["Herzfrequenz (bpm)"].min() - 5
-        y_max = hr_df["Herzfrequenz (bpm)"].max() + 5
+        y_min = values.min() - 5 if len(values) else np.nan
+        y_max = values.max() + 5 if len(values) else np.nan
+
+        # Sehr lange Verläufe serverseitig reduzieren und mit WebGL darstellen
+        use_webgl = _use_webgl(render_mode or self.render_mode, len(values))
+        if use_webgl and len(values) > WEBGL_TARGET_POINTS:
+            times, values = MinMaxPyramid(values, times).window(times[0], times[-1], WEBGL_TARGET_POINTS)
+        hr_df = pd.DataFrame({"Zeit (s)": times, "Herzfrequenz (bpm)": values})
 
         # Plot erzeugen
-        fig = px.line(hr_df, x="Zeit (s)", y="Herzfrequenz (bpm)", title="Herzfrequenz über die Zeit")
+        fig = px.line(hr_df, x="Zeit (s)", y="Herzfrequenz (bpm)", title="Herzfrequenz über die Zeit",
+                      render_mode="webgl" if use_webgl else "svg")
         fig.update_layout(
             yaxis=dict(range=[y_min, y_max]),
             template="plotly_white"
@@ -212,28 +334,29 @@ class EKGdata:
         return fig
 
     def set_time_range(self, time_range):
-        # Setzt den Zeitbereich (in ms) für die EKG-Daten.
+        # Setzt den sichtbaren Zeitbereich (in ms); die vollständige Zeitreihe bleibt erhalten.
+        self.visible_range = time_range
+
+    def get_window(self, time_range=None):
+        # Gibt das Zeitfenster (Signal, Peaks, RR-Anomalien) als Slices zurück.
+        # Ohne Angabe wird der sichtbare Bereich bzw. die gesamte Aufnahme verwendet.
+        if time_range is None:
+            time_range = self.visible_range
+        if time_range is None:
+            time_range = (0, self.max_valid_time)
         min_time, max_time = time_range
-        self.df = self.df[(self.df["Zeit in ms"] >= min_time) & (self.df["Zeit in ms"] <= max_time)]
-        self.visible_range = time_range  # bleibt erhalten, da ggf. anderweitig verwendet
+        peaks = self.peaks[_time_slice(self.peak_times, min_time, max_time)]
+        anomalies = self.peaks[self.rr_anomaly_indices]
+        anomalies = anomalies[_time_slice(self.ms[anomalies], min_time, max_time)]
+        return EKGWindow(min_time, max_time, self.mv, self.ms, peaks, anomalies)
 
     def get_rr_anomaly_table(self):
-        # Gibt eine Tabelle der RR-Anomalien (Zeitpunkte in ms) zurück.
-        if not hasattr(self, "rr_anomalies") or self.rr_anomalies.empty:
-            return pd.DataFrame(columns=["Zeitpunkt (ms)"])
-        max_time = self.df["Zeit in ms"].max()
-        valid_anomalies = self.rr_anomalies[self.rr_anomalies["Zeit in ms"] <= max_time]
-        return pd.DataFrame({"Zeitpunkt (ms)": valid_anomalies["Zeit in ms"].astype(int).values})
+        # Gibt eine Tabelle der RR-Anomalien (Zeitpunkte in ms) bis zum Ende des sichtbaren Bereichs zurück.
+        max_time = self.max_valid_time if self.visible_range is None else self.visible_range[1]
+        anomaly_times = self.peak_times[self.rr_anomaly_indices]
+        valid_times = anomaly_times[_time_slice(anomaly_times, 0, max_time)]
+        return pd.DataFrame({"Zeitpunkt (ms)": valid_times.astype(int)})
 
     def get_visible_rr_anomalies(self):
         # Gibt RR-Anomalien im sichtbaren Zeitbereich zurück.
-        if not hasattr(self, "rr_anomalies") or self.rr_anomalies.empty:
-            return []
-        max_time = self.df["Zeit in ms"].max()
-        min_time, max_visible = (0, max_time) if self.visible_range is None else self.visible_range
-        visible_anomalies = self.rr_anomalies[
-            (self.rr_anomalies["Zeit in ms"] >= min_time) &
-            (self.rr_anomalies["Zeit in ms"] <= max_visible) &
-            (self.rr_anomalies["Zeit in ms"] <= max_time)
-        ]
-        return visible_anomalies["Zeit in ms"].astype(int).tolist()
\ No newline at end of file
+        return self.get_window().anomaly_ms.astype(int).tolist()
@@ -0,0 +1,190 @@
+# Modul mit einem adaptiven R-Peak-Detektor (vektorisierte Pan-Tompkins-Pipeline)
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from scipy.ndimage import maximum_filter1d, percentile_filter
+from scipy.signal import butter, find_peaks, sosfiltfilt
+
+# Verfügbare Detektoren: fester Schwellwert (find_peaks mit height) oder adaptives Pan-Tompkins-Verfahren
+PEAK_METHODS = ("threshold", "pan_tompkins")
+
+# Standard-Detektor für Oberfläche, Reports, Sammel-Export und Stapelanalyse (gleiche Ergebnisse überall)
+DEFAULT_PEAK_METHOD = "pan_tompkins"
+
+BANDPASS_HZ = (5.0, 15.0)  # Durchlassbereich für den QRS-Komplex
+INTEGRATION_WINDOW_S = 0.15  # Fensterlänge der gleitenden Integration
+REFRACTORY_S = 0.2  # Mindestabstand zweier Herzschläge
+THRESHOLD_NEIGHBOURS = 16  # Anzahl benachbarter Kandidaten für die adaptive Schwelle
+
+# Parallele Suche lokaler Maxima: Anzahl Prozesse (Umgebungsvariable) und Mindestlänge des Signals
+PEAK_WORKERS = int(os.environ.get("EKG_PEAK_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_SAMPLES = 2_000_000
+CHUNKS_PER_WORKER = 2
+
+# Startverfahren aller Prozess-Pools: Die Pools werden aus Threads (Streamlit-Skripte, Warteschlangen) gestartet;
+# mit fork erbten die Worker dort gerade gehaltene Locks und blieben hängen, daher forkserver (sonst spawn)
+PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def estimate_sampling_rate(ms):
+    # Schätzt die Abtastrate (Hz) aus dem Median der Zeitabstände in ms.
+    steps = np.diff(np.asarray(ms[:10000], dtype=np.float64))
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        raise ValueError("Abtastrate kann nicht bestimmt werden.")
+    return 1000.0 / np.median(steps)
+
+
+def _moving_window_integration(x, width):
+    # Gleitender Mittelwert über width Werte (kausal) mittels kumulativer Summe.
+    cumsum = np.cumsum(np.concatenate(([0.0], x)))
+    out = np.empty_like(x)
+    out[:width] = cumsum[1:width + 1] / np.arange(1, min(width, len(x)) + 1)
+    out[width:] = (cumsum[width + 1:] - cumsum[1:-width]) / width
+    return out
+
+
+def pan_tompkins(signal, fs):
+    # Erkennt R-Peaks mit Bandpass, Ableitung, Quadrierung, gleitender Integration und adaptiver Schwelle.
+    # Alle Schritte arbeiten vektorisiert auf NumPy-Arrays (lineare Laufzeit).
+    # Gibt die Positionen der R-Peaks im übergebenen Signal zurück.
+    signal = np.asarray(signal, dtype=np.float64)
+    integration_width = max(1, int(round(INTEGRATION_WINDOW_S * fs)))
+    refractory = max(1, int(round(REFRACTORY_S * fs)))
+    if len(signal) < 3 * integration_width:
+        return np.empty(0, dtype=np.int64)
+
+    # 1. Bandpass (QRS-Energie hervorheben, Baseline und Rauschen unterdrücken)
+    nyquist = fs / 2
+    high = min(BANDPASS_HZ[1], 0.9 * nyquist)
+    sos = butter(2, [BANDPASS_HZ[0] / nyquist, high / nyquist], btype="bandpass", output="sos")
+    filtered = sosfiltfilt(sos, signal)
+
+    # 2. Ableitung (5-Punkt-Differenzierer) und 3. Quadrierung
+    derivative = np.convolve(filtered, np.array([1, 2, 0, -2, -1]) * (fs / 8), mode="same")
+    squared = derivative ** 2
+
+    # 4. Gleitende Integration über ca. die QRS-Breite
+    integrated = _moving_window_integration(squared, integration_width)
+
+    # 5. Adaptive Schwelle: Kandidaten mit Mindestabstand, Signal- und Rauschniveau aus den Nachbarkandidaten
+    candidates, _ = find_peaks(integrated, distance=refractory)
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+    heights = integrated[candidates]
+    signal_level = maximum_filter1d(heights, size=THRESHOLD_NEIGHBOURS, mode="nearest")
+    noise_level = percentile_filter(heights, 25, size=THRESHOLD_NEIGHBOURS, mode="nearest")
+    threshold = noise_level + 0.25 * (signal_level - noise_level)
+    accepted = candidates[heights > threshold]
+    if len(accepted) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # R-Zacke im Originalsignal: Maximum im Integrationsfenster vor dem integrierten Peak
+    starts = np.clip(accepted - integration_width, 0, len(signal) - integration_width - 1)
+    windows = np.lib.stride_tricks.sliding_window_view(signal, integration_width + 1)[starts]
+    r_peaks = np.unique(starts + np.argmax(windows, axis=1))
+
+    # Doppelte Treffer innerhalb der Refraktärzeit verwerfen
+    keep = np.concatenate(([True], np.diff(r_peaks) >= refractory))
+    return r_peaks[keep].astype(np.int64)
+
+
+def _get_pool(workers):
+    # Gibt einen wiederverwendbaren Prozess-Pool mit der gewünschten Anzahl Prozesse zurück.
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=PROCESS_CONTEXT)
+            _pool_workers = workers
+        return _pool
+
+
+def _next_change(signal, position):
+    # Gibt die erste Position >= position zurück, an der sich der Wert gegenüber dem Vorgänger ändert.
+    n = len(signal)
+    step = 1024
+    while position < n:
+        block = np.asarray(signal[position - 1:min(position + step, n)])
+        changes = np.flatnonzero(block[1:] != block[:-1])
+        if len(changes) > 0:
+            return position + int(changes[0])
+        position += step
+        step *= 2
+    return n
+
+
+def _chunk_bounds(signal, chunk_count):
+    # Teilt das Signal in etwa gleich große Abschnitte. Grenzen liegen nur dort, wo sich der Wert ändert,
+    # damit kein Plateau zerschnitten wird; so liefert jeder Abschnitt genau die Peaks der Gesamtsuche.
+    n = len(signal)
+    desired = np.linspace(0, n, chunk_count + 1, dtype=np.int64)[1:-1]
+    inner = [_next_change(signal, int(position)) for position in desired if position > 0]
+    return np.unique(np.array([0, *inner, n], dtype=np.int64))
+
+
+def _open_source(source):
+    # Öffnet das Signal im Worker: direkt aus der Cache-Datei oder aus gemeinsamem Speicher.
+    kind, name, dtype, length, step = source
+    if kind == "file":
+        return np.memmap(name, dtype=dtype, mode="r", shape=(length,))[::step], None
+    shm = shared_memory.SharedMemory(name=name)
+    return np.ndarray((length,), dtype=dtype, buffer=shm.buf)[::step], shm
+
+
+def _local_maxima_chunk(source, start, end):
+    # Sucht lokale Maxima im Abschnitt [start, end) des Signals.
+    # Je ein Randwert links und rechts wird mitgenommen, damit Peaks an der Abschnittsgrenze erkannt werden.
+    signal, shm = _open_source(source)
+    try:
+        lo, hi = max(start - 1, 0), min(end + 1, len(signal))
+        positions = find_peaks(signal[lo:hi])[0] + lo
+        del signal
+    finally:
+        if shm is not None:
+            shm.close()
+    return positions[(positions >= start) & (positions < end)]
+
+
+def find_local_maxima(signal, workers=None, source_file=None):
+    # Findet alle lokalen Maxima wie find_peaks(signal), bei langen Signalen parallel in einem Prozess-Pool.
+    # source_file=(Pfad, dtype, Länge, Schrittweite) beschreibt ein Signal, das die Worker selbst aus der
+    # Cache-Datei einblenden; sonst wird es einmal in gemeinsamen Speicher kopiert.
+    # Das Ergebnis ist identisch mit der Berechnung in einem Durchlauf.
+    signal = np.asarray(signal) if source_file is None else signal
+    workers = PEAK_WORKERS if workers is None else workers
+    if workers <= 1 or len(signal) < PARALLEL_MIN_SAMPLES:
+        return find_peaks(np.asarray(signal))[0]
+
+    bounds = _chunk_bounds(signal, workers * CHUNKS_PER_WORKER)
+    shm = None
+    try:
+        if source_file is not None:
+            source = ("file", *source_file)
+        else:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, signal.nbytes))
+            shared = np.ndarray(signal.shape, dtype=signal.dtype, buffer=shm.buf)
+            shared[:] = signal
+            del shared
+            source = ("shm", shm.name, signal.dtype.str, len(signal), 1)
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_local_maxima_chunk, source, int(start), int(end))
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        parts = [future.result() for future in futures]
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    # Abschnitte überschneiden sich nur in Randwerten; doppelte Treffer entfernen
+    return np.unique(np.concatenate(parts))
@@ -17,6 +17,37 @@ class Person:
         self.username = username
         self.password = password
 
+    @classmethod
+    def from_dict(cls, person_dict):
+        # Erstellt eine Person aus einem Datenbank-Eintrag.
+        return cls(
+            person_dict["id"],
+            person_dict["date_of_birth"],
+            person_dict["firstname"],
+            person_dict["lastname"],
+            person_dict["picture_path"],
+            person_dict["ekg_tests"],
+            person_dict.get("gender", "unknown"),
+            person_dict.get("role", "user"),
+            person_dict.get("username", ""),
+            person_dict.get("password", "")
+        )
+
+    def to_dict(self):
+        # Gibt die Person als Datenbank-Eintrag zurück.
+        return {
+            "id": self.id,
+            "date_of_birth": self.date_of_birth,
+            "firstname": self.firstname,
+            "lastname": self.lastname,
+            "picture_path": self.picture_path,
+            "ekg_tests": list(self.ekg_tests),
+            "gender": self.gender,
+            "role": self.role,
+            "username": self.username,
+            "password": self.password,
+        }
+
     def get_full_name(self):
         # Gibt den vollständigen Namen zurück.
         return self.lastname + ", " + self.firstname
@@ -38,8 +69,14 @@ class Person:
         return 220 - age
 
     @classmethod
-    def load_by_id(cls, id, db):
-        # Lädt eine Person anhand der ID aus der Datenbank.
+    def load_by_id(cls, id, db=None):
+        # Lädt eine Person anhand der ID aus der Datenbank (ohne Liste über den Index des Personenverzeichnisses).
+        if db is None:
+            from .person_repository import get_person_repository
+            person = get_person_repository().get_by_id(id)
+            if person is None:
+                raise ValueError(f"Person mit ID {id} nicht gefunden.")
+            return person
         for person in db:
             if person.id == id:
                 return person
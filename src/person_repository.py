@@ -0,0 +1,183 @@
+# Modul mit einem indizierten In-Memory-Verzeichnis aller Personen (O(1)-Zugriff statt linearer Suche)
+import threading
+from . import database
+from .person import Person
+from .person_search import PersonSearchIndex, DEFAULT_LIMIT
+
+
+def _username_key(username):
+    # Normalisiert einen Benutzernamen für den Index (wie beim Login: ohne Leerzeichen, Kleinschreibung).
+    return (username or "").strip().lower()
+
+
+def _name_key(firstname, lastname):
+    # Normalisiert Vor- und Nachname für den Namensindex.
+    return (firstname or "").strip().lower(), (lastname or "").strip().lower()
+
+
+class PersonRepository:
+    # Hält alle Personen als Person-Objekte mit Hash-Indizes nach ID, Benutzername, Name und EKG-ID.
+    # Schreibzugriffe aktualisieren die Indizes gezielt; Änderungen anderer Prozesse werden über die
+    # Revision der Datenbank erkannt und führen zu einem vollständigen Neuaufbau.
+
+    def __init__(self):
+        # Initialisiert das leere Verzeichnis; geladen wird beim ersten Zugriff.
+        self._lock = threading.RLock()
+        self._revision = None  # Datenstand der Datenbank beim letzten Laden
+        self._loaded = False
+        self._by_id = {}  # Personen-ID -> Person (in Datenbank-Reihenfolge)
+        self._by_username = {}  # normalisierter Benutzername -> Personen-ID
+        self._by_name = {}  # (Vorname, Nachname) -> Liste von Personen-IDs
+        self._by_ekg_id = {}  # EKG-ID -> Personen-ID
+        self._search = PersonSearchIndex()  # Suchindex über Vorname, Nachname und Benutzername
+
+    def _ensure_fresh(self):
+        # Baut die Indizes neu auf, wenn sich die Datenbank seit dem letzten Laden geändert hat.
+        revision = database.get_revision()
+        if self._loaded and revision == self._revision:
+            return
+        self._by_id, self._by_username, self._by_name, self._by_ekg_id = {}, {}, {}, {}
+        for person_dict in database.get_all_persons():
+            self._add(Person.from_dict(person_dict))
+        self._search = PersonSearchIndex(self._by_id.values())
+        self._revision = revision
+        self._loaded = True
+
+    def _add(self, person):
+        # Nimmt eine Person in alle Indizes auf (bestehende Einträge behalten ihre Position).
+        self._by_id[person.id] = person
+        self._by_username[_username_key(person.username)] = person.id
+        self._by_name.setdefault(_name_key(person.firstname, person.lastname), []).append(person.id)
+        for test in person.ekg_tests:
+            self._by_ekg_id[test["id"]] = person.id
+
+    def _unindex(self, person):
+        # Entfernt eine Person aus den Nebenindizes (Benutzername, Name, EKG-ID).
+        username_key = _username_key(person.username)
+        if self._by_username.get(username_key) == person.id:
+            del self._by_username[username_key]
+        name_key = _name_key(person.firstname, person.lastname)
+        ids = self._by_name.get(name_key, [])
+        if person.id in ids:
+            ids.remove(person.id)
+            if not ids:
+                del self._by_name[name_key]
+        for test in person.ekg_tests:
+            if self._by_ekg_id.get(test["id"]) == person.id:
+                del self._by_ekg_id[test["id"]]
+
+    def _replace(self, person_id, person_dict):
+        # Führt die Indizes nach einem Schreibzugriff nach (None = gelöscht) und merkt sich den Dateistand.
+        # Hat ein anderer Prozess zwischen dem letzten Laden und dem eigenen Schreibzugriff geschrieben,
+        # werden die Indizes stattdessen neu aufgebaut (sonst gälte dessen Änderung als bereits gesehen).
+        before, after = database.get_last_write()
+        if before != self._revision:
+            self._loaded = False
+            self._ensure_fresh()
+            return
+        old = self._by_id.get(person_id)
+        if old is not None:
+            self._unindex(old)
+        if person_dict is None:
+            self._by_id.pop(person_id, None)
+            self._search.remove(person_id)
+        else:
+            person = Person.from_dict(person_dict)
+            self._add(person)
+            self._search.add(person)
+        self._revision = after
+
+    # --- Lesen ---
+
+    def all(self):
+        # Gibt alle Personen in Datenbank-Reihenfolge zurück.
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._by_id.values())
+
+    def get_by_id(self, person_id):
+        # Gibt die Person zur ID zurück oder None.
+        with self._lock:
+            self._ensure_fresh()
+            return self._by_id.get(person_id)
+
+    def get_by_username(self, username):
+        # Gibt die Person zum Benutzernamen zurück (ohne Beachtung von Groß-/Kleinschreibung) oder None.
+        with self._lock:
+            self._ensure_fresh()
+            person_id = self._by_username.get(_username_key(username))
+            return self._by_id.get(person_id) if person_id is not None else None
+
+    def get_by_name(self, firstname, lastname):
+        # Gibt die erste Person mit diesem Vor- und Nachnamen zurück oder None.
+        with self._lock:
+            self._ensure_fresh()
+            ids = self._by_name.get(_name_key(firstname, lastname))
+            return self._by_id[ids[0]] if ids else None
+
+    def get_ekg_test(self, ekg_id):
+        # Gibt (Person, EKG-Test-Dictionary) zur EKG-ID zurück oder (None, None).
+        with self._lock:
+            self._ensure_fresh()
+            person_id = self._by_ekg_id.get(ekg_id)
+            if person_id is None:
+                return None, None
+            person = self._by_id[person_id]
+            return person, next(test for test in person.ekg_tests if test["id"] == ekg_id)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # Sucht Personen nach Vorname, Nachname oder Benutzername; gibt höchstens limit Treffer nach Relevanz zurück.
+        with self._lock:
+            self._ensure_fresh()
+            return [self._by_id[person_id] for person_id in self._search.search(query, limit)]
+
+    # --- Schreiben (über src/database.py, Indizes werden gezielt nachgeführt) ---
+
+    def insert(self, person_dict):
+        # Legt eine neue Person an.
+        with self._lock:
+            self._ensure_fresh()
+            database.insert_person(person_dict)
+            self._replace(person_dict["id"], person_dict)
+
+    def update(self, person_id, updated_data):
+        # Aktualisiert einzelne Felder einer Person.
+        with self._lock:
+            self._ensure_fresh()
+            person = self._by_id.get(person_id)
+            if person is None:
+                return
+            database.update_person(person_id, dict(updated_data))
+            self._replace(person_id, {**person.to_dict(), **updated_data})
+
+    def delete(self, person_id):
+        # Löscht eine Person.
+        with self._lock:
+            self._ensure_fresh()
+            database.delete_person(person_id)
+            self._replace(person_id, None)
+
+    def add_ekg_test(self, person_id, ekg_test):
+        # Hängt einen EKG-Test an die Tests einer Person an.
+        with self._lock:
+            self._ensure_fresh()
+            person = self._by_id[person_id]
+            database.add_ekg_test(person_id, ekg_test)
+            self._replace(person_id, {**person.to_dict(), "ekg_tests": person.ekg_tests + [ekg_test]})
+
+    def remove_ekg_test(self, person_id, ekg_id):
+        # Entfernt einen EKG-Test aus den Tests einer Person.
+        with self._lock:
+            self._ensure_fresh()
+            person = self._by_id[person_id]
+            database.remove_ekg_test(person_id, ekg_id)
+            self._replace(person_id, {**person.to_dict(), "ekg_tests": [t for t in person.ekg_tests if t["id"] != ekg_id]})
+
+
+# Prozessweite Instanz, von allen Streamlit-Sessions gemeinsam genutzt
+_person_repository = PersonRepository()
+
+
+def get_person_repository():
+    # Gibt das prozessweite Personenverzeichnis zurück.
+    return _person_repository
@@ -0,0 +1,164 @@
+# Modul mit einem Suchindex über Vorname, Nachname und Benutzername (Präfix-Index und Teilwortsuche)
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+# Standardanzahl angezeigter Suchtreffer
+DEFAULT_LIMIT = 50
+
+# Anteil veralteter Zeilen im Suchtext, ab dem er neu aufgebaut wird
+REBUILD_RATIO = 0.5
+
+
+def _normalize(text):
+    # Vereinheitlicht einen Suchtext (Kleinschreibung, ohne Leerzeichen am Rand).
+    return (text or "").strip().lower()
+
+
+class PersonSearchIndex:
+    # Suchindex über die Personen des Personenverzeichnisses, mit drei Trefferstufen:
+    # 1. exakter Treffer eines Feldes, 2. Feld beginnt mit dem Suchbegriff (sortierte Präfix-Liste, binäre Suche),
+    # 3. Suchbegriff kommt im Feld vor (Suche in einem zusammenhängenden Text, eine Zeile je Person).
+    # Stufe 1 und 2 sind alphabetisch nach Nachname und Vorname sortiert, Stufe 3 nach Einfüge-Reihenfolge.
+
+    def __init__(self, persons=()):
+        # Baut den Index für alle übergebenen Personen auf einmal auf (sortieren statt einzeln einfügen).
+        self._entries = {}  # Personen-ID -> (Sortierschlüssel, Suchfelder)
+        self._prefix = []  # sortierte Liste (Suchfeld, Sortierschlüssel, Personen-ID)
+        self._order = {}  # Personen-IDs in Einfüge-Reihenfolge (Bearbeiten ändert sie nicht)
+        for person in persons:
+            self._index(person)
+            self._prefix.extend(self._prefix_entries(person.id))
+        self._prefix.sort()
+        self._rebuild_text()
+
+    @staticmethod
+    def _fields(person):
+        # Gibt die normalisierten Suchfelder einer Person zurück (Namen mit Leerzeichen auch wortweise).
+        values = [_normalize(person.firstname), _normalize(person.lastname), _normalize(person.username)]
+        words = [word for value in values[:2] for word in value.split() if word != value]
+        return tuple(value for value in dict.fromkeys(values + words) if value)
+
+    def _entry(self, person):
+        # Gibt Sortierschlüssel und Suchfelder einer Person zurück.
+        return (_normalize(person.lastname), _normalize(person.firstname), person.id), self._fields(person)
+
+    def _index(self, person):
+        # Nimmt eine Person in die Eintragsliste auf.
+        self._entries[person.id] = self._entry(person)
+        self._order.setdefault(person.id, None)
+
+    def _prefix_entries(self, person_id):
+        # Gibt die Einträge der Präfix-Liste einer Person zurück.
+        sort_key, fields = self._entries[person_id]
+        return [(field, sort_key, person_id) for field in fields]
+
+    @staticmethod
+    def _line(fields):
+        # Gibt die Zeile einer Person im Suchtext zurück (Felder durch Tabulator getrennt).
+        return "\t".join(fields) + "\n"
+
+    def _rebuild_text(self):
+        # Baut den Suchtext neu auf: eine Zeile je Person in Einfüge-Reihenfolge, ohne veraltete Zeilen.
+        self._line_ids = list(self._order)  # Personen-ID je Zeile (None = veraltet)
+        lines = [self._line(self._entries[person_id][1]) for person_id in self._line_ids]
+        self._line_starts = []  # Startposition jeder Zeile im Suchtext
+        position = 0
+        for line in lines:
+            self._line_starts.append(position)
+            position += len(line)
+        self._line_of = {person_id: i for i, person_id in enumerate(self._line_ids)}
+        self._text = "".join(lines)
+        self._stale_lines = 0
+
+    def _append_line(self, person_id):
+        # Hängt die Zeile einer Person an den Suchtext an.
+        self._line_of[person_id] = len(self._line_ids)
+        self._line_ids.append(person_id)
+        self._line_starts.append(len(self._text))
+        self._text += self._line(self._entries[person_id][1])
+
+    def _drop_line(self, person_id):
+        # Markiert die Zeile einer Person als veraltet; bei zu vielen veralteten Zeilen wird neu aufgebaut.
+        line = self._line_of.pop(person_id, None)
+        if line is not None:
+            self._line_ids[line] = None
+            self._stale_lines += 1
+
+    def add(self, person):
+        # Nimmt eine neue oder geänderte Person in den Index auf.
+        # Eine neue Person kommt ans Ende des Suchtexts; eine geänderte behält ihren Platz in der
+        # Einfüge-Reihenfolge, daher wird der Suchtext neu aufgebaut, wenn sich ihre Suchfelder ändern.
+        previous = self._entries.get(person.id)
+        if previous == self._entry(person):
+            return  # Suchfelder unverändert (z. B. neues Passwort oder Bild)
+        self._unindex(person.id)
+        self._index(person)
+        for entry in self._prefix_entries(person.id):
+            insort(self._prefix, entry)
+        if previous is None:
+            self._append_line(person.id)
+            self._compact()
+        else:
+            self._rebuild_text()
+
+    def remove(self, person_id):
+        # Entfernt eine Person aus dem Index.
+        self._unindex(person_id)
+        self._order.pop(person_id, None)
+        self._compact()
+
+    def _unindex(self, person_id):
+        # Entfernt die Suchfelder einer Person aus Präfix-Liste und Suchtext.
+        if person_id not in self._entries:
+            return
+        for entry in self._prefix_entries(person_id):
+            position = bisect_left(self._prefix, entry)
+            if position < len(self._prefix) and self._prefix[position] == entry:
+                del self._prefix[position]
+        self._drop_line(person_id)
+        del self._entries[person_id]
+
+    def _compact(self):
+        # Baut den Suchtext neu auf, wenn der Anteil veralteter Zeilen zu groß wird.
+        if self._stale_lines > REBUILD_RATIO * max(1, len(self._line_ids)):
+            self._rebuild_text()
+
+    def __len__(self):
+        # Gibt die Anzahl indizierter Personen zurück.
+        return len(self._entries)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # Gibt die IDs der bestpassenden Personen zurück (höchstens limit).
+        # Ohne Suchbegriff werden die ersten Personen in Einfüge-Reihenfolge geliefert.
+        query = _normalize(query)
+        if not query:
+            return list(islice(self._order, limit))
+
+        # Stufe 1 und 2: exakte und Präfix-Treffer bilden einen zusammenhängenden Bereich der sortierten Liste.
+        # Der Bereich ist nach Suchfeld sortiert; die besten Treffer nach Namen werden daraus per Heap ausgewählt.
+        start = bisect_left(self._prefix, (query,))
+        end = bisect_left(self._prefix, (query + "\U0010ffff",), start)
+        ranks = {}  # Personen-ID -> (Stufe, Sortierschlüssel) des besten Treffers
+        for field, sort_key, person_id in self._prefix[start:end]:
+            rank = (0 if field == query else 1, sort_key)
+            if person_id not in ranks or rank < ranks[person_id]:
+                ranks[person_id] = rank
+        results = [person_id for _, person_id in heapq.nsmallest(limit, ((rank, person_id) for person_id, rank in ranks.items()))]
+        seen = set(ranks)
+
+        # Stufe 3: Teilwort-Treffer; str.find durchsucht den Text in C, je Treffer wird zur nächsten Zeile gesprungen
+        if "\t" in query or "\n" in query:
+            return results
+        position = self._text.find(query)
+        while position != -1 and len(results) < limit:
+            line = bisect_right(self._line_starts, position) - 1
+            person_id = self._line_ids[line]
+            if person_id is not None and person_id not in seen:
+                seen.add(person_id)
+                results.append(person_id)
+            next_line = line + 1
+            if next_line >= len(self._line_starts):
+                break
+            position = self._text.find(query, self._line_starts[next_line])
+        return results
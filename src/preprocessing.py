@@ -0,0 +1,215 @@
+# Modul für die Vorverarbeitung hochgeladener EKG-Dateien im Hintergrund (Umwandlung, Pyramide, Standardanalyse)
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import is_numeric_dtype
+from .ekg_cache import iter_text_chunks, remove_cache
+from .ekg_format import convert_text_file, is_ekgz, source_hash, EKGZReader, FORMAT_EXTENSION, EKG_DATA_DIR
+from .signal_cache import get_signal_cache
+from .result_store import get_result_store
+from .ekgdata import EKGdata
+
+# Anzahl gleichzeitiger Vorverarbeitungen (Umgebungsvariable); Threads, damit der prozessweite
+# Signal-Cache direkt gefüllt wird
+PREPROCESS_WORKERS = int(os.environ.get("EKG_PREPROCESS_WORKERS", 1))
+
+# Standardanalysen, die nach dem Upload vorab berechnet werden (entsprechen den Voreinstellungen der Oberfläche)
+DEFAULT_ANALYSES = (
+    {"method": "pan_tompkins", "height": None, "threshold_ms": 300},
+    {"method": "threshold", "height": 350, "threshold_ms": 300},
+)
+
+# Zustände eines Auftrags und ihre Anzeige in der Oberfläche
+JOB_STATES = {
+    "queued": "⏳ wartet auf Vorverarbeitung",
+    "running": "⚙️ wird vorbereitet",
+    "done": "✅ bereit",
+    "failed": "❌ fehlgeschlagen",
+}
+
+
+class PreprocessingJob:
+    # Zustand der Vorverarbeitung einer hochgeladenen Aufnahme.
+
+    def __init__(self, ekg_id, source_path):
+        # Initialisiert einen wartenden Auftrag.
+        self.ekg_id = ekg_id
+        self.source_path = source_path
+        self.state = "queued"
+        self.step = ""  # aktueller Verarbeitungsschritt
+        self.error = None
+        self.submitted_at = time.time()
+        self.duration = None
+
+    @property
+    def label(self):
+        # Gibt den Zustand als Anzeigetext zurück.
+        text = JOB_STATES[self.state]
+        if self.state == "running" and self.step:
+            return f"{text} ({self.step})"
+        if self.state == "failed" and self.error:
+            return f"{text}: {self.error}"
+        return text
+
+
+def validate_ekg_file(source_path):
+    # Prüft, ob die Datei zwei numerische Spalten (Messwert, Zeit in ms) enthält; löst sonst ValueError aus.
+    first_chunk = next(iter_text_chunks(source_path, chunk_rows=1000), None)
+    if first_chunk is None:
+        raise ValueError("Die Datei enthält keine gültigen Messwerte.")
+    mv, ms = first_chunk
+    if not is_numeric_dtype(mv) or not is_numeric_dtype(ms):
+        raise ValueError("Erwartet werden zwei numerische, durch Tabulator getrennte Spalten (Messwert, Zeit in ms).")
+
+
+def validate_upload(source_path):
+    # Prüft eine hochgeladene Datei (Textdatei oder .ekgz), bevor der EKG-Test angelegt wird; löst sonst ValueError aus.
+    if not is_ekgz(source_path):
+        validate_ekg_file(source_path)
+        return
+    try:
+        length = len(EKGZReader(source_path))
+    except (OSError, struct.error, KeyError) as error:
+        raise ValueError("Keine gültige EKG-Datei im kompakten Format.") from error
+    if length == 0:
+        raise ValueError("Die Datei enthält keine gültigen Messwerte.")
+
+
+def remove_converted_text_files(directory=EKG_DATA_DIR):
+    # Entfernt Textdateien samt Cache-Dateien, zu denen eine .ekgz-Datei mit gleichem Inhalt (SHA-256) existiert.
+    # Wird einmal je Prozess vor der ersten Vorverarbeitung aufgerufen, wenn noch kein Leser die Textdatei verwendet.
+    removed = []
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if not is_ekgz(name):
+            continue
+        text_path = os.path.join(directory, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(text_path):
+            continue
+        try:
+            converted = source_hash(os.path.join(directory, name)) == source_hash(text_path)
+        except (OSError, ValueError):
+            continue
+        if converted:
+            remove_cache(text_path)
+            os.remove(text_path)
+            removed.append(text_path)
+    return removed
+
+
+def delete_recording(ekg_id, directory=EKG_DATA_DIR):
+    # Löscht die Rohdaten einer Aufnahme (.ekgz und .txt) mit Cache-Dateien, gespeicherten Ergebnissen,
+    # Eintrag im Signal-Cache und Vorverarbeitungsauftrag.
+    for extension in (FORMAT_EXTENSION, ".txt"):
+        path = os.path.join(directory, f"{ekg_id}{extension}")
+        if not os.path.exists(path):
+            continue
+        try:
+            get_result_store().delete(source_hash(path))
+        except (OSError, ValueError):
+            pass
+        if extension == ".txt":
+            remove_cache(path)
+        os.remove(path)
+    get_signal_cache().invalidate(ekg_id)
+    get_preprocessor().forget(ekg_id)
+
+
+class Preprocessor:
+    # Führt die Vorverarbeitung neuer Aufnahmen in einem Thread-Pool aus und merkt sich den Zustand je EKG-ID.
+
+    def __init__(self, workers=PREPROCESS_WORKERS):
+        # Initialisiert den Pool (wird erst beim ersten Auftrag gestartet) und die Auftragsliste.
+        self.workers = workers
+        self._executor = None
+        self._jobs = {}  # EKG-ID -> PreprocessingJob
+        self._lock = threading.Lock()
+
+    def submit(self, ekg_id, source_path):
+        # Reiht eine Aufnahme zur Vorverarbeitung ein und gibt den Auftrag zurück.
+        with self._lock:
+            job = self._jobs.get(ekg_id)
+            if job is not None and job.state in ("queued", "running"):
+                return job
+            job = PreprocessingJob(ekg_id, source_path)
+            self._jobs[ekg_id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ekg-preprocess")
+            self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        # Validiert die Datei, wandelt sie in das kompakte Format um, baut die Pyramide auf und berechnet die Standardanalysen.
+        started = time.perf_counter()
+        job.state = "running"
+        try:
+            job.step = "Datei prüfen"
+            if not is_ekgz(job.source_path):
+                validate_ekg_file(job.source_path)
+
+                # Textdatei in das kompakte Format umwandeln; die .ekgz-Datei ist erst nach dem
+                # atomaren Umbenennen sichtbar. Die Textdatei bleibt bis zum nächsten Start liegen,
+                # da ein Leser sie bereits über ekg_source_path gewählt haben kann.
+                job.step = "In kompaktes Format umwandeln"
+                text_path = job.source_path
+                job.source_path = os.path.splitext(text_path)[0] + FORMAT_EXTENSION
+                convert_text_file(text_path, job.source_path)
+
+            job.step = "Signal laden"
+            signal = get_signal_cache().get(job.ekg_id, job.source_path)
+            if len(signal) == 0:
+                raise ValueError("Die Datei enthält keine gültigen Messwerte.")
+
+            job.step = "Darstellung vorbereiten"
+            signal.pyramid  # Zugriff berechnet die Min/Max-Pyramide einmalig
+
+            job.step = "Standardanalyse"
+            ekg = EKGdata({"id": job.ekg_id, "date": ""})
+            for analysis in DEFAULT_ANALYSES:
+                ekg.detect_peaks_globally(height=analysis["height"], method=analysis["method"])
+                if len(ekg.peaks) < 2:
+                    continue
+                ekg.detect_rr_anomalies(analysis["threshold_ms"])
+                ekg.estimate_hr()
+            job.state = "done"
+        except Exception as error:
+            # Fehler werden am Auftrag vermerkt und in der Oberfläche angezeigt
+            job.error = str(error)
+            job.state = "failed"
+        finally:
+            job.step = ""
+            job.duration = time.perf_counter() - started
+
+    def status(self, ekg_id):
+        # Gibt den Auftrag zur EKG-ID zurück oder None, falls die Aufnahme nicht in diesem Prozess hochgeladen wurde.
+        with self._lock:
+            return self._jobs.get(ekg_id)
+
+    def is_pending(self, ekg_id):
+        # Gibt True zurück, solange die Aufnahme noch wartet oder vorbereitet wird.
+        job = self.status(ekg_id)
+        return job is not None and job.state in ("queued", "running")
+
+    def forget(self, ekg_id):
+        # Entfernt den Auftrag einer Aufnahme (z. B. nach dem Löschen).
+        with self._lock:
+            self._jobs.pop(ekg_id, None)
+
+
+# Prozessweite Instanz; Aufträge laufen unabhängig von der Streamlit-Session weiter
+_preprocessor = Preprocessor()
+_startup_cleanup = threading.Lock()
+_startup_cleanup_done = False
+
+
+def get_preprocessor():
+    # Gibt die prozessweite Vorverarbeitung zurück; beim ersten Aufruf im Prozess werden bereits
+    # umgewandelte Textdateien früherer Läufe entfernt.
+    global _startup_cleanup_done
+    if not _startup_cleanup_done:
+        with _startup_cleanup:
+            if not _startup_cleanup_done:
+                _startup_cleanup_done = True
+                remove_converted_text_files()
+    return _preprocessor
@@ -0,0 +1,614 @@
+# Modul für die PDF-Zusammenfassung einer EKG-Analyse (gemeinsamer Aufbau, Bild-Renderer, Auftragswarteschlange,
+# Sammel-Export als ZIP-Archiv)
+#
+# Sammel-Export aus dem Projektverzeichnis:
+#     python -m src.reports [--person ID ...] [--method threshold] [--threshold-ms 300] [--workers N]
+#                           [--output exports/reports.zip]
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
+from PIL import Image
+from . import peak_detection
+from .ekgdata import EKGdata, MAX_ANOMALY_ANNOTATIONS
+from .peak_detection import PEAK_METHODS, DEFAULT_PEAK_METHOD
+from .person_repository import get_person_repository
+
+# Anzahl gleichzeitig erstellter Reports (Umgebungsvariable)
+REPORT_WORKERS = int(os.environ.get("EKG_REPORT_WORKERS", 2))
+
+# Anzahl paralleler Prozesse beim Sammel-Export (Umgebungsvariable, Standard: alle Kerne)
+EXPORT_WORKERS = int(os.environ.get("EKG_EXPORT_WORKERS", os.cpu_count() or 1))
+
+# Verzeichnis der ZIP-Archive des Sammel-Exports und Anzahl der Archive, die dort erhalten bleiben
+EXPORT_DIR = "exports"
+EXPORT_KEEP = int(os.environ.get("EKG_EXPORT_KEEP", 5))
+
+# Anzahl fertiger Reports, die im Speicher gehalten werden (gleiche Anfrage = gleicher Report)
+REPORT_CACHE_SIZE = 32
+
+# Zustände eines Auftrags und ihre Anzeige in der Oberfläche
+REPORT_STATES = {
+    "queued": "⏳ wartet",
+    "running": "⚙️ wird erstellt",
+    "done": "✅ fertig",
+    "failed": "❌ fehlgeschlagen",
+}
+
+# Bildgröße der EKG-Zeitreihe im Report (Pixel bei IMAGE_DPI)
+IMAGE_WIDTH = 1200
+IMAGE_HEIGHT = 500
+IMAGE_DPI = 100
+
+
+class ImageRenderer:
+    # Langlebiger Renderer für PNG-Bilder der EKG-Zeitreihe (matplotlib Agg, im Prozess, ohne kaleido).
+    # Zeichnet direkt aus den Arrays der Aufnahme: reduziertes Signal (Min/Max-Pyramide, zwei Punkte je Pixel),
+    # Peaks und RR-Anomalien als Bänder. Die Figur wird für alle Reports wiederverwendet; Aufrufe werden serialisiert.
+
+    def __init__(self, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, dpi=IMAGE_DPI):
+        # Initialisiert den Renderer (Figur wird beim ersten Bild erstellt).
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self._figure = None
+        self._lock = threading.Lock()
+
+    def _get_figure(self):
+        # Gibt die wiederverwendete Figur zurück (ohne pyplot, daher ohne globalen Zustand).
+        if self._figure is None:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self._figure = Figure(figsize=(self.width / self.dpi, self.height / self.dpi), dpi=self.dpi)
+            FigureCanvasAgg(self._figure)
+            # Feste Ränder statt tight_layout (spart einen zusätzlichen Zeichendurchlauf je Bild)
+            self._figure.subplots_adjust(left=0.07, right=0.98, top=0.9, bottom=0.1)
+        return self._figure
+
+    def render(self, ekg):
+        # Gibt die EKG-Zeitreihe im sichtbaren Bereich (wie plot_time_series) als PNG (Bytes) zurück.
+        min_time, max_time = ekg.visible_range if ekg.visible_range is not None else (0, 10000)
+        window = ekg.get_window((min_time, max_time))
+        plot_ms, plot_mv = ekg.signal.plot_window(min_time, max_time, 2 * self.width)
+        y_low = float(plot_mv.min()) if len(plot_mv) else 0.0
+        y_high = float(plot_mv.max()) if len(plot_mv) else 1.0
+        anomaly_times = window.anomaly_ms.astype(float)
+
+        with self._lock:
+            fig = self._get_figure()
+            fig.clear()
+            ax = fig.add_subplot()
+            ax.set_axisbelow(True)
+            ax.plot(plot_ms, plot_mv, color="#636efa", linewidth=0.8, label="EKG")
+            if ekg.peaks_detected:
+                ax.scatter(window.peak_ms, window.peak_mv, color="blue", s=12, zorder=3, label="Peaks")
+            if len(anomaly_times):
+                # Alle Anomalien als ein gemeinsames Objekt (je Anomalie ein Band von 100 ms)
+                ax.broken_barh(list(zip(anomaly_times - 50, [100] * len(anomaly_times))), (y_low, y_high - y_low),
+                               facecolors=(1, 0, 0, 0.4), edgecolors="darkred", linewidth=1, label="RR-Anomalie")
+                for t in anomaly_times[:MAX_ANOMALY_ANNOTATIONS] - 50:
+                    ax.annotate("Anomalie", (t, 1), xycoords=("data", "axes fraction"), va="bottom",
+                                fontsize=8, color="red", annotation_clip=False)
+            ax.set_xlim(min_time, max_time)
+            ax.set_title("EKG-Zeitreihe", loc="left", pad=14)
+            ax.set_xlabel("Zeit in ms")
+            ax.set_ylabel("Messwerte in mV")
+            ax.grid(color="#e5ecf6")
+            ax.legend(loc="upper right", fontsize=8)
+            fig.canvas.draw()
+            # PNG ohne Alphakanal: FPDF trennt Transparenz sonst pixelweise in Python ab (mehrere Sekunden)
+            pixels = np.asarray(fig.canvas.buffer_rgba())[:, :, :3]
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+# Anzahl eingelesener Profilbilder, die je Prozess für weitere Reports vorgehalten werden
+IMAGE_CACHE_SIZE = 64
+
+# Das Wiederverwenden eingelesener Bilder nutzt die interne Bildtabelle von FPDF (pdf.images); sie ist nur für
+# diese Version geprüft (in requirements.txt festgelegt), bei anderen Versionen wird jedes Bild neu eingelesen
+SHARED_IMAGE_FPDF_VERSION = "1.7.2"
+
+_image_infos = OrderedDict()  # (Pfad, Änderungszeit) -> von FPDF eingelesenes Bild
+_image_lock = threading.Lock()
+
+
+def _add_shared_image(pdf, path, **position):
+    # Fügt ein Bild ein und liest es dabei nur beim ersten Report ein (FPDF parst Bilder sonst in jedem Dokument neu).
+    import fpdf
+    if getattr(fpdf, "FPDF_VERSION", None) != SHARED_IMAGE_FPDF_VERSION:
+        pdf.image(path, **position)
+        return
+    key = (path, os.path.getmtime(path))
+    with _image_lock:
+        info = _image_infos.get(key)
+        if info is not None:
+            _image_infos.move_to_end(key)
+            # Eigene Kopie je Dokument: FPDF vergibt Bild- und Objektnummern pro PDF
+            pdf.images[path] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(path, **position)
+    if info is None:
+        with _image_lock:
+            _image_infos[key] = {name: value for name, value in pdf.images[path].items() if name not in ("i", "n")}
+            while len(_image_infos) > IMAGE_CACHE_SIZE:
+                _image_infos.popitem(last=False)
+
+
+def _range_duration_str(ekg):
+    # Gibt die Dauer des gewählten Zeitbereichs als Text zurück.
+    window = ekg.get_window()
+    range_duration_sec = (int(window.ms.max()) - int(window.ms.min())) / 1000
+    return f"{int(range_duration_sec // 60)} Minuten und {int(range_duration_sec % 60)} Sekunden"
+
+
+def analyse_for_report(ekg, request):
+    # Führt die Analyse einer Aufnahme mit den Parametern der Anfrage aus (Peaks, RR-Anomalien, Zeitbereich).
+    # Ohne Zeitbereich gilt die Standardansicht der App (die ersten 10 Sekunden).
+    ekg.detect_peaks_globally(height=request.height, method=request.method)
+    if len(ekg.peaks):
+        ekg.detect_rr_anomalies(request.threshold_ms)
+    time_range = request.time_range
+    if time_range is None:
+        time_range = (ekg.min_time, min(ekg.min_time + 10000, ekg.max_valid_time))
+    ekg.set_time_range(time_range)
+    return ekg
+
+
+def _render_image(renderer, ekg):
+    # Rendert das EKG-Bild; bei Fehlern wird der Report mit Hinweistext statt Bild erstellt.
+    try:
+        return renderer.render(ekg)
+    except Exception:
+        return None
+
+
+def build_report_pdf(person, test, ekg, image_png=None):
+    # Erstellt die PDF-Zusammenfassung einer Analyse und gibt sie als Bytes zurück.
+    # ekg muss analysiert sein (Peaks, RR-Anomalien, sichtbarer Bereich); image_png ist das EKG-Bild oder None.
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font("Arial", "B", 12)
+            self.cell(0, 10, "EKG-Analyse-Zusammenfassung", ln=True, align="C")
+            self.ln(10)
+
+    pdf = PDF()
+    pdf.add_page()
+
+    # Profilbild links oben (bereits eingelesene Bilder werden wiederverwendet)
+    try:
+        _add_shared_image(pdf, person.picture_path, x=10, y=15, w=30)
+    except Exception:
+        pass
+
+    # Zeilenumbruch nach Bild, damit kein Text auf dem Bild steht
+    pdf.ln(35)
+
+    # Alle Personendaten unter dem Bild, kompakt ohne große Abstände
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, f"Name: {person.get_full_name()}", ln=True)
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"ID: {person.id}", ln=True)
+    pdf.cell(0, 10, f"Geburtsjahr: {person.date_of_birth}", ln=True)
+    pdf.cell(0, 8, f"Testdatum: {test['date']}", ln=1)
+    pdf.cell(0, 8, f"Maximale Herzfrequenz (geschätzt): {person.calc_max_heart_rate()} bpm", ln=1)
+    pdf.cell(0, 8, f"Geschätzte Herzfrequenz: {round(ekg.estimate_hr())} bpm", ln=1)
+    pdf.cell(0, 8, f"Gesamtdauer der Messung: {ekg.get_duration_str()}", ln=1)
+
+    try:
+        pdf.cell(0, 8, f"Dauer des gewählten Zeitbereichs: {_range_duration_str(ekg)}", ln=1)
+    except Exception:
+        pdf.cell(0, 8, "Dauer des gewählten Zeitbereichs: nicht verfügbar", ln=1)
+
+    pdf.cell(0, 8, "EKG-Zeitreihe auf der nächsten Seite", ln=1)
+    pdf.cell(0, 8, f"Anzahl erkannter globaler Peaks (Herzschläge): {len(ekg.peaks)}", ln=1)
+
+    pdf.ln(5)
+
+    # Anomalien (sichtbar im gewählten Bereich)
+    visible_anomalies = ekg.get_visible_rr_anomalies()
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 8, f"Anomalien: {len(visible_anomalies)} erkannt (im ausgewählten Bereich)", ln=1)
+    pdf.set_font("Arial", "", 10)
+
+    if visible_anomalies:
+        col_width = 60
+        items_per_row = 3
+        for i, a in enumerate(visible_anomalies):
+            art = "Ausreißer hoch" if a > 2000 else "Ausreißer tief" if a < 400 else "Ausreißer"
+            pdf.cell(col_width, 8, f"{i+1}. {a} ms ({art})", ln=False)
+            if (i + 1) % items_per_row == 0:
+                pdf.ln(8)
+        if len(visible_anomalies) % items_per_row != 0:
+            pdf.ln(8)
+    else:
+        pdf.cell(0, 8, "Keine Anomalien im gewählten Bereich", ln=1)
+
+    # Neue Seite für EKG-Bild
+    pdf.add_page()
+
+    page_width = pdf.w - 2 * pdf.l_margin
+    if image_png is not None:
+        # FPDF liest Bilder nur aus Dateien: kurzlebige temporäre Datei außerhalb von exports/
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+            f.write(image_png)
+        try:
+            pdf.image(f.name, x=pdf.l_margin, y=pdf.get_y(), w=page_width)
+            pdf.ln(90)
+        except Exception:
+            pdf.cell(0, 10, "Das EKG-Bild konnte nicht angezeigt werden.", ln=1)
+        finally:
+            os.remove(f.name)
+    else:
+        pdf.cell(0, 10, "Das EKG-Bild konnte nicht eingefügt werden.", ln=1)
+
+    return pdf.output(dest="S").encode("latin-1")
+
+
+class ReportRequest:
+    # Parameter eines Reports: Person, EKG-Test, Peak-Detektor, Schwellwerte und sichtbarer Zeitbereich.
+
+    def __init__(self, person, test, method=DEFAULT_PEAK_METHOD, height=None, threshold_ms=300, time_range=None):
+        # Initialisiert die Anfrage.
+        self.person = person
+        self.test = test
+        self.method = method
+        self.height = height
+        self.threshold_ms = threshold_ms
+        self.time_range = tuple(int(t) for t in time_range) if time_range is not None else None
+
+    @classmethod
+    def from_ekg(cls, person, test, ekg):
+        # Erstellt die Anfrage aus den Einstellungen einer bereits analysierten Aufnahme.
+        return cls(person, test, ekg.peak_method, ekg.height, ekg.threshold_ms or 300, ekg.visible_range)
+
+    @property
+    def key(self):
+        # Schlüssel für den Report-Cache: Test, Zeitbereich, Schwellwerte sowie die angezeigten Personendaten.
+        person = self.person
+        return (self.test["id"], self.test.get("date"), self.time_range, self.method, self.height, self.threshold_ms,
+                person.id, person.get_full_name(), person.date_of_birth, person.picture_path)
+
+    @property
+    def file_name(self):
+        # Dateiname des Reports für den Download.
+        return f"{self.person.username}_analyse.pdf"
+
+    @property
+    def archive_name(self):
+        # Pfad des Reports im ZIP-Archiv des Sammel-Exports (ein Ordner je Person).
+        folder = self.person.username or str(self.person.id)
+        return f"{folder}/{self.test['date'].replace('.', '-')}_{self.test['id']}.pdf"
+
+
+class ReportJob:
+    # Zustand eines Report-Auftrags (Fortschritt 0–1, Ergebnis als PDF-Bytes).
+
+    def __init__(self, request):
+        # Initialisiert einen wartenden Auftrag.
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.state = "queued"
+        self.step = ""
+        self.progress = 0.0
+        self.error = None
+        self.result = None
+        self.duration = None
+
+    @property
+    def label(self):
+        # Gibt den Zustand als Anzeigetext zurück.
+        text = REPORT_STATES[self.state]
+        if self.state == "running" and self.step:
+            return f"{text} ({self.step})"
+        if self.state == "failed" and self.error:
+            return f"{text}: {self.error}"
+        return text
+
+
+class ReportQueue:
+    # Erstellt Reports in einem Thread-Pool, damit die Streamlit-Session nicht blockiert.
+    # Gleiche Anfragen (gleicher Schlüssel) werden nur einmal erstellt; fertige Reports bleiben im Cache.
+
+    def __init__(self, workers=REPORT_WORKERS, cache_size=REPORT_CACHE_SIZE, renderer=None):
+        # Initialisiert Pool (wird erst beim ersten Auftrag gestartet), Renderer und Cache.
+        self.workers = workers
+        self.cache_size = cache_size
+        self.renderer = renderer or ImageRenderer()
+        self._executor = None
+        self._jobs = OrderedDict()  # Schlüssel -> ReportJob (LRU)
+        self._by_id = {}  # Auftrags-ID -> ReportJob
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def submit(self, request):
+        # Reiht einen Report ein und gibt den Auftrag zurück; vorhandene oder laufende Aufträge werden wiederverwendet.
+        key = request.key
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != "failed":
+                self._jobs.move_to_end(key)
+                self.hits += 1
+                return job
+            if job is not None:
+                self._by_id.pop(job.id, None)  # fehlgeschlagener Auftrag wird ersetzt
+            job = ReportJob(request)
+            self._jobs[key] = job
+            self._by_id[job.id] = job
+            self._evict()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ekg-report")
+            self._executor.submit(self._run, job)
+        return job
+
+    def find(self, request):
+        # Gibt den Auftrag zu einer Anfrage zurück, ohne einen neuen zu starten (None, falls keiner existiert).
+        with self._lock:
+            return self._jobs.get(request.key)
+
+    def _evict(self):
+        # Entfernt die ältesten fertigen Reports, sobald der Cache voll ist.
+        for key in list(self._jobs):
+            if len(self._jobs) <= self.cache_size:
+                break
+            if self._jobs[key].state in ("done", "failed"):
+                self._by_id.pop(self._jobs.pop(key).id, None)
+
+    def _set_step(self, job, step, progress):
+        # Vermerkt den aktuellen Schritt und Fortschritt eines Auftrags.
+        job.step = step
+        job.progress = progress
+
+    def _run(self, job):
+        # Analysiert die Aufnahme mit den Parametern der Anfrage, rendert das Bild und erstellt das PDF.
+        started = time.perf_counter()
+        request = job.request
+        job.state = "running"
+        try:
+            self._set_step(job, "EKG laden", 0.1)
+            ekg = EKGdata(request.test)
+
+            self._set_step(job, "Analyse", 0.3)
+            analyse_for_report(ekg, request)
+
+            self._set_step(job, "Bild erzeugen", 0.5)
+            image_png = _render_image(self.renderer, ekg)
+
+            self._set_step(job, "PDF erstellen", 0.8)
+            job.result = build_report_pdf(request.person, request.test, ekg, image_png)
+            job.progress = 1.0
+            job.state = "done"
+        except Exception as error:
+            job.error = str(error)
+            job.state = "failed"
+        finally:
+            job.step = ""
+            job.duration = time.perf_counter() - started
+
+    def submit_export(self, requests, output_path=None, workers=None):
+        # Startet einen Sammel-Export in einem eigenen Hintergrund-Thread und gibt den Auftrag zurück.
+        job = ExportJob(requests, output_path or export_path())
+        with self._lock:
+            self._prune_export_jobs()
+            self._by_id[job.id] = job
+        threading.Thread(target=job.run, args=(workers,), name="ekg-report-export", daemon=True).start()
+        return job
+
+    def _prune_export_jobs(self, keep=EXPORT_KEEP):
+        # Vergisst abgeschlossene Sammel-Exporte bis auf die keep neuesten (wie prune_exports für die Archive).
+        finished = [job_id for job_id, job in self._by_id.items()
+                    if isinstance(job, ExportJob) and job.state in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - keep)]:
+            del self._by_id[job_id]
+
+    def status(self, job_id):
+        # Gibt den Auftrag (Report oder Sammel-Export) zur ID zurück oder None (unbekannt oder aus dem Cache entfernt).
+        with self._lock:
+            return self._by_id.get(job_id)
+
+
+class ExportJob:
+    # Zustand eines Sammel-Exports (alle Reports einer Auswahl in einem ZIP-Archiv) mit Durchsatz in Reports/s.
+
+    def __init__(self, requests, output_path):
+        # Initialisiert einen wartenden Sammel-Export.
+        self.id = uuid.uuid4().hex
+        self.requests = requests
+        self.output_path = output_path
+        self.state = "queued"
+        self.total = len(requests)
+        self.done = 0
+        self.failed = 0
+        self.error = None
+        self.started = None
+        self.duration = None
+
+    @property
+    def progress(self):
+        # Gibt den Anteil fertiger Reports (0–1) zurück.
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def rate(self):
+        # Gibt den bisherigen Durchsatz in Reports pro Sekunde zurück.
+        elapsed = self.duration if self.duration is not None else time.perf_counter() - self.started if self.started else 0
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def label(self):
+        # Gibt den Zustand mit Fortschritt und Durchsatz als Anzeigetext zurück.
+        text = f"{REPORT_STATES[self.state]} – {self.done}/{self.total} Reports ({self.rate:.1f} Reports/s)"
+        if self.failed:
+            text += f", {self.failed} fehlgeschlagen"
+        if self.state == "failed" and self.error:
+            text += f": {self.error}"
+        return text
+
+    def run(self, workers=None):
+        # Führt den Sammel-Export aus (im Hintergrund-Thread).
+        self.state = "running"
+        self.started = time.perf_counter()
+        try:
+            export_reports_zip(self.requests, self.output_path, workers, self._progress)
+            self.state = "done"
+            prune_exports()
+        except Exception as error:
+            self.error = str(error)
+            self.state = "failed"
+        finally:
+            self.duration = time.perf_counter() - self.started
+
+    def _progress(self, done, total, request, error):
+        # Vermerkt einen abgeschlossenen Report.
+        self.done = done
+        if error is not None:
+            self.failed += 1
+
+
+# Renderer eines Export-Prozesses (in _init_export_worker erstellt, für alle Reports des Prozesses verwendet)
+_worker_renderer = None
+
+
+def _init_export_worker():
+    # Initialisiert einen Worker des Sammel-Exports: eigener Renderer (Figur und Schriften bleiben geladen),
+    # keine zusätzlichen Prozesse für die Maximumsuche (die Kerne sind bereits belegt).
+    global _worker_renderer
+    peak_detection.PEAK_WORKERS = 1
+    _worker_renderer = ImageRenderer()
+
+
+def _export_report(request):
+    # Erstellt einen Report im Worker und gibt (PDF-Bytes, None) bzw. (None, Fehlertext) zurück.
+    try:
+        ekg = analyse_for_report(EKGdata(request.test), request)
+        image_png = _render_image(_worker_renderer, ekg)
+        return build_report_pdf(request.person, request.test, ekg, image_png), None
+    except Exception as error:
+        return None, f"{type(error).__name__}: {error}"
+
+
+def export_reports_zip(requests, output, workers=None, progress=None):
+    # Erstellt die Reports aller Anfragen parallel in einem Prozess-Pool und schreibt jedes PDF sofort in das
+    # ZIP-Archiv output (Pfad oder Datei-Objekt), statt alle Reports im Speicher zu sammeln.
+    # Der Pool startet über forkserver, da der Export aus einem Hintergrund-Thread des Servers läuft.
+    # progress(erledigt, gesamt, anfrage, fehler) wird nach jedem Report aufgerufen; Fehler landen in fehler.txt.
+    # Gibt eine Zusammenfassung mit Anzahl, Laufzeit und Durchsatz zurück.
+    workers = workers or EXPORT_WORKERS
+    started = time.perf_counter()
+    if isinstance(output, str) and os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    errors = []
+    # PDFs sind bereits komprimiert: unkomprimiert ablegen
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker,
+                                mp_context=peak_detection.PROCESS_CONTEXT) as executor:
+        futures = {executor.submit(_export_report, request): request for request in requests}
+        for done, future in enumerate(as_completed(futures), start=1):
+            request = futures.pop(future)
+            pdf_bytes, error = future.result()
+            if error is None:
+                archive.writestr(request.archive_name, pdf_bytes)
+            else:
+                errors.append(f"{request.archive_name}: {error}")
+            if progress is not None:
+                progress(done, len(requests), request, error)
+        if errors:
+            archive.writestr("fehler.txt", "\n".join(errors))
+    wall_time = time.perf_counter() - started
+    return {
+        "reports": len(requests) - len(errors),
+        "failed": len(errors),
+        "wall_time_s": wall_time,
+        "reports_per_s": len(requests) / wall_time if wall_time > 0 else None,
+    }
+
+
+def collect_report_requests(persons=None, test_ids=None, **parameters):
+    # Gibt Report-Anfragen für alle EKG-Tests der Personen zurück (ohne Angabe: alle Personen der Datenbank).
+    # test_ids schränkt die Auswahl auf einzelne Tests ein; parameters werden an ReportRequest übergeben.
+    if persons is None:
+        persons = get_person_repository().all()
+    return [
+        ReportRequest(person, test, **parameters)
+        for person in persons
+        for test in person.ekg_tests
+        if test_ids is None or test["id"] in test_ids
+    ]
+
+
+def export_path():
+    # Gibt einen neuen Dateinamen für das ZIP-Archiv eines Sammel-Exports zurück.
+    return os.path.join(EXPORT_DIR, f"reports_{time.strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:6]}.zip")
+
+
+def prune_exports(keep=EXPORT_KEEP, directory=EXPORT_DIR):
+    # Löscht bis auf die keep neuesten alle ZIP-Archive des Sammel-Exports im Verzeichnis.
+    try:
+        names = [name for name in os.listdir(directory) if name.startswith("reports_") and name.endswith(".zip")]
+    except FileNotFoundError:
+        return
+    paths = sorted((os.path.join(directory, name) for name in names), key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # z. B. gerade von einem Download geöffnet; beim nächsten Export erneut versucht
+
+
+def read_export(path):
+    # Gibt ein ZIP-Archiv des Sammel-Exports als Bytes zurück (für den Download erst beim Klick).
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Prozessweite Instanz; Aufträge und Cache werden von allen Sessions geteilt
+_report_queue = ReportQueue()
+
+
+def get_report_queue():
+    # Gibt die prozessweite Report-Warteschlange zurück.
+    return _report_queue
+
+
+
+def main(argv=None):
+    # Kommandozeilen-Einstieg: PDF-Reports aller (oder ausgewählter) EKG-Tests in ein ZIP-Archiv exportieren.
+    parser = argparse.ArgumentParser(description="Exportiert PDF-Reports aller EKG-Tests als ZIP-Archiv.")
+    parser.add_argument("--person", type=str, action="append", help="Nur diese Personen-ID (mehrfach möglich)")
+    parser.add_argument("--method", choices=PEAK_METHODS, default=DEFAULT_PEAK_METHOD, help="Peak-Detektor")
+    parser.add_argument("--height", type=float, default=None, help="Schwellwert für method=threshold (Standard 350)")
+    parser.add_argument("--threshold-ms", type=float, default=300, help="RR-Intervall, unter dem eine Anomalie vorliegt")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS, help="Anzahl paralleler Prozesse")
+    parser.add_argument("--output", default=None, help="ZIP-Datei (Standard: exports/reports_<Zeitstempel>.zip)")
+    args = parser.parse_args(argv)
+
+    persons = get_person_repository().all()
+    if args.person:
+        persons = [person for person in persons if person.id in args.person]
+    requests = collect_report_requests(persons, method=args.method, height=args.height, threshold_ms=args.threshold_ms)
+    output = args.output or export_path()
+    print(f"{len(requests)} Reports, {args.workers} Prozesse", file=sys.stderr)
+
+    def progress(done, total, request, error):
+        print(f"[{done}/{total}] {request.archive_name} {'ok' if error is None else error}", file=sys.stderr)
+
+    summary = export_reports_zip(requests, output, args.workers, progress)
+    if args.output is None:
+        prune_exports()
+    print(f"{summary['reports']} Reports in {summary['wall_time_s']:.1f} s ({summary['reports_per_s'] or 0:.1f} Reports/s), "
+          f"{summary['failed']} fehlgeschlagen -> {output}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# Modul zur dauerhaften Speicherung von Analyseergebnissen (Peak-Kandidaten, Peaks, RR-Anomalien, Herzfrequenz)
+import glob
+import json
+import os
+import threading
+import uuid
+import numpy as np
+
+# Verzeichnis der Ergebnisdateien (eine JSON-Datei pro Aufnahme, benannt nach dem Inhalts-Hash)
+RESULTS_DIR = "data/analysis_results"
+
+# Version der Analyse-Algorithmen; bei Änderungen erhöhen, damit alte Ergebnisse verworfen werden
+ALGORITHM_VERSION = 4
+
+# Höchstzahl gespeicherter Analysen (Parametersätze) je Aufnahme; die am längsten nicht geänderten werden verworfen
+MAX_ANALYSES = 16
+
+
+def _peaks_key(decimation, method):
+    # Bildet den Schlüssel für Peak-Ergebnisse (nur schwellwertunabhängige Detektoren werden gespeichert).
+    return f"{method}|{int(decimation)}"
+
+
+def _analysis_key(threshold_ms, decimation, method):
+    # Bildet den Schlüssel für vollständige Analyseergebnisse.
+    return f"{method}|{float(threshold_ms)!r}|{int(decimation)}"
+
+
+class ResultStore:
+    # Ergebnisablage unter data/, geschlüsselt nach (Inhalts-Hash, Detektor, threshold_ms, Auflösungsfaktor).
+    # Die Peak-Kandidaten (alle lokalen Maxima mit Höhe) liegen als .npz-Datei neben der JSON-Datei.
+
+    def __init__(self, directory=RESULTS_DIR):
+        # Initialisiert die Ablage mit Verzeichnis und In-Memory-Kopie bereits gelesener Dateien.
+        self.directory = directory
+        self._loaded = {}  # Inhalts-Hash -> (Änderungszeit, Daten)
+        self._lock = threading.Lock()
+
+    def _path(self, content_hash):
+        # Gibt den Pfad der Ergebnisdatei einer Aufnahme zurück.
+        return os.path.join(self.directory, f"{content_hash}.json")
+
+    def _candidates_path(self, content_hash, decimation):
+        # Gibt den Pfad der Peak-Kandidaten einer Aufnahme für einen Auflösungsfaktor zurück.
+        return os.path.join(self.directory, f"{content_hash}.d{int(decimation)}.candidates.npz")
+
+    def _empty(self):
+        # Gibt eine leere Ergebnisstruktur der aktuellen Version zurück.
+        return {"version": ALGORITHM_VERSION, "peaks": {}, "analyses": {}}
+
+    def _load(self, content_hash):
+        # Lädt die Ergebnisse einer Aufnahme; veraltete Versionen werden ignoriert.
+        path = self._path(content_hash)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return self._empty()
+        cached = self._loaded.get(content_hash)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self._empty()
+        if data.get("version") != ALGORITHM_VERSION:
+            return self._empty()
+        self._loaded[content_hash] = (mtime_ns, data)
+        return data
+
+    def _save(self, content_hash, data):
+        # Schreibt die Ergebnisse einer Aufnahme atomar (temporäre Datei + Umbenennen).
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        self._loaded[content_hash] = (os.stat(path).st_mtime_ns, data)
+
+    def get_candidates(self, content_hash, decimation):
+        # Gibt gespeicherte Peak-Kandidaten (Positionen, Höhen; aufsteigend nach Höhe) zurück oder None.
+        try:
+            with np.load(self._candidates_path(content_hash, decimation)) as data:
+                if int(data["version"]) != ALGORITHM_VERSION:
+                    return None
+                return data["positions"], data["heights"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put_candidates(self, content_hash, decimation, positions, heights):
+        # Speichert die Peak-Kandidaten einer Aufnahme (atomar, binär statt JSON wegen der Größe).
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._candidates_path(content_hash, decimation)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=ALGORITHM_VERSION, positions=positions, heights=heights)
+        os.replace(tmp_path, path)
+
+    def get_peaks(self, content_hash, decimation, method):
+        # Gibt gespeicherte Peak-Positionen zurück oder None.
+        with self._lock:
+            return self._load(content_hash)["peaks"].get(_peaks_key(decimation, method))
+
+    def put_peaks(self, content_hash, decimation, peaks, method):
+        # Speichert Peak-Positionen einer Aufnahme.
+        with self._lock:
+            data = self._load(content_hash)
+            data["peaks"][_peaks_key(decimation, method)] = [int(p) for p in peaks]
+            self._save(content_hash, data)
+
+    def get_analysis(self, content_hash, threshold_ms, decimation, method):
+        # Gibt gespeicherte Analyseergebnisse (RR-Anomalien, Herzfrequenz) zurück oder None.
+        with self._lock:
+            return self._load(content_hash)["analyses"].get(_analysis_key(threshold_ms, decimation, method))
+
+    def put_analysis(self, content_hash, threshold_ms, decimation, method, **results):
+        # Ergänzt die Analyseergebnisse zu einem Parametersatz (z. B. anomalies=[...], hr=72.0).
+        with self._lock:
+            data = self._load(content_hash)
+            analyses = data["analyses"]
+            key = _analysis_key(threshold_ms, decimation, method)
+            # Zuletzt geänderte Einträge ans Ende (Reihenfolge bleibt in JSON erhalten), älteste über MAX_ANALYSES verwerfen
+            entry = analyses.pop(key, {})
+            entry.update(results)
+            analyses[key] = entry
+            for old_key in list(analyses)[:-MAX_ANALYSES]:
+                del analyses[old_key]
+            self._save(content_hash, data)
+
+    def delete(self, content_hash):
+        # Entfernt alle gespeicherten Ergebnisse einer Aufnahme (z. B. nach dem Löschen des EKG-Tests).
+        with self._lock:
+            self._loaded.pop(content_hash, None)
+            paths = [self._path(content_hash)] + glob.glob(os.path.join(self.directory, f"{content_hash}.d*.candidates.npz"))
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+# Prozessweite Instanz
+_result_store = ResultStore()
+
+
+def get_result_store():
+    # Gibt die prozessweite Ergebnisablage zurück.
+    return _result_store
@@ -0,0 +1,86 @@
+# Modul mit der RR-Intervallreihe einer Peak-Folge (einmal berechnet, vektorisiert ausgewertet)
+import numpy as np
+
+# Fensterbreite der geglätteten Herzfrequenz: Anteil an der Anzahl der HR-Werte, mindestens HR_SMOOTHING_MIN
+HR_SMOOTHING_RATIO = 0.05
+HR_SMOOTHING_MIN = 3
+
+
+def centered_rolling_mean(values, window):
+    # Zentrierter gleitender Mittelwert über kumulative Summen
+    # (entspricht pandas rolling(window, center=True, min_periods=1).mean()).
+    n = len(values)
+    cumsum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    positions = np.arange(n)
+    low = np.maximum(positions - window // 2, 0)
+    high = np.minimum(positions + (window - 1) // 2 + 1, n)
+    return (cumsum[high] - cumsum[low]) / (high - low)
+
+
+class RRSeries:
+    # RR-Intervalle einer Peak-Folge mit vorberechneten Größen:
+    # kumulative Summe der Intervalle (mittlere Herzfrequenz eines Zeitfensters in O(log n)),
+    # Anomalie-Positionen je Schwellwert und die geglättete Herzfrequenzkurve.
+
+    def __init__(self, peak_times):
+        # Berechnet Intervalle (ms), Herzfrequenz (bpm) und Zeitpunkte (Mitte zwischen zwei Peaks, ms).
+        self.peak_times = np.asarray(peak_times, dtype=np.int64)
+        self.intervals = np.diff(self.peak_times)
+        # Kumulative Summe der Intervalle: Summe der Intervalle i..j-1 = cumulative[j] - cumulative[i]
+        self.cumulative = np.concatenate(([0], np.cumsum(self.intervals)))
+        with np.errstate(divide="ignore"):
+            self.hr = 60000 / self.intervals
+        self.times = (self.peak_times[1:] + self.peak_times[:-1]) / 2
+        self._anomalies = {}  # Schwellwert (ms) -> Positionen in peak_times
+        self._smoothed_hr = None
+
+    def __len__(self):
+        # Gibt die Anzahl der RR-Intervalle zurück.
+        return len(self.intervals)
+
+    def _peak_range(self, min_time=None, max_time=None):
+        # Gibt die Positionen des ersten und letzten Peaks im Zeitfenster zurück (binäre Suche).
+        first = 0 if min_time is None else int(np.searchsorted(self.peak_times, min_time, side="left"))
+        last = len(self.peak_times) - 1 if max_time is None else int(np.searchsorted(self.peak_times, max_time, side="right")) - 1
+        return first, last
+
+    def mean_rr(self, min_time=None, max_time=None):
+        # Gibt das mittlere RR-Intervall (ms) der Peaks im Zeitfenster zurück, None bei weniger als zwei Peaks.
+        first, last = self._peak_range(min_time, max_time)
+        if last - first < 1:
+            return None
+        return (self.cumulative[last] - self.cumulative[first]) / (last - first)
+
+    def mean_hr(self, min_time=None, max_time=None):
+        # Gibt die mittlere Herzfrequenz (bpm) im Zeitfenster zurück (ohne Angabe: gesamte Aufnahme).
+        mean_rr = self.mean_rr(min_time, max_time)
+        return float(60000 / mean_rr) if mean_rr else 0
+
+    def anomalies(self, threshold_ms):
+        # Gibt die Positionen (in peak_times) der Peaks zurück, deren RR-Intervall kürzer als threshold_ms ist.
+        anomalies = self._anomalies.get(threshold_ms)
+        if anomalies is None:
+            anomalies = (np.flatnonzero(self.intervals < threshold_ms) + 1).astype(np.int32)
+            self._anomalies[threshold_ms] = anomalies
+        return anomalies
+
+    def anomaly_count(self, threshold_ms, min_time=None, max_time=None):
+        # Gibt die Anzahl der RR-Anomalien im Zeitfenster zurück (binäre Suche statt Maske).
+        anomaly_times = self.peak_times[self.anomalies(threshold_ms)]
+        start = 0 if min_time is None else np.searchsorted(anomaly_times, min_time, side="left")
+        end = len(anomaly_times) if max_time is None else np.searchsorted(anomaly_times, max_time, side="right")
+        return int(max(0, end - start))
+
+    @property
+    def smoothed_hr(self):
+        # Gibt die geglättete Herzfrequenz zurück (zentrierter Mittelwert, Fensterbreite 5 % der Werte, mind. 3).
+        if self._smoothed_hr is None:
+            window = max(HR_SMOOTHING_MIN, int(len(self.hr) * HR_SMOOTHING_RATIO))
+            self._smoothed_hr = centered_rolling_mean(self.hr, window)
+        return self._smoothed_hr
+
+    def hr_window(self, min_time=None, max_time=None):
+        # Gibt Zeitpunkte (ms) und geglättete Herzfrequenz im Zeitfenster zurück (Views, keine Kopien).
+        start = 0 if min_time is None else int(np.searchsorted(self.times, min_time, side="left"))
+        end = len(self.times) if max_time is None else int(np.searchsorted(self.times, max_time, side="right"))
+        return self.times[start:end], self.smoothed_hr[start:end]
@@ -0,0 +1,101 @@
+# Modul mit einem prozessweiten LRU-Cache geladener EKG-Signale (für alle Streamlit-Sessions gemeinsam)
+import os
+import threading
+from collections import OrderedDict
+from .ekg_cache import file_version
+from .ekg_signal import EKGSignal
+
+# Speicherbudget in Bytes, über Umgebungsvariable konfigurierbar (Standard: 512 MB)
+DEFAULT_MAX_BYTES = int(os.environ.get("EKG_SIGNAL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+class SignalCache:
+    # LRU-Cache für EKGSignal-Objekte, begrenzt durch ein Speicherbudget in Bytes.
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        # Initialisiert den leeren Cache mit Speicherbudget und Zählern.
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (EKG-ID, Dateiversion) -> EKGSignal
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, ekg_id, source_path):
+        # Gibt das Signal zur EKG-ID zurück und lädt es bei Bedarf (Schlüssel enthält die Dateiversion).
+        key = (ekg_id, file_version(source_path))
+        with self._lock:
+            signal = self._entries.get(key)
+            if signal is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return signal
+            self.misses += 1
+
+        # Laden außerhalb der Sperre, damit andere Sessions nicht blockiert werden
+        signal = EKGSignal.from_file(source_path)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            # Veraltete Versionen derselben Aufnahme entfernen
+            for old_key in [k for k in self._entries if k[0] == ekg_id]:
+                del self._entries[old_key]
+            if signal.nbytes <= self.max_bytes:
+                self._entries[key] = signal
+                self._evict()
+        return signal
+
+    def _evict(self):
+        # Entfernt die am längsten nicht genutzten Einträge, bis das Budget eingehalten wird.
+        # Größen werden jeweils neu berechnet, da Signale abgeleitete Daten nachladen können.
+        while self._entries and self.current_bytes() > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def current_bytes(self):
+        # Gibt den aktuell belegten Speicher aller Einträge zurück.
+        return sum(signal.nbytes for signal in self._entries.values())
+
+    def set_max_bytes(self, max_bytes):
+        # Setzt ein neues Speicherbudget und verdrängt überzählige Einträge.
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def invalidate(self, ekg_id):
+        # Entfernt alle Versionen einer Aufnahme aus dem Cache (z. B. nach dem Löschen).
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ekg_id]:
+                del self._entries[key]
+
+    def clear(self):
+        # Leert den Cache und setzt die Zähler zurück.
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        # Gibt Kennzahlen des Caches als Dictionary zurück.
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Prozessweite Instanz; Module werden von Streamlit nur einmal importiert und von allen Sessions geteilt
+_signal_cache = SignalCache()
+
+
+def get_signal_cache():
+    # Gibt die prozessweite Instanz des Signal-Caches zurück.
+    return _signal_cache
@@ -0,0 +1,235 @@
+# Modul mit dem SQLite-Speicher für Personen und EKG-Tests (WAL-Modus, indizierte Spalten)
+import json
+import os
+import sqlite3
+import threading
+
+# Spalten der Tabelle persons; weitere Felder eines Eintrags werden als JSON in "extra" abgelegt
+PERSON_COLUMNS = ("id", "firstname", "lastname", "username", "password", "date_of_birth", "role", "gender", "picture_path")
+
+# Spalten der Tabelle ekg_tests; weitere Felder eines Tests werden ebenfalls als JSON in "extra" abgelegt
+EKG_TEST_COLUMNS = ("id", "date")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    firstname TEXT,
+    lastname TEXT,
+    username TEXT,
+    password TEXT,
+    date_of_birth TEXT,
+    role TEXT,
+    gender TEXT,
+    picture_path TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_persons_username ON persons (username);
+CREATE TABLE IF NOT EXISTS ekg_tests (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    person_id TEXT NOT NULL REFERENCES persons (id) ON DELETE CASCADE,
+    date TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ekg_tests_person ON ekg_tests (person_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', '0');
+"""
+
+# Jede Änderung an persons oder ekg_tests erhöht die Revision (Erkennung von Änderungen anderer Prozesse)
+REVISION_TRIGGERS = "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS bump_revision_{table}_{event.lower()} AFTER {event} ON {table}
+BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision';
+END;
+"""
+    for table in ("persons", "ekg_tests")
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+class SQLiteStorage:
+    # Speicher-Backend auf Basis von SQLite: jede Änderung betrifft nur die Zeilen einer Person (O(1)),
+    # statt wie bei TinyDB die gesamte Datei neu zu schreiben.
+
+    def __init__(self, path):
+        # Öffnet bzw. erstellt die Datenbank und legt das Schema an.
+        self.path = path
+        self._local = threading.local()  # eine Verbindung pro Thread
+        self.last_write = (None, None)  # Revision vor und nach dem letzten eigenen Schreibvorgang
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA + REVISION_TRIGGERS)
+        # Datenbanken älterer Versionen: Spalte für zusätzliche Felder der EKG-Tests ergänzen
+        if "extra" not in {row["name"] for row in connection.execute("PRAGMA table_info(ekg_tests)")}:
+            connection.execute("ALTER TABLE ekg_tests ADD COLUMN extra TEXT")
+
+    def _connection(self):
+        # Gibt die Verbindung des aktuellen Threads zurück (WAL: Leser blockieren Schreiber nicht).
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def apply_batch(self, mutations):
+        # Führt eine Liste von Änderungen in einer einzigen Schreibtransaktion aus und gibt deren Ergebnisse zurück.
+        # Änderungen sind Tupel (Operation, Argumente...), siehe db_writer.py.
+        # Die Revision vor und nach den eigenen Änderungen wird innerhalb der Transaktion gelesen (last_write).
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            before = self._revision(connection)
+            results = [getattr(self, f"_apply_{mutation[0]}")(connection, *mutation[1:]) for mutation in mutations]
+            after = self._revision(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.last_write = (before, after)
+        return results
+
+    @staticmethod
+    def _row_values(person_data):
+        # Zerlegt einen Personen-Eintrag in Spaltenwerte und zusätzliche Felder (JSON).
+        values = [person_data.get(column) for column in PERSON_COLUMNS]
+        extra = {k: v for k, v in person_data.items() if k not in PERSON_COLUMNS and k != "ekg_tests"}
+        return values + [json.dumps(extra) if extra else None]
+
+    @staticmethod
+    def _to_dict(row, ekg_tests):
+        # Baut aus einer Tabellenzeile wieder einen Personen-Eintrag (fehlende Felder bleiben weg).
+        person = {column: row[column] for column in PERSON_COLUMNS if row[column] is not None}
+        if row["extra"]:
+            person.update(json.loads(row["extra"]))
+        if ekg_tests is not None:
+            person["ekg_tests"] = ekg_tests
+        return person
+
+    @staticmethod
+    def _test_to_dict(row):
+        # Baut aus einer Tabellenzeile wieder einen EKG-Test (Spalten und zusätzliche Felder).
+        test = {"id": row["id"], "date": row["date"]}
+        if row["extra"]:
+            test.update(json.loads(row["extra"]))
+        return test
+
+    @staticmethod
+    def _insert_tests(connection, person_id, ekg_tests):
+        # Fügt die EKG-Tests einer Person ein; Felder außer id und date landen als JSON in "extra".
+        rows = []
+        for test in ekg_tests:
+            extra = {k: v for k, v in test.items() if k not in EKG_TEST_COLUMNS}
+            rows.append((test["id"], person_id, test.get("date"), json.dumps(extra) if extra else None))
+        connection.executemany("INSERT INTO ekg_tests (id, person_id, date, extra) VALUES (?, ?, ?, ?)", rows)
+
+    def _tests_of(self, person_id):
+        # Gibt die EKG-Tests einer Person in Reihenfolge des Hochladens zurück.
+        rows = self._connection().execute(
+            "SELECT id, date, extra FROM ekg_tests WHERE person_id = ? ORDER BY seq", (person_id,))
+        return [self._test_to_dict(row) for row in rows]
+
+    def all(self):
+        # Gibt alle Personen in Einfüge-Reihenfolge zurück.
+        connection = self._connection()
+        tests = {}
+        for row in connection.execute("SELECT id, person_id, date, extra FROM ekg_tests ORDER BY seq"):
+            tests.setdefault(row["person_id"], []).append(self._test_to_dict(row))
+        rows = connection.execute("SELECT * FROM persons ORDER BY doc_id")
+        return [self._to_dict(row, tests.get(row["id"], [])) for row in rows]
+
+    def get_by_id(self, person_id):
+        # Gibt die Person mit dieser ID zurück oder None.
+        row = self._connection().execute("SELECT * FROM persons WHERE id = ?", (person_id,)).fetchone()
+        return self._to_dict(row, self._tests_of(person_id)) if row is not None else None
+
+    def get_by_username(self, username):
+        # Gibt die Person mit diesem Benutzernamen zurück oder None.
+        row = self._connection().execute("SELECT * FROM persons WHERE username = ? ORDER BY doc_id", (username,)).fetchone()
+        return self._to_dict(row, self._tests_of(row["id"])) if row is not None else None
+
+    def _apply_insert(self, connection, person_data):
+        # Fügt eine Person samt EKG-Tests ein und gibt die fortlaufende Dokument-ID zurück.
+        placeholders = ", ".join("?" * (len(PERSON_COLUMNS) + 1))
+        cursor = connection.execute(
+            f"INSERT INTO persons ({', '.join(PERSON_COLUMNS)}, extra) VALUES ({placeholders})", self._row_values(person_data))
+        self._insert_tests(connection, person_data["id"], person_data.get("ekg_tests", []))
+        return cursor.lastrowid
+
+    def _apply_update(self, connection, person_id, updated_data):
+        # Aktualisiert die angegebenen Felder einer Person; fehlende Felder bleiben erhalten.
+        # Gelesen wird innerhalb der Transaktion, damit keine gleichzeitige Änderung verloren geht.
+        row = connection.execute("SELECT * FROM persons WHERE id = ?", (person_id,)).fetchone()
+        if row is None:
+            return None
+        person_data = {**self._to_dict(row, None), **updated_data}
+        assignments = ", ".join(f"{column} = ?" for column in PERSON_COLUMNS)
+        connection.execute(f"UPDATE persons SET {assignments}, extra = ? WHERE id = ?", self._row_values(person_data) + [person_id])
+        if "ekg_tests" in updated_data:
+            connection.execute("DELETE FROM ekg_tests WHERE person_id = ?", (person_id,))
+            self._insert_tests(connection, person_data["id"], updated_data["ekg_tests"])
+        return None
+
+    def _apply_delete(self, connection, person_id):
+        # Löscht eine Person (EKG-Tests werden über den Fremdschlüssel mitgelöscht).
+        connection.execute("DELETE FROM persons WHERE id = ?", (person_id,))
+
+    def _apply_add_ekg_test(self, connection, person_id, ekg_test):
+        # Hängt einen EKG-Test an, ohne die übrigen Tests der Person neu zu schreiben.
+        self._insert_tests(connection, person_id, [ekg_test])
+
+    def _apply_remove_ekg_test(self, connection, person_id, ekg_id):
+        # Entfernt einen EKG-Test einer Person.
+        connection.execute("DELETE FROM ekg_tests WHERE id = ? AND person_id = ?", (ekg_id, person_id))
+
+    @staticmethod
+    def _revision(connection):
+        # Liest den Änderungszähler über die angegebene Verbindung.
+        row = connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row["value"])
+
+    def revision(self):
+        # Gibt einen Zähler zurück, der sich bei jeder Änderung (auch durch andere Prozesse) erhöht.
+        return self._revision(self._connection())
+
+    def is_empty(self):
+        # Gibt True zurück, wenn noch keine Personen gespeichert sind.
+        return self._connection().execute("SELECT 1 FROM persons LIMIT 1").fetchone() is None
+
+    def migrate_from_json(self, json_path):
+        # Übernimmt einmalig alle Personen aus der TinyDB-JSON-Datei (in einer Transaktion).
+        # Gibt die Anzahl übernommener Personen zurück; ist die Migration schon erfolgt, passiert nichts.
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone() is not None:
+            return 0
+        persons = []
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                table = json.load(f).get("_default", {})
+            persons = [table[doc_id] for doc_id in sorted(table, key=int)]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Erneut innerhalb der Schreibsperre prüfen: ein gleichzeitig gestarteter Prozess kann die
+            # Migration nach der ersten Prüfung bereits abgeschlossen haben
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone() is not None:
+                connection.execute("ROLLBACK")
+                return 0
+            for person in persons:
+                self._apply_insert(connection, person)
+            connection.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (json_path,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(persons)
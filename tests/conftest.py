@@ -0,0 +1,43 @@
+# Gemeinsame Fixtures: synthetische EKG-Aufnahmen mit Cache und Ergebnisablage in einem temporären Verzeichnis
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src import ekg_cache, ekgdata, preprocessing
+from src.ekg_format import ekg_source_path
+from src.result_store import ResultStore
+
+
+def write_recording(path, seconds=60, rate=500, rr_ms=800, seed=0):
+    # Schreibt eine zweispaltige Textdatei (mV, ms) mit R-Zacken im Abstand rr_ms und leichtem Rauschen.
+    rng = np.random.default_rng(seed)
+    ms = np.arange(0, seconds * 1000, 1000 // rate, dtype=np.int64)
+    mv = 300 + rng.normal(0, 3, len(ms))
+    for beat in range(200, seconds * 1000, rr_ms):
+        mv += 150 * np.exp(-((ms - beat) / 12.0) ** 2)
+    np.savetxt(path, np.column_stack([np.round(mv).astype(int), ms]), fmt="%d", delimiter="\t")
+    return path
+
+
+@pytest.fixture
+def ekg_dir(tmp_path, monkeypatch):
+    # Leitet Rohdaten, Binär-Cache und Ergebnisablage in ein temporäres Verzeichnis um.
+    data_dir = tmp_path / "ekg_data"
+    data_dir.mkdir()
+    monkeypatch.setattr(ekg_cache, "CACHE_DIR", str(data_dir / ".cache"))
+    store = ResultStore(str(tmp_path / "results"))
+    monkeypatch.setattr(ekgdata, "get_result_store", lambda: store)
+    monkeypatch.setattr(preprocessing, "get_result_store", lambda: store)
+    monkeypatch.setattr(preprocessing, "_startup_cleanup_done", True)  # echtes Datenverzeichnis nicht aufräumen
+    monkeypatch.setattr(ekgdata, "ekg_source_path", lambda ekg_id: ekg_source_path(ekg_id, str(data_dir)))
+    return SimpleNamespace(path=data_dir, store=store)
+
+
+@pytest.fixture
+def recording(ekg_dir):
+    # Legt eine Aufnahme als Textdatei an.
+    ekg_id = f"test_{uuid.uuid4().hex}"
+    path = write_recording(ekg_dir.path / f"{ekg_id}.txt")
+    return {"id": ekg_id, "date": "01.01.2025", "path": path, "store": ekg_dir.store}
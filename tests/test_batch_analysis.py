@@ -0,0 +1,21 @@
+# Tests für die Stapelanalyse (Messung je Test, Zusammenfassung)
+import json
+
+import pytest
+
+from src.batch_analysis import analyse_test, write_summary
+
+
+def test_summary_cpu_time_is_measured_process_time(recording, tmp_path, monkeypatch):
+    task = {"person_id": "p1", "name": "Test Person", "test_id": recording["id"], "date": recording["date"]}
+    row = analyse_test(task)
+    assert row["status"] == "ok", row["error"]
+    assert row["cpu_s"] > 0
+
+    # Ein wartender Test verbraucht Laufzeit, aber keine CPU-Zeit
+    idle = dict(row, test_id="idle", total_s=row["total_s"] + 5.0)
+    output = tmp_path / "summary.json"
+    write_summary([row, idle], str(output), {"method": "pan_tompkins"}, wall_time=1.0)
+    summary = json.loads(output.read_text())["summary"]
+    assert summary["cpu_time_s"] == pytest.approx(2 * row["cpu_s"])
+    assert summary["cpu_time_s"] < row["total_s"] + idle["total_s"]
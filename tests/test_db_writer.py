@@ -0,0 +1,97 @@
+# Tests für den Schreib-Thread (Zusammenfassen von Updates, Einzelausführung nach Fehlern, Robustheit des Threads)
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.db_writer import DatabaseWriter, coalesce
+
+
+class FakeStorage:
+    # Speicher-Attrappe: protokolliert jeden Stapel und lässt Änderungen an "broken" scheitern.
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def apply_batch(self, mutations):
+        self.release.wait(5)
+        self.batches.append(list(mutations))
+        if any(mutation[1] == "broken" for mutation in mutations):
+            raise ValueError("broken")
+        return [f"{mutation[0]}:{mutation[1]}" for mutation in mutations]
+
+
+def with_futures(*mutations):
+    # Versieht Änderungen mit Futures, wie sie die Warteschlange enthält.
+    return [(mutation, Future()) for mutation in mutations]
+
+
+def test_coalesce_merges_consecutive_updates_per_person():
+    batch = with_futures(
+        ("update", "a", {"firstname": "A"}),
+        ("update", "b", {"firstname": "B"}),
+        ("update", "a", {"lastname": "X", "firstname": "A2"}),
+    )
+    merged = coalesce(batch)
+    assert [mutation for mutation, _ in merged] == [
+        ("update", "a", {"firstname": "A2", "lastname": "X"}),
+        ("update", "b", {"firstname": "B"}),
+    ]
+    assert merged[0][1] == [batch[0][1], batch[2][1]]
+    assert merged[1][1] == [batch[1][1]]
+
+
+def test_coalesce_keeps_order_around_other_mutations():
+    # Ein Update nach dem Löschen bzw. nach einem neuen EKG-Test derselben Person darf nicht vorgezogen werden.
+    batch = with_futures(
+        ("update", "a", {"firstname": "A"}),
+        ("delete", "a"),
+        ("update", "a", {"firstname": "B"}),
+        ("add_ekg_test", "b", {"id": "t"}),
+        ("update", "b", {"firstname": "C"}),
+        ("update", "b", {"lastname": "D"}),
+    )
+    assert [mutation for mutation, _ in coalesce(batch)] == [
+        ("update", "a", {"firstname": "A"}),
+        ("delete", "a"),
+        ("update", "a", {"firstname": "B"}),
+        ("add_ekg_test", "b", {"id": "t"}),
+        ("update", "b", {"firstname": "C", "lastname": "D"}),
+    ]
+
+
+def test_failed_batch_falls_back_to_single_mutations():
+    # Nur die fehlerhafte Änderung scheitert, die übrigen des Stapels werden trotzdem gespeichert.
+    storage = FakeStorage()
+    writer = DatabaseWriter(storage)
+    batch = with_futures(("delete", "a"), ("delete", "broken"), ("update", "c", {"firstname": "C"}))
+    writer._flush(batch)
+    assert batch[0][1].result() == "delete:a"
+    with pytest.raises(ValueError):
+        batch[1][1].result()
+    assert batch[2][1].result() == "update:c"
+    assert storage.batches[1:] == [[("delete", "a")], [("delete", "broken")], [("update", "c", {"firstname": "C"})]]
+
+
+def test_writer_batches_queued_mutations():
+    # Während ein Schreibvorgang läuft, sammeln sich weitere Änderungen und werden gemeinsam übernommen.
+    storage = FakeStorage()
+    storage.release.clear()
+    writer = DatabaseWriter(storage)
+    first = writer.submit(("delete", "a"))
+    futures = [writer.submit(("update", "b", {"n": n})) for n in range(5)]
+    storage.release.set()
+    assert first.result(5) == "delete:a"
+    assert [future.result(5) for future in futures] == ["update:b"] * 5
+    assert writer.stats()["coalesced"] >= 1
+
+
+def test_unexpected_error_does_not_stop_the_writer():
+    # Ein Insert ohne ID lässt schon das Zusammenfassen scheitern; der Aufrufer erhält den Fehler,
+    # spätere Änderungen werden weiterhin ausgeführt statt ewig zu warten.
+    writer = DatabaseWriter(FakeStorage())
+    with pytest.raises(KeyError):
+        writer.submit(("insert", {"firstname": "ohne ID"})).result(5)
+    assert writer.submit(("delete", "a")).result(5) == "delete:a"
@@ -0,0 +1,58 @@
+# Tests für die Min/Max-Pyramide (Fenstergrenzen, Extremwerte je Bin im Vergleich mit direkter Berechnung)
+import numpy as np
+import pytest
+
+from src.downsampling import MinMaxPyramid
+
+
+@pytest.fixture(scope="module")
+def pyramid():
+    rng = np.random.default_rng(0)
+    mv = rng.integers(-500, 500, 100_003).astype(np.int16)
+    ms = np.arange(len(mv), dtype=np.int32) * 2  # Index = ms / 2
+    return MinMaxPyramid(mv, ms, target_points=256)
+
+
+def brute_force(mv, start, end, level):
+    # Minimum und Maximum je Bin der Stufe level, beschränkt auf das Fenster [start, end).
+    edges = np.arange(start >> level << level, end, 1 << level)
+    bounds = np.clip(np.append(edges, end), start, end)
+    return [(mv[lo:hi].min(), mv[lo:hi].max()) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def window_cases():
+    rng = np.random.default_rng(1)
+    cases = [(0, 100_002), (1, 2001), (3, 100_000), (777, 50_001)]
+    for _ in range(50):
+        start, end = sorted(rng.integers(0, 100_003, 2))
+        cases.append((int(start), int(end)))
+    return cases
+
+
+@pytest.mark.parametrize("start, end", window_cases())
+def test_window_matches_brute_force(pyramid, start, end):
+    ms, mv = pyramid.window(2 * start, 2 * end)
+    indices = ms // 2
+    end += 1  # max_time ist inklusiv
+    assert np.all((indices >= start) & (indices < end))
+    assert np.all(np.diff(indices) >= 0)
+    level = pyramid.choose_level(end - start)
+    if level == 0:
+        np.testing.assert_array_equal(indices, np.arange(start, end))
+        return
+    pairs = mv.reshape(-1, 2)
+    expected = brute_force(pyramid.mv, start, end, level)
+    assert len(pairs) == len(expected)
+    np.testing.assert_array_equal(np.sort(pairs, axis=1), np.array(expected))
+
+
+def test_window_respects_target_points(pyramid):
+    ms, mv = pyramid.window(0, 2 * 100_002)
+    assert len(ms) <= 256 + 2
+    ms, _ = pyramid.window(1000, 1000 + 2 * 100)
+    assert len(ms) == 101  # wenige Messwerte: Originalauflösung
+
+
+def test_empty_window(pyramid):
+    ms, mv = pyramid.window(-10, -1)
+    assert len(ms) == len(mv) == 0
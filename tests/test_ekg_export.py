@@ -0,0 +1,47 @@
+# Tests für den Export eines EKG-Zeitfensters (CSV und NPZ als Download-Callable)
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+from streamlit.runtime.media_file_manager import convert_data_to_bytes_and_infer_mime
+
+from src.ekg_export import lazy_csv, lazy_npz
+from src.ekgdata import EKGWindow
+
+
+def make_window(count=50000):
+    # Erstellt ein Fenster mit kompakten Arrays, Peaks und Anomalien.
+    ms = np.arange(0, count * 4, 4, dtype=np.int32)
+    mv = (np.sin(ms / 100.0) * 100 + 300).astype(np.int16)
+    peaks = np.arange(10, count, 250, dtype=np.int32)
+    return EKGWindow(0, int(ms[-1]), mv, ms, peaks, peaks[::5])
+
+
+def make_ekg():
+    # Minimale Analyse-Angaben, die der NPZ-Export in "meta" schreibt.
+    return SimpleNamespace(id="test", date="01.01.2025", decimation=4, peak_method="pan_tompkins",
+                           height=None, threshold_ms=300)
+
+
+def test_lazy_csv_returns_bytes_accepted_by_streamlit():
+    window = make_window()
+    data = lazy_csv(window)()
+    assert isinstance(data, bytes)
+    converted, _ = convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError("nicht unterstützt"))
+    assert converted == window.df.to_csv(index=False).encode("utf-8")
+
+
+def test_lazy_npz_returns_bytes_with_peaks_and_anomalies():
+    window = make_window()
+    data = lazy_npz(make_ekg(), window)()
+    assert isinstance(data, bytes)
+    convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError("nicht unterstützt"))
+
+    npz = np.load(io.BytesIO(data))
+    assert np.array_equal(npz["mv"], window.mv) and npz["mv"].dtype == window.mv.dtype
+    assert np.array_equal(npz["ms"], window.ms)
+    assert np.array_equal(npz["peak_ms"], window.peak_ms)
+    assert np.array_equal(npz["anomaly_ms"], window.anomaly_ms)
+    meta = json.loads(str(npz["meta"]))
+    assert meta["peak_method"] == "pan_tompkins" and meta["threshold_ms"] == 300
@@ -0,0 +1,81 @@
+# Tests für das kompakte Speicherformat (.ekgz)
+import struct
+
+import numpy as np
+import pytest
+
+from conftest import write_recording
+from src.ekg_cache import load_ekg_arrays
+from src.ekg_format import EKGZReader, EKGZWriter, convert_text_file, FORMAT_VERSION, MAGIC
+
+
+def write_ekgz(path, mv, ms, block_samples, chunk=1000, compression="zlib"):
+    # Schreibt Arrays abschnittsweise mit kleiner Blockgröße (mehrere Blöcke auch bei kurzen Signalen).
+    writer = EKGZWriter(str(path), compression, block_samples=block_samples)
+    for start in range(0, len(mv), chunk):
+        writer.append(mv[start:start + chunk], ms[start:start + chunk])
+    writer.close()
+    return str(path)
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+def test_round_trip_returns_identical_arrays(tmp_path, compression):
+    rng = np.random.default_rng(0)
+    mv = rng.integers(-2000, 2000, 10_000).astype(np.int16)
+    ms = np.cumsum(rng.integers(1, 4, 10_000)).astype(np.int64)
+    reader = EKGZReader(write_ekgz(tmp_path / "a.ekgz", mv, ms, block_samples=4096, compression=compression))
+    read_mv, read_ms = reader.read_all()
+    assert len(reader) == len(mv) and len(reader.blocks) == 3
+    assert read_mv.dtype == np.int16
+    np.testing.assert_array_equal(read_mv, mv)
+    np.testing.assert_array_equal(read_ms, ms)
+
+
+def test_converted_text_file_matches_binary_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.ekg_cache.CACHE_DIR", str(tmp_path / ".cache"))
+    text_path = write_recording(tmp_path / "a.txt", seconds=10)
+    meta = convert_text_file(str(text_path))
+    mv, ms = EKGZReader(str(tmp_path / "a.ekgz")).read_all()
+    cached_mv, cached_ms, cached_meta = load_ekg_arrays(str(text_path))
+    np.testing.assert_array_equal(mv, cached_mv)
+    np.testing.assert_array_equal(ms, cached_ms)
+    assert meta["sha256"] == cached_meta["sha256"]
+
+
+def test_header_and_version_are_checked(tmp_path):
+    path = write_ekgz(tmp_path / "a.ekgz", np.arange(100, dtype=np.int16), np.arange(100), block_samples=64)
+    data = bytearray(open(path, "rb").read())
+
+    wrong_magic = tmp_path / "magic.ekgz"
+    wrong_magic.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match="Keine gültige EKG-Datei"):
+        EKGZReader(str(wrong_magic))
+
+    wrong_version = tmp_path / "version.ekgz"
+    wrong_version.write_bytes(struct.pack("<4sH", MAGIC, FORMAT_VERSION + 1) + data[6:])
+    with pytest.raises(ValueError, match="Formatversion"):
+        EKGZReader(str(wrong_version))
+
+    truncated = tmp_path / "truncated.ekgz"
+    truncated.write_bytes(data[:-4])
+    with pytest.raises(ValueError):
+        EKGZReader(str(truncated))
+
+
+@pytest.mark.parametrize("min_time, max_time", [
+    (0, 5000),  # erster Block bis über die erste Blockgrenze
+    (1022, 1026),  # genau um die Grenze zwischen Block 1 und 2
+    (1024, 1024),  # erster Wert eines Blocks
+    (900, 3100),  # über mehrere Blockgrenzen
+    (4000, 99999),  # bis über das Ende hinaus
+    (-50, 10),  # vor dem Anfang
+    (99999, 100000),  # hinter dem Ende
+])
+def test_read_range_across_block_boundaries(tmp_path, min_time, max_time):
+    mv = (np.arange(4500) % 700 - 350).astype(np.int16)
+    ms = np.arange(4500, dtype=np.int64)  # 1 ms je Messwert, Blockgrenzen bei 1024, 2048, ...
+    reader = EKGZReader(write_ekgz(tmp_path / "a.ekgz", mv, ms, block_samples=1024, chunk=333))
+    read_mv, read_ms = reader.read_range(min_time, max_time)
+    mask = (ms >= min_time) & (ms <= max_time)
+    np.testing.assert_array_equal(read_mv, mv[mask])
+    np.testing.assert_array_equal(read_ms, ms[mask])
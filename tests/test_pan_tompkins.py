@@ -0,0 +1,55 @@
+# Tests für den adaptiven Pan-Tompkins-Detektor (Vergleich mit festem Schwellwert, kurze Signale, Refraktärzeit)
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from src.ekg_signal import DECIMATION_FACTOR
+from src.peak_detection import REFRACTORY_S, estimate_sampling_rate, pan_tompkins
+from conftest import write_recording
+
+RESTING_RECORDING = "data/ekg_data/01_Ruhe.txt"
+
+
+def test_matches_fixed_threshold_on_resting_recording():
+    # Bei einer sauberen Ruhe-Aufnahme findet der adaptive Detektor genau die Peaks des festen Schwellwerts 350.
+    data = np.loadtxt(RESTING_RECORDING)
+    mv, ms = data[::DECIMATION_FACTOR, 0], data[::DECIMATION_FACTOR, 1]
+    expected = find_peaks(mv, height=350)[0]
+    peaks = pan_tompkins(mv, estimate_sampling_rate(ms))
+    assert len(expected) == 781
+    np.testing.assert_array_equal(peaks, expected)
+
+
+def test_synthetic_recording(tmp_path):
+    # Ein Herzschlag alle 800 ms über 60 s ergibt 75 Peaks, bis auf das Rauschen an den R-Zacken.
+    path = write_recording(tmp_path / "ekg.txt")
+    data = np.loadtxt(path)
+    peaks = pan_tompkins(data[:, 0], estimate_sampling_rate(data[:, 1]))
+    beats = np.arange(200, 60_000, 800) // 2  # Positionen der R-Zacken bei 500 Hz
+    assert len(peaks) == len(beats) == 75
+    assert np.all(np.abs(peaks - beats) <= 3)
+
+
+@pytest.mark.parametrize("length", [0, 1, 10, 3 * 75 - 1])
+def test_short_signals_return_no_peaks(length):
+    # Signale kürzer als drei Integrationsfenster (bei 500 Hz 3 * 75 Werte) liefern ein leeres Ergebnis.
+    peaks = pan_tompkins(np.ones(length), 500.0)
+    assert peaks.dtype == np.int64 and len(peaks) == 0
+
+
+def test_flat_signal_returns_no_peaks():
+    # Ohne Ausschläge gibt es keine Kandidaten.
+    peaks = pan_tompkins(np.zeros(5000), 500.0)
+    assert peaks.dtype == np.int64 and len(peaks) == 0
+
+
+def test_refractory_period_removes_double_detections():
+    # Zwei Zacken im Abstand von 60 ms (Doppelzacke) zählen nur als ein Herzschlag.
+    fs = 500.0
+    signal = np.zeros(20 * int(fs))
+    for beat in range(250, len(signal) - 250, 400):
+        signal[beat] = 1000.0
+        signal[beat + 30] = 900.0
+    peaks = pan_tompkins(signal, fs)
+    assert np.all(np.diff(peaks) >= REFRACTORY_S * fs)
+    np.testing.assert_array_equal(peaks, np.arange(250, len(signal) - 250, 400))
@@ -0,0 +1,69 @@
+# Tests für die parallele Suche lokaler Maxima (Abschnitte mit Randwerten, Plateaus an Abschnittsgrenzen)
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from src import peak_detection
+from src.peak_detection import _chunk_bounds, find_local_maxima
+
+WORKERS = 3  # ergibt WORKERS * CHUNKS_PER_WORKER = 6 Abschnitte
+
+
+@pytest.fixture(autouse=True)
+def parallel_for_short_signals(monkeypatch):
+    # Auch kurze Testsignale parallel in Abschnitten durchsuchen.
+    monkeypatch.setattr(peak_detection, "PARALLEL_MIN_SAMPLES", 0)
+
+
+def boundary_signal():
+    # Signal der Länge 6000 (gewünschte Grenzen bei 1000, 2000, ...) mit Peaks und Plateaus direkt an den Grenzen.
+    signal = np.zeros(6000, dtype=np.int16)
+    signal[1000] = 10  # Peak als erster Wert eines Abschnitts
+    signal[1999] = 10  # Peak als letzter Wert eines Abschnitts
+    signal[2998:3003] = 7  # Plateau über der gewünschten Grenze
+    signal[3500:4500] = 5  # langes Plateau über der gewünschten Grenze 4000
+    signal[4000:4010] = 6  # darin ein zweites Plateau
+    signal[4999:5001] = 9  # Plateau aus zwei Werten genau an der Grenze
+    return signal
+
+
+def test_boundaries_do_not_split_plateaus():
+    signal = boundary_signal()
+    bounds = _chunk_bounds(signal, WORKERS * peak_detection.CHUNKS_PER_WORKER)
+    assert {1000, 2000}.issubset(bounds)  # Peaks liegen direkt an den Abschnittsgrenzen
+    for bound in bounds[1:-1]:
+        assert signal[bound] != signal[bound - 1]
+
+
+def test_peaks_at_chunk_boundaries_match_single_pass():
+    signal = boundary_signal()
+    expected = find_peaks(signal)[0]
+    assert {1000, 1999, 3000, 4004, 4999}.issubset(expected)
+    np.testing.assert_array_equal(find_local_maxima(signal, workers=WORKERS), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_signal_with_plateaus_matches_single_pass(seed):
+    # Gerundetes Rauschen mit wenigen Stufen erzeugt viele Plateaus, auch an den Abschnittsgrenzen.
+    rng = np.random.default_rng(seed)
+    signal = np.repeat(rng.integers(0, 4, 3000), rng.integers(1, 5, 3000)).astype(np.int16)
+    np.testing.assert_array_equal(find_local_maxima(signal, workers=WORKERS), find_peaks(signal)[0])
+
+
+def test_file_source_with_step_matches_single_pass(tmp_path):
+    # Worker blenden das Signal direkt aus der Cache-Datei ein (reduzierte Auflösung über die Schrittweite).
+    rng = np.random.default_rng(1)
+    full = rng.integers(-50, 50, 40_000).astype(np.int16)
+    path = tmp_path / "signal.bin"
+    full.tofile(path)
+    mapped = np.memmap(path, dtype=np.int16, mode="r", shape=(len(full),))
+    decimated = mapped[::4]
+    source_file = (str(path), full.dtype.str, len(full), 4)
+    result = find_local_maxima(decimated, workers=WORKERS, source_file=source_file)
+    np.testing.assert_array_equal(result, find_peaks(full[::4])[0])
+
+
+def test_pool_does_not_fork_the_threaded_parent():
+    # Geforkte Worker erbten Locks, die andere Threads gerade halten (Streamlit, Warteschlangen).
+    assert peak_detection.PROCESS_CONTEXT.get_start_method() in ("forkserver", "spawn")
+    assert peak_detection._get_pool(WORKERS)._mp_context is peak_detection.PROCESS_CONTEXT
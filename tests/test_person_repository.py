@@ -0,0 +1,56 @@
+# Tests für das Personenverzeichnis (Änderungen anderer Prozesse zwischen Laden und eigenem Schreibzugriff)
+import pytest
+
+from src import database
+from src.database import TinyDBStorage
+from src.db_writer import DatabaseWriter
+from src.person_repository import PersonRepository
+from src.sqlite_storage import SQLiteStorage
+
+BACKENDS = {
+    "sqlite": lambda tmp_path: SQLiteStorage(str(tmp_path / "persons.db")),
+    "tinydb": lambda tmp_path: TinyDBStorage(str(tmp_path / "persons.json")),
+}
+
+
+def person(person_id, **fields):
+    return {"id": person_id, "firstname": person_id.upper(), "lastname": "Muster", "username": person_id,
+            "date_of_birth": 1990, "picture_path": "", "ekg_tests": [], **fields}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def storages(request, tmp_path, monkeypatch):
+    # Gibt (Speicher dieses Prozesses, Speicher eines anderen Prozesses) auf derselben Datei zurück.
+    own, other = BACKENDS[request.param](tmp_path), BACKENDS[request.param](tmp_path)
+    monkeypatch.setattr(database, "_storage", own)
+    monkeypatch.setattr(database, "_writer", DatabaseWriter(own))
+    return own, other
+
+
+def test_foreign_write_before_own_write_is_loaded(storages, monkeypatch):
+    own, other = storages
+    repository = PersonRepository()
+    repository.insert(person("p1"))
+    assert [p.id for p in repository.all()] == ["p1"]
+
+    # Ein anderer Prozess schreibt nach der Prüfung in _ensure_fresh, aber vor dem eigenen Schreibzugriff
+    update_person = database.update_person
+    def update_after_foreign_write(person_id, updated_data):
+        other.apply_batch([("insert", person("p2"))])
+        update_person(person_id, updated_data)
+    monkeypatch.setattr(database, "update_person", update_after_foreign_write)
+    repository.update("p1", {"firstname": "Erika"})
+
+    assert repository.get_by_id("p2") is not None
+    assert [p.id for p in repository.search("p")] == ["p1", "p2"]
+    assert repository.get_by_id("p1").firstname == "Erika"
+
+
+def test_own_writes_do_not_reload(storages, monkeypatch):
+    repository = PersonRepository()
+    repository.insert(person("p1"))
+    repository.all()
+    monkeypatch.setattr(database, "get_all_persons", lambda: pytest.fail("unnötiger Neuaufbau"))
+    repository.add_ekg_test("p1", {"id": "t1", "date": "01.01.2025"})
+    repository.update("p1", {"lastname": "Beispiel"})
+    assert repository.get_ekg_test("t1")[0].lastname == "Beispiel"
@@ -0,0 +1,131 @@
+# Tests für den Suchindex der Personensuche (Trefferstufen, Begrenzung, Änderungen, Vergleich mit linearer Suche)
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.person_search import PersonSearchIndex
+
+
+def person(person_id, firstname, lastname, username=""):
+    return SimpleNamespace(id=person_id, firstname=firstname, lastname=lastname, username=username)
+
+
+def brute_force(persons, query, limit):
+    # Referenz: alle Personen linear durchsuchen (persons in Einfüge-Reihenfolge).
+    query = query.strip().lower()
+    if not query:
+        return [p.id for p in persons][:limit]
+    exact, prefix, substring = [], [], []
+    for p in persons:
+        fields = PersonSearchIndex._fields(p)
+        sort_key = (p.lastname.strip().lower(), p.firstname.strip().lower(), p.id)
+        if query in fields:
+            exact.append((sort_key, p.id))
+        elif any(field.startswith(query) for field in fields):
+            prefix.append((sort_key, p.id))
+        elif any(query in field for field in fields):
+            substring.append(p.id)
+    return ([person_id for _, person_id in sorted(exact)] + [person_id for _, person_id in sorted(prefix)]
+            + substring)[:limit]
+
+
+PERSONS = [
+    person("1", "Anna", "Maier", "amaier"),
+    person("2", "Max", "Mustermann", "mmuster"),
+    person("3", "Maria", "Anders", "manders"),
+    person("4", "Jonas", "Huber", "jhuber"),
+    person("5", "Lena", "Mai", "lmai"),
+    person("6", "Anna Lena", "Schmid", "als"),
+]
+
+
+def test_exact_before_prefix_before_substring():
+    index = PersonSearchIndex(PERSONS)
+    # "mai": exakt Nachname Mai, Präfix von Maier, Teilwort in "amaier" / "lmai" bereits vergeben
+    assert index.search("Mai") == ["5", "1"]
+    # "an": Präfix von Anders, Anna (Maier), Anna Lena (alphabetisch nach Nachname), Teilwort in "Mustermann"
+    assert index.search("an") == ["3", "1", "6", "2"]
+    assert index.search("lena") == ["5", "6"]  # Vorname Lena und Wort "lena" in "Anna Lena"
+
+
+def test_empty_query_lists_persons_in_insertion_order():
+    index = PersonSearchIndex(PERSONS)
+    assert index.search("") == [p.id for p in PERSONS]
+    assert index.search("  ", limit=2) == ["1", "2"]
+
+
+@pytest.mark.parametrize("query", ["a", "an", "m", "mai", "er", "x"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 50])
+def test_limit(query, limit):
+    index = PersonSearchIndex(PERSONS)
+    assert index.search(query, limit=limit) == brute_force(PERSONS, query, limit)
+
+
+def test_add_and_remove():
+    index = PersonSearchIndex(PERSONS[:3])
+    index.add(PERSONS[4])
+    assert index.search("mai") == ["5", "1"]
+    index.remove("1")
+    assert index.search("mai") == ["5"]
+    assert len(index) == 3
+    # Umbenennen: alter Name wird nicht mehr gefunden, der Platz in der Einfüge-Reihenfolge bleibt
+    index.add(person("2", "Max", "Neumann", "mneu"))
+    assert index.search("muster") == []
+    assert index.search("neu") == ["2"]
+    assert index.search("") == ["2", "3", "5"]
+    assert index.search("m") == ["3", "5", "2"]  # Präfix-Treffer nach Nachname: Anders, Mai, Neumann
+
+
+def test_edit_keeps_substring_order():
+    # Eine bearbeitete Person bleibt auch bei Teilwort-Treffern an ihrem Platz der Einfüge-Reihenfolge.
+    index = PersonSearchIndex(PERSONS)
+    index.add(person("1", "Anna", "Maierhofer", "amaier"))
+    assert index.search("aie") == ["1"]
+    index.add(person("4", "Jonas", "Huberman", "jhuber"))
+    assert index.search("ma") == brute_force([*PERSONS[:3], person("4", "Jonas", "Huberman", "jhuber"), *PERSONS[4:]], "ma", 50)
+
+
+def test_compaction_rebuilds_text():
+    # Nach vielen Löschungen wird der Suchtext ohne veraltete Zeilen neu aufgebaut.
+    persons = [person(str(i), f"Vorname{i}", f"Nachname{i}") for i in range(10)]
+    index = PersonSearchIndex(persons)
+    for i in range(5):
+        index.remove(str(i))
+    assert index._stale_lines == 5 and len(index._line_ids) == 10
+    index.remove("5")
+    assert index._stale_lines == 0 and index._line_ids == ["6", "7", "8", "9"]
+    assert index.search("achname") == ["6", "7", "8", "9"]
+
+
+def test_randomized_against_brute_force():
+    rng = random.Random(0)
+    syllables = ["an", "na", "ma", "ri", "er", "lo", "hu", "be", "ka"]
+
+    def random_person(person_id):
+        name = lambda: "".join(rng.choice(syllables) for _ in range(rng.randint(1, 3))).title()
+        firstname = name() if rng.random() < 0.8 else f"{name()} {name()}"
+        return person(person_id, firstname, name(), name().lower())
+
+    persons = {str(i): random_person(str(i)) for i in range(60)}
+    index = PersonSearchIndex(persons.values())
+    next_id = len(persons)
+    for step in range(400):
+        action = rng.random()
+        if action < 0.3:
+            person_id = str(next_id)
+            next_id += 1
+            persons[person_id] = random_person(person_id)
+            index.add(persons[person_id])
+        elif action < 0.5 and persons:
+            person_id = rng.choice(list(persons))
+            persons[person_id] = random_person(person_id)  # Bearbeiten behält die Reihenfolge
+            index.add(persons[person_id])
+        elif action < 0.7 and persons:
+            person_id = rng.choice(list(persons))
+            del persons[person_id]
+            index.remove(person_id)
+        query = rng.choice(syllables)[:rng.randint(1, 2)] + rng.choice(["", rng.choice(syllables)])
+        limit = rng.choice([1, 5, 20, 1000])
+        assert index.search(query, limit) == brute_force(list(persons.values()), query, limit), (step, query, limit)
+    assert len(index) == len(persons)
@@ -0,0 +1,54 @@
+# Tests für die Vorverarbeitung hochgeladener Aufnahmen (Umwandlung, Aufräumen, Löschen)
+import os
+
+import pytest
+
+from conftest import write_recording
+from src import ekg_cache
+from src.ekgdata import EKGdata
+from src.ekg_signal import EKGSignal
+from src.preprocessing import (Preprocessor, PreprocessingJob, delete_recording, remove_converted_text_files,
+                               get_preprocessor, validate_upload)
+
+
+def test_conversion_keeps_text_file_for_running_readers(recording):
+    job = PreprocessingJob(recording["id"], str(recording["path"]))
+    Preprocessor()._run(job)
+    assert job.state == "done", job.error
+    assert job.source_path.endswith(".ekgz")
+    assert os.path.exists(recording["path"])
+    # Ein Leser, der die Textdatei vor der Umwandlung gewählt hat, kann sie weiterhin laden
+    assert len(EKGSignal.from_file(str(recording["path"]))) == 30000
+
+
+def test_converted_text_files_are_removed_with_cache(recording, ekg_dir):
+    EKGdata(recording)  # erstellt die Cache-Dateien der Textdatei
+    assert os.listdir(ekg_cache.CACHE_DIR)
+    Preprocessor()._run(PreprocessingJob(recording["id"], str(recording["path"])))
+    other = write_recording(ekg_dir.path / "other.txt", seed=1)
+
+    assert remove_converted_text_files(str(ekg_dir.path)) == [str(recording["path"])]
+    assert not os.path.exists(recording["path"])
+    assert os.path.exists(other)
+    assert not os.listdir(ekg_cache.CACHE_DIR)
+
+
+def test_delete_recording_removes_files_and_results(recording, ekg_dir):
+    Preprocessor()._run(PreprocessingJob(recording["id"], str(recording["path"])))
+    assert os.listdir(ekg_dir.store.directory)
+
+    delete_recording(recording["id"], str(ekg_dir.path))
+    assert not [name for name in os.listdir(ekg_dir.path) if name.startswith(recording["id"])]
+    assert not os.listdir(ekg_dir.store.directory)
+    assert get_preprocessor().status(recording["id"]) is None
+
+
+def test_validate_upload_rejects_invalid_files(tmp_path, recording):
+    validate_upload(str(recording["path"]))
+    text = tmp_path / "text.txt"
+    text.write_text("Messwert\tZeit\nabc\tdef\n")
+    garbage = tmp_path / "garbage.ekgz"
+    garbage.write_bytes(b"kein EKG")
+    for path in (text, garbage):
+        with pytest.raises(ValueError):
+            validate_upload(str(path))
@@ -0,0 +1,117 @@
+# Tests für PDF-Reports und Sammel-Export (Kommandozeile, Aufräumen alter Archive und Aufträge)
+import os
+
+from src import reports
+
+
+def test_cli_filters_by_person_id(tmp_path, monkeypatch):
+    # Personen-IDs sind Zeichenketten (z. B. "d1427c5a"), keine Zahlen
+    class Person:
+        def __init__(self, person_id):
+            self.id = person_id
+            self.ekg_tests = [{"id": f"test_{person_id}", "date": "01.01.2025"}]
+
+    class Repository:
+        def all(self):
+            return [Person("d1427c5a"), Person("c40419f9")]
+
+    selected = []
+    monkeypatch.setattr(reports, "get_person_repository", lambda: Repository())
+    monkeypatch.setattr(reports, "export_reports_zip",
+                        lambda requests, *args: selected.extend(requests) or {"reports": len(requests), "failed": 0,
+                                                                              "wall_time_s": 1.0, "reports_per_s": 1.0})
+    assert reports.main(["--person", "d1427c5a", "--output", str(tmp_path / "r.zip")]) == 0
+    assert [request.test["id"] for request in selected] == ["test_d1427c5a"]
+
+
+def test_prune_exports_keeps_newest_archives(tmp_path):
+    for number in range(8):
+        path = tmp_path / f"reports_{number}.zip"
+        path.write_bytes(b"")
+        os.utime(path, (number, number))
+    (tmp_path / "batch_analysis.csv").write_text("")
+    reports.prune_exports(keep=3, directory=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["batch_analysis.csv", "reports_5.zip", "reports_6.zip", "reports_7.zip"]
+
+
+def test_export_pool_does_not_fork(tmp_path, monkeypatch):
+    # Der Sammel-Export läuft in einem Hintergrund-Thread; geforkte Worker erbten dort gehaltene Locks.
+    options = {}
+
+    class Executor:
+        def __init__(self, **kwargs):
+            options.update(kwargs)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(reports, "ProcessPoolExecutor", Executor)
+    reports.export_reports_zip([], str(tmp_path / "r.zip"), workers=1)
+    assert options["mp_context"].get_start_method() in ("forkserver", "spawn")
+
+
+class SyncThread:
+    # Ersatz für threading.Thread: führt den Sammel-Export sofort im aufrufenden Thread aus.
+    def __init__(self, target, args=(), **kwargs):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+def test_finished_export_jobs_are_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(reports.threading, "Thread", SyncThread)
+    monkeypatch.setattr(reports, "export_reports_zip", lambda *args: None)
+    monkeypatch.setattr(reports, "prune_exports", lambda: None)
+    queue = reports.ReportQueue()
+    jobs = [queue.submit_export([], str(tmp_path / f"r{number}.zip")) for number in range(reports.EXPORT_KEEP + 3)]
+    assert all(job.state == "done" for job in jobs)
+    kept = [job for job in jobs if queue.status(job.id) is not None]
+    # Vor jedem neuen Export bleiben die EXPORT_KEEP neuesten abgeschlossenen erhalten, dazu der neue
+    assert kept == jobs[-(reports.EXPORT_KEEP + 1):]
+
+
+def test_replaced_failed_report_job_is_forgotten(monkeypatch):
+    class Request:
+        key = ("person", "test")
+
+    def fail(self, job):
+        job.state = "failed"
+
+    monkeypatch.setattr(reports.ReportQueue, "_run", fail)
+    queue = reports.ReportQueue(workers=1)
+    failed = queue.submit(Request())
+    queue._executor.shutdown(wait=True)
+    queue._executor = None
+    assert failed.state == "failed"
+    retry = queue.submit(Request())
+    assert retry is not failed
+    assert queue.status(failed.id) is None and queue.status(retry.id) is retry
+    assert len(queue._by_id) == 1
+
+
+def test_shared_images_only_with_pinned_fpdf(tmp_path, monkeypatch):
+    # Bei einer anderen FPDF-Version wird die interne Bildtabelle nicht angefasst.
+    import fpdf
+    from PIL import Image
+
+    path = str(tmp_path / "bild.png")
+    Image.new("RGB", (4, 4)).save(path)
+
+    class PDF:
+        images = None  # Zugriff darauf würde scheitern
+
+        def __init__(self):
+            self.calls = []
+
+        def image(self, name, **position):
+            self.calls.append(name)
+
+    monkeypatch.setattr(fpdf, "FPDF_VERSION", "2.0.0", raising=False)
+    pdf = PDF()
+    reports._add_shared_image(pdf, path, x=10, y=15, w=30)
+    reports._add_shared_image(pdf, path, x=10, y=15, w=30)
+    assert pdf.calls == [path, path]
@@ -0,0 +1,73 @@
+# Tests für die gespeicherten Analyseergebnisse (Peak-Kandidaten statt Einträgen je Schwellwert, begrenzte Analysen)
+import os
+
+import numpy as np
+
+import pytest
+
+from src import ekg_signal, result_store
+from src.ekgdata import EKGdata
+from src.result_store import ResultStore
+from src.signal_cache import get_signal_cache
+
+
+def test_threshold_changes_only_store_candidates_once(recording):
+    ekg = EKGdata(recording)
+    for height in range(320, 420, 5):
+        ekg.detect_peaks_globally(height=height, method="threshold")
+        ekg.detect_rr_anomalies(300)
+        ekg.estimate_hr()
+    content_hash = ekg.signal.content_hash
+    assert os.listdir(recording["store"].directory) == [f"{content_hash}.d{ekg.decimation}.candidates.npz"]
+
+
+def test_candidates_are_reused_after_restart(recording, monkeypatch):
+    ekg = EKGdata(recording)
+    ekg.detect_peaks_globally(height=400, method="threshold")
+    expected = ekg.peaks
+
+    # Neustart: Signal neu laden, die Maximumsuche darf nicht erneut laufen
+    get_signal_cache().invalidate(recording["id"])
+    monkeypatch.setattr(ekg_signal, "find_local_maxima", lambda *args, **kwargs: pytest.fail("Kandidaten neu berechnet"))
+    reopened = EKGdata(recording)
+    assert reopened.signal is not ekg.signal
+    reopened.detect_peaks_globally(height=400, method="threshold")
+    np.testing.assert_array_equal(reopened.peaks, expected)
+    reopened.detect_peaks_globally(height=330, method="threshold")
+    assert len(reopened.peaks) >= len(expected)
+
+
+def test_threshold_peaks_match_candidate_search(recording):
+    ekg = EKGdata(recording)
+    ekg.detect_peaks_globally(height=400, method="threshold")
+    assert np.array_equal(ekg.peaks, ekg.signal.peaks_above(400, ekg.decimation))
+    assert len(ekg.peaks) == 75  # eine R-Zacke alle 800 ms über 60 s
+
+
+def test_adaptive_peaks_are_stored_once(recording):
+    ekg = EKGdata(recording)
+    ekg.detect_peaks_globally(method="pan_tompkins")
+    stored = recording["store"].get_peaks(ekg.signal.content_hash, ekg.decimation, "pan_tompkins")
+    assert stored == ekg.peaks.tolist()
+
+
+def test_analyses_are_capped_per_recording(tmp_path):
+    store = ResultStore(str(tmp_path))
+    for threshold in range(result_store.MAX_ANALYSES + 10):
+        store.put_analysis("hash", threshold, 4, "pan_tompkins", hr=60.0)
+    fresh = ResultStore(str(tmp_path))
+    analyses = fresh._load("hash")["analyses"]
+    assert len(analyses) == result_store.MAX_ANALYSES
+    assert fresh.get_analysis("hash", result_store.MAX_ANALYSES + 9, 4, "pan_tompkins") == {"hr": 60.0}
+    assert fresh.get_analysis("hash", 0, 4, "pan_tompkins") is None
+
+
+def test_delete_removes_candidates(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.put_candidates("hash", 4, np.array([3, 1], dtype=np.int32), np.array([5, 9], dtype=np.int16))
+    store.put_analysis("hash", 300, 4, "pan_tompkins", hr=60.0)
+    positions, heights = store.get_candidates("hash", 4)
+    assert positions.tolist() == [3, 1] and heights.dtype == np.int16
+    store.delete("hash")
+    assert os.listdir(tmp_path) == []
+    assert store.get_candidates("hash", 4) is None
@@ -0,0 +1,70 @@
+# Tests für die RR-Intervallreihe: Vergleich mit der ursprünglichen Berechnung (Listen-Abstraktion, pandas rolling)
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from src.ekg_signal import DECIMATION_FACTOR
+from src.peak_detection import estimate_sampling_rate, pan_tompkins
+from src.rr_series import RRSeries, centered_rolling_mean
+
+RECORDINGS = ["01_Ruhe", "02_Ruhe", "03_Ruhe", "04_Belastung"]
+THRESHOLDS_MS = [300, 500, 700]
+
+
+@pytest.fixture(scope="module", params=[(name, method) for name in RECORDINGS for method in ("threshold", "pan_tompkins")],
+                ids=lambda param: "-".join(param))
+def peak_times(request):
+    # Peak-Zeitpunkte (ms) einer mitgelieferten Aufnahme in reduzierter Auflösung, wie in der Anwendung.
+    name, method = request.param
+    data = np.loadtxt(f"data/ekg_data/{name}.txt")
+    mv, ms = data[::DECIMATION_FACTOR, 0], data[::DECIMATION_FACTOR, 1]
+    ms = ms - ms[0]
+    if method == "threshold":
+        peaks = find_peaks(mv, height=350)[0]
+    else:
+        peaks = pan_tompkins(mv, estimate_sampling_rate(ms))
+    return ms[peaks].astype(np.int64)
+
+
+def test_anomalies_match_list_comprehension(peak_times):
+    series = RRSeries(peak_times)
+    rr_intervals = peak_times[1:] - peak_times[:-1]
+    for threshold_ms in THRESHOLDS_MS:
+        expected = [i + 1 for i, rr in enumerate(rr_intervals) if rr < threshold_ms]
+        assert series.anomalies(threshold_ms).tolist() == expected
+        assert series.anomaly_count(threshold_ms) == len(expected)
+
+
+def test_mean_hr_matches_baseline(peak_times):
+    series = RRSeries(peak_times)
+    seconds = peak_times / 1000
+    expected = 60 / (seconds[1:] - seconds[:-1]).mean()
+    assert series.mean_hr() == pytest.approx(expected, rel=1e-12)
+    # Zeitfenster: Mittelwert der Intervalle zwischen den Peaks im Fenster
+    min_time, max_time = peak_times[len(peak_times) // 4], peak_times[len(peak_times) // 2] + 1
+    inside = seconds[(peak_times >= min_time) & (peak_times <= max_time)]
+    assert series.mean_hr(min_time, max_time) == pytest.approx(60 / np.diff(inside).mean(), rel=1e-12)
+
+
+def test_smoothed_hr_matches_pandas_rolling_mean(peak_times):
+    series = RRSeries(peak_times)
+    seconds = peak_times / 1000
+    hr_values = 60 / (seconds[1:] - seconds[:-1])
+    window_size = max(3, int(len(hr_values) * 0.05))
+    expected = pd.Series(hr_values).rolling(window=window_size, center=True, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(series.smoothed_hr, expected, rtol=1e-9)
+    np.testing.assert_allclose(series.times / 1000, (seconds[1:] + seconds[:-1]) / 2)
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 7, 50])
+def test_centered_rolling_mean_matches_pandas(window):
+    values = np.random.default_rng(window).normal(70, 10, 200)
+    expected = pd.Series(values).rolling(window=window, center=True, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(centered_rolling_mean(values, window), expected, rtol=1e-12)
+
+
+def test_short_series():
+    assert RRSeries([]).mean_hr() == 0
+    assert RRSeries([1000]).mean_hr() == 0
+    assert len(RRSeries([1000]).anomalies(300)) == 0
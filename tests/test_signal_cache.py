@@ -0,0 +1,89 @@
+# Tests für den LRU-Cache geladener Signale (Verdrängung, Dateiversion, Zähler, Speicherbedarf)
+import os
+
+import numpy as np
+import pytest
+
+from src.ekg_signal import DECIMATION_FACTOR, EKGSignal
+from src.signal_cache import SignalCache
+from conftest import write_recording
+
+
+@pytest.fixture
+def recordings(ekg_dir):
+    # Drei gleich große Aufnahmen; gibt (EKG-ID, Pfad) und den Speicherbedarf eines geladenen Signals zurück.
+    paths = {ekg_id: write_recording(ekg_dir.path / f"{ekg_id}.txt", seed=i) for i, ekg_id in enumerate("abc")}
+    size = EKGSignal.from_file(paths["a"]).nbytes
+    return paths, size
+
+
+def test_lru_eviction_order(recordings):
+    paths, size = recordings
+    cache = SignalCache(max_bytes=2 * size)
+    a = cache.get("a", paths["a"])
+    cache.get("b", paths["b"])
+    assert cache.get("a", paths["a"]) is a  # a zuletzt genutzt, b ist jetzt der älteste Eintrag
+    cache.get("c", paths["c"])
+    assert [key[0] for key in cache._entries] == ["a", "c"]
+    assert cache.get("a", paths["a"]) is a
+    assert cache.stats()["evictions"] == 1
+
+
+def test_set_max_bytes_evicts_least_recently_used(recordings):
+    paths, size = recordings
+    cache = SignalCache(max_bytes=3 * size)
+    for ekg_id in "abc":
+        cache.get(ekg_id, paths[ekg_id])
+    cache.get("a", paths["a"])
+    cache.set_max_bytes(size)
+    assert [key[0] for key in cache._entries] == ["a"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_signal_larger_than_budget_is_not_cached(recordings):
+    paths, size = recordings
+    cache = SignalCache(max_bytes=size - 1)
+    first = cache.get("a", paths["a"])
+    assert cache.get("a", paths["a"]) is not first
+    assert cache.stats()["entries"] == 0 and cache.stats()["misses"] == 2
+
+
+def test_new_file_version_replaces_entry(recordings):
+    paths, size = recordings
+    cache = SignalCache(max_bytes=3 * size)
+    old = cache.get("a", paths["a"])
+    write_recording(paths["a"], seconds=30)
+    stat = os.stat(paths["a"])
+    os.utime(paths["a"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    new = cache.get("a", paths["a"])
+    assert new is not old and len(new) == len(old) // 2
+    assert cache.stats()["entries"] == 1  # alte Version wurde entfernt
+    assert cache.get("a", paths["a"]) is new
+
+
+def test_counters(recordings):
+    paths, size = recordings
+    cache = SignalCache(max_bytes=size)
+    cache.get("a", paths["a"])
+    cache.get("a", paths["a"])
+    cache.get("b", paths["b"])
+    cache.get("a", paths["a"])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 3, 2, 1)
+    assert stats["bytes"] == size and stats["max_bytes"] == size
+    cache.invalidate("a")
+    assert cache.stats()["entries"] == 0
+    cache.clear()
+    assert (cache.stats()["hits"], cache.stats()["misses"], cache.stats()["evictions"]) == (0, 0, 0)
+
+
+def test_nbytes_counts_decimated_arrays_and_candidates():
+    mv = np.arange(1000, dtype=np.int16)
+    ms = np.arange(1000, dtype=np.int32) * 2
+    decimated = (mv[::DECIMATION_FACTOR].copy(), ms[::DECIMATION_FACTOR].copy())
+    signal = EKGSignal(mv, ms, decimated_arrays={DECIMATION_FACTOR: decimated})
+    base = mv.nbytes + ms.nbytes
+    assert signal.nbytes == base + decimated[0].nbytes + decimated[1].nbytes
+    positions, heights = np.arange(10, dtype=np.int32), np.arange(10, dtype=np.int16)
+    signal.set_peak_candidates(DECIMATION_FACTOR, positions, heights)
+    assert signal.nbytes == base + decimated[0].nbytes + decimated[1].nbytes + positions.nbytes + heights.nbytes
@@ -0,0 +1,66 @@
+# Tests für den SQLite-Speicher (zusätzliche Felder der EKG-Tests, Migration aus der JSON-Datei)
+import json
+import sqlite3
+
+from src import sqlite_storage
+from src.sqlite_storage import SQLiteStorage
+
+
+def make_person(**ekg_test):
+    return {"id": "p1", "firstname": "Erika", "lastname": "Muster", "username": "erika",
+            "ekg_tests": [{"id": "t1", "date": "01.01.2025", **ekg_test}]}
+
+
+def test_extra_ekg_test_fields_are_kept(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "persons.db"))
+    storage.apply_batch([
+        ("insert", make_person(result_link="data/t1.pdf")),
+        ("add_ekg_test", "p1", {"id": "t2", "date": "02.01.2025", "device": {"name": "Polar", "rate": 500}}),
+    ])
+    tests = storage.get_by_id("p1")["ekg_tests"]
+    assert tests == [
+        {"id": "t1", "date": "01.01.2025", "result_link": "data/t1.pdf"},
+        {"id": "t2", "date": "02.01.2025", "device": {"name": "Polar", "rate": 500}},
+    ]
+    assert storage.all()[0]["ekg_tests"] == tests
+
+    storage.apply_batch([("update", "p1", {"ekg_tests": tests[1:]})])
+    assert storage.get_by_id("p1")["ekg_tests"] == tests[1:]
+
+
+def test_existing_database_gets_extra_column(tmp_path):
+    path = str(tmp_path / "persons.db")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE persons (doc_id INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, firstname TEXT,
+            lastname TEXT, username TEXT, password TEXT, date_of_birth TEXT, role TEXT, gender TEXT,
+            picture_path TEXT, extra TEXT);
+        CREATE TABLE ekg_tests (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE,
+            person_id TEXT NOT NULL REFERENCES persons (id) ON DELETE CASCADE, date TEXT);
+        INSERT INTO persons (id, username) VALUES ('p1', 'erika');
+        INSERT INTO ekg_tests (id, person_id, date) VALUES ('t1', 'p1', '01.01.2025');
+    """)
+    connection.close()
+
+    storage = SQLiteStorage(path)
+    assert storage.get_by_id("p1")["ekg_tests"] == [{"id": "t1", "date": "01.01.2025"}]
+    storage.apply_batch([("add_ekg_test", "p1", {"id": "t2", "date": "02.01.2025", "note": "Belastung"})])
+    assert storage.get_by_id("p1")["ekg_tests"][1] == {"id": "t2", "date": "02.01.2025", "note": "Belastung"}
+
+
+def test_concurrent_migration_runs_once(tmp_path, monkeypatch):
+    json_path = tmp_path / "person_db.json"
+    json_path.write_text(json.dumps({"_default": {"1": make_person(), "2": dict(make_person(), id="p2", ekg_tests=[])}}))
+    db_path = str(tmp_path / "persons.db")
+    first, second = SQLiteStorage(db_path), SQLiteStorage(db_path)
+
+    # Der zweite Prozess hat die Markierung schon geprüft, während der erste die Migration abschließt
+    load = json.load
+    def load_after_other_migration(file):
+        monkeypatch.setattr(sqlite_storage.json, "load", load)
+        assert first.migrate_from_json(str(json_path)) == 2
+        return load(file)
+    monkeypatch.setattr(sqlite_storage.json, "load", load_after_other_migration)
+
+    assert second.migrate_from_json(str(json_path)) == 0
+    assert [person["id"] for person in second.all()] == ["p1", "p2"]